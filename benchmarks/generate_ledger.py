@@ -0,0 +1,123 @@
+"""Writes a deterministic synthetic ledger (transactions.txt and budgets.txt) for benchmarking.
+
+    python benchmarks/generate_ledger.py --rows 1000000 --output-dir /tmp/bench/database
+"""
+import argparse
+import os
+from datetime import date
+
+import numpy as np
+
+# (type, category, share of all rows, median amount in cents)
+CATEGORY_MIX = [
+    ("Expense", "Food", 0.30, 1500),
+    ("Expense", "Transport", 0.15, 1200),
+    ("Expense", "Shopping", 0.13, 4500),
+    ("Expense", "Bills", 0.10, 9000),
+    ("Expense", "Entertainment", 0.11, 3000),
+    ("Expense", "Health", 0.07, 5000),
+    ("Expense", "Other", 0.06, 2000),
+    ("Income", "Salary", 0.04, 300000),
+    ("Income", "Freelance", 0.02, 50000),
+    ("Income", "Business", 0.01, 80000),
+    ("Income", "Investment", 0.007, 20000),
+    ("Income", "Gift", 0.003, 10000),
+]
+
+DESCRIPTIONS = {
+    "Food": ["Groceries", "Coffee", "Lunch", "Dinner out", "Bakery"],
+    "Transport": ["Bus fare", "Fuel", "Taxi", "Train ticket", "Parking"],
+    "Shopping": ["Clothes", "Electronics", "Books", "Home goods"],
+    "Bills": ["Electricity", "Water", "Internet", "Phone", "Rent"],
+    "Entertainment": ["Cinema", "Streaming", "Concert", "Games"],
+    "Health": ["Pharmacy", "Doctor", "Gym"],
+    "Other": ["Gift for friend", "Donation", "Misc"],
+    "Salary": ["Monthly salary"],
+    "Freelance": ["Client project", "Consulting"],
+    "Business": ["Sales revenue"],
+    "Investment": ["Dividends", "Interest"],
+    "Gift": ["Birthday gift"],
+}
+
+# Spread of amounts around each category's median (log-normal sigma).
+AMOUNT_SIGMA = 0.6
+
+# Share of rows entered late, i.e. dated up to two weeks before their neighbours.
+BACKDATED_SHARE = 0.02
+
+# Days of rows generated and written at a time, bounding memory for large ledgers.
+BLOCK_DAYS = 30
+
+
+def generate_ledger(output_dir, rows, years=5, end_date=None, seed=42):
+    """Writes rows transactions spread over years ending on end_date, plus matching budgets.
+
+    The same arguments always produce the same files. Rows are mostly in date
+    order with a few backdated entries, weekends are busier, and amounts are
+    log-normal around per-category medians. Returns the end date used.
+    """
+    end_date = end_date or date.today()
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+
+    days = years * 365
+    first = end_date.toordinal() - days + 1
+    ordinals = np.arange(first, end_date.toordinal() + 1)
+    weights = np.where((ordinals + 6) % 7 >= 5, 1.3, 1.0)  # ordinal 1 is a Monday
+    per_day = rng.multinomial(rows, weights / weights.sum())
+
+    shares = np.array([mix[2] for mix in CATEGORY_MIX])
+    shares /= shares.sum()
+    medians = np.array([mix[3] for mix in CATEGORY_MIX], dtype=np.float64)
+    prefixes = [f"{type_},{category}," for type_, category, _, _ in CATEGORY_MIX]
+    descriptions = [DESCRIPTIONS[category] for _, category, _, _ in CATEGORY_MIX]
+    date_strings = {}
+    totals = np.zeros(len(CATEGORY_MIX), dtype=np.int64)
+
+    with open(os.path.join(output_dir, "transactions.txt"), "w", newline="") as f:
+        for block_start in range(0, days, BLOCK_DAYS):
+            counts = per_day[block_start:block_start + BLOCK_DAYS]
+            block = np.repeat(ordinals[block_start:block_start + BLOCK_DAYS], counts)
+            if not len(block):
+                continue
+            backdated = rng.random(len(block)) < BACKDATED_SHARE
+            block[backdated] -= rng.integers(1, 15, size=int(backdated.sum()))
+            block = np.maximum(block, first)
+
+            kinds = rng.choice(len(CATEGORY_MIX), size=len(block), p=shares)
+            amounts = np.maximum(1, np.round(medians[kinds] * rng.lognormal(0, AMOUNT_SIGMA, len(block))))
+            amounts = amounts.astype(np.int64)
+            picks = rng.integers(0, 1 << 30, size=len(block))
+            np.add.at(totals, kinds, amounts)
+
+            lines = []
+            for ordinal, kind, amount, pick in zip(block.tolist(), kinds.tolist(), amounts.tolist(), picks.tolist()):
+                date_str = date_strings.get(ordinal)
+                if date_str is None:
+                    date_str = date_strings[ordinal] = date.fromordinal(ordinal).isoformat()
+                options = descriptions[kind]
+                lines.append(f"{date_str},{prefixes[kind]}{options[pick % len(options)]},{amount}\n")
+            f.write("".join(lines))
+
+    # Budgets sit a little above the average monthly spend per category.
+    months = days / 30.4
+    with open(os.path.join(output_dir, "budgets.txt"), "w", newline="") as f:
+        for (type_, category, _, _), total in zip(CATEGORY_MIX, totals.tolist()):
+            if type_ == "Expense":
+                f.write(f"{category},{int(total / months * 1.05) // 100 * 100}\n")
+    return end_date
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000, help="number of transactions (default: 10000)")
+    parser.add_argument("--years", type=int, default=5, help="years of history (default: 5)")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="last date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (default: 42)")
+    parser.add_argument("--output-dir", default="database", help="directory to write to (default: database)")
+    args = parser.parse_args()
+    generate_ledger(args.output_dir, args.rows, args.years, args.end_date, args.seed)
+
+
+if __name__ == "__main__":
+    main()
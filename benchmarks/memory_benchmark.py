@@ -0,0 +1,139 @@
+"""Measures the memory each transaction row returned by the provider takes, as Transactions and as the dicts they replaced.
+
+    python benchmarks/memory_benchmark.py --rows 100000 1000000
+    python benchmarks/memory_benchmark.py --rows 1000000 --output memory.json
+"""
+import argparse
+import csv
+import gc
+import io
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from datetime import date
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from rich.console import Console
+from rich.table import Table
+
+from generate_ledger import generate_ledger
+from features.data.store import TransactionStore
+from features.data.transaction import Transaction
+
+DEFAULT_SIZES = [100000, 1000000]
+
+console = Console()
+
+
+def _parsed_dicts(text):
+    """Rows as the CSV and SQLite backends used to return them: a dict of freshly parsed fields."""
+    return [{"date": row[0], "type": row[1], "category": row[2], "description": row[3], "amount": int(row[4])}
+            for row in csv.reader(io.StringIO(text, newline="")) if row]
+
+
+def _parsed_transactions(text):
+    return [Transaction.from_row(row) for row in csv.reader(io.StringIO(text, newline="")) if row]
+
+
+def _store_dicts(store):
+    """Rows as TransactionStore used to return them: a dict sharing the store's date and name strings."""
+    dates = {}
+    records = []
+    for i in range(len(store)):
+        ordinal = int(store.dates[i])
+        date_str = dates.get(ordinal)
+        if date_str is None:
+            date_str = dates[ordinal] = date.fromordinal(ordinal).isoformat()
+        records.append({"date": date_str, "type": store.types[store.type_codes[i]],
+                        "category": store.categories[store.category_codes[i]],
+                        "description": store.descriptions[i], "amount": int(store.amounts[i])})
+    return records
+
+
+def _store_transactions(store):
+    return list(store)
+
+
+def _retained_bytes(build, source):
+    """Returns the bytes still allocated once build(source) has returned its rows."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        rows = build(source)
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del rows
+    gc.collect()
+    return retained
+
+
+def run_size(rows, seed):
+    """Generates a ledger of the given size and measures both row types for parsed and stored rows.
+
+    "parsed" rows are read from ledger text, as iter_transactions(), pages and
+    searches do without a cached store; "stored" rows come from a loaded
+    TransactionStore, as get_all_transactions() and the recent list do.
+    Descriptions and amounts are counted for both row types.
+    """
+    with tempfile.TemporaryDirectory(prefix="finance-memory-") as workdir:
+        generate_ledger(workdir, rows, seed=seed)
+        with open(os.path.join(workdir, "transactions.txt"), newline="") as f:
+            text = f.read()
+    store = TransactionStore()
+    store.extend(csv.reader(io.StringIO(text, newline="")))
+
+    results = []
+    for source, label, dicts, transactions in [(text, "parsed", _parsed_dicts, _parsed_transactions),
+                                               (store, "stored", _store_dicts, _store_transactions)]:
+        console.print(f"[cyan]{rows:,} rows[/cyan] {label}...")
+        before = _retained_bytes(dicts, source)
+        after = _retained_bytes(transactions, source)
+        results.append({
+            "rows": rows,
+            "source": label,
+            "dict_bytes_per_row": round(before / rows, 1),
+            "transaction_bytes_per_row": round(after / rows, 1),
+            "reduction_pct": round((before - after) / before * 100, 1),
+        })
+    return results
+
+
+def print_results(results):
+    table = Table(title="Memory per Transaction Row")
+    table.add_column("Rows", justify="right")
+    table.add_column("Rows from", style="cyan")
+    table.add_column("Dict (B/row)", justify="right")
+    table.add_column("Transaction (B/row)", justify="right")
+    table.add_column("Reduction", justify="right", style="green")
+    for r in results:
+        table.add_row(f"{r['rows']:,}", r["source"], f"{r['dict_bytes_per_row']:.1f}",
+                      f"{r['transaction_bytes_per_row']:.1f}", f"{r['reduction_pct']:.1f}%")
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="ledger sizes to measure (default: 100000 1000000)")
+    parser.add_argument("--seed", type=int, default=42, help="ledger generator seed (default: 42)")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        results.extend(run_size(rows, args.seed))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    print_results(results)
+    if args.output:
+        console.print(f"[green]Results written to {args.output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
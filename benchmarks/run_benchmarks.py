@@ -0,0 +1,246 @@
+"""Times the app's data and report entry points on synthetic ledgers and records the results as JSON.
+
+    python benchmarks/run_benchmarks.py --rows 10000 1000000
+    python benchmarks/run_benchmarks.py --rows 10000 --compare benchmarks/results/<earlier run>.json
+    python benchmarks/run_benchmarks.py --rows 1000000 --daemon
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import questionary
+from rich.console import Console
+from rich.table import Table
+
+from generate_ledger import generate_ledger
+from features.analytics import analytics
+from features.analytics.report import build_financial_report
+from features.analytics.trends import build_trend_report
+from features.budgets import budgets
+from features.data import provider
+from features.data.daemon import daemon_status, stop_daemon
+from features.data.storage import STORAGE_ENV, convert_csv_to_binary, reset_storage
+from features.transactions import transactions
+
+DEFAULT_SIZES = [10000, 1000000]
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+console = Console()
+
+
+class _Answer:
+    """Stands in for a questionary prompt so paged views return after one page."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def ask(self):
+        return "Back"
+
+
+def _silence_output():
+    """Sends the features' rich output to /dev/null and answers their prompts with Back."""
+    devnull = open(os.devnull, "w")
+    for module in (transactions, budgets, analytics):
+        module.console = Console(file=devnull)
+    questionary.select = _Answer
+
+
+def _benchmarks(today):
+    """Returns (name, setup, run) triples; run(*setup()) is what gets timed."""
+    month = today.strftime("%Y-%m")
+    return [
+        ("rebuild_indexes", tuple, provider.rebuild_indexes),
+        ("get_all_transactions", tuple, provider.get_all_transactions),
+        ("get_transactions_for_month", lambda: (month,), provider.get_transactions_for_month),
+        ("calculate_monthly_summary", lambda: (provider.get_transactions_for_month(month),),
+         provider.calculate_monthly_summary),
+        ("list_transactions", tuple, transactions.list_transactions),
+        ("view_budgets", tuple, budgets.view_budgets),
+        ("generate_financial_report", tuple, analytics.generate_financial_report),
+        ("trend_report_60_months", tuple, lambda: build_trend_report(60, today)),
+        ("search_transactions", tuple, lambda: provider.search_transactions("gift fr")),
+        # Mirrors dashboard.load_dashboard_data, which cannot be imported outside Streamlit.
+        ("dashboard_data", tuple, lambda: {"report": build_financial_report(today),
+                                           "recent_transactions": provider.get_recent_transactions(10)}),
+    ]
+
+
+def _measure(setup, run, repeat):
+    """Returns (cold seconds, warm timings, peak traced bytes) for one entry point.
+
+    The cold call follows a storage reset, so it includes loading the ledger;
+    the warm calls reuse whatever the app caches. Peak memory is traced in a
+    separate cold call so tracing does not distort the timings.
+    """
+    reset_storage()
+    args = setup()
+    started = time.perf_counter()
+    run(*args)
+    cold = time.perf_counter() - started
+
+    warm = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(*args)
+        warm.append(time.perf_counter() - started)
+
+    reset_storage()
+    args = setup()
+    tracemalloc.start()
+    try:
+        run(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return cold, warm, peak
+
+
+def _start_daemon(workdir):
+    """Starts `cli.py daemon start` for the ledger in workdir and waits until it answers."""
+    process = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "cli.py"), "daemon", "start"],
+                               cwd=workdir, stderr=subprocess.DEVNULL)
+    while daemon_status() is None:
+        if process.poll() is not None:
+            raise RuntimeError("The ledger daemon exited during start-up.")
+        time.sleep(0.05)
+    return process
+
+
+def run_size(rows, repeat, storage, seed, daemon=False):
+    """Generates a ledger of the given size in a temp directory and benchmarks every entry point.
+
+    With daemon, the entry points are timed as clients of a ledger daemon
+    started after the ledger is generated, so "cold" excludes its start-up.
+    """
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="finance-bench-") as workdir:
+        os.chdir(workdir)
+        process = None
+        try:
+            today = datetime.now().date()
+            generate_ledger("database", rows, end_date=today, seed=seed)
+            reset_storage()
+            if storage == "sqlite":
+                provider.migrate_csv_to_sqlite()
+            elif storage == "binary":
+                convert_csv_to_binary()
+            if daemon:
+                process = _start_daemon(workdir)
+
+            for name, setup, run in _benchmarks(today):
+                console.print(f"[cyan]{rows:,} rows[/cyan] {name}...")
+                cold, warm, peak = _measure(setup, run, repeat)
+                best = min(warm)
+                results.append({
+                    "benchmark": name,
+                    "rows": rows,
+                    "cold_seconds": round(cold, 6),
+                    "best_seconds": round(best, 6),
+                    "mean_seconds": round(sum(warm) / len(warm), 6),
+                    "peak_memory_bytes": peak,
+                    "rows_per_second": round(rows / best) if best > 0 else None,
+                })
+        finally:
+            if process is not None:
+                stop_daemon()
+                process.wait()
+            os.chdir(cwd)
+            reset_storage()
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    """Prints results as a table, with the change against a baseline run when given."""
+    previous = {(r["benchmark"], r["rows"]): r for r in (baseline or {}).get("results", [])}
+    table = Table(title="Benchmark Results")
+    table.add_column("Benchmark", style="cyan")
+    table.add_column("Rows", justify="right")
+    table.add_column("Cold (s)", justify="right")
+    table.add_column("Best (s)", justify="right")
+    table.add_column("Peak Memory", justify="right")
+    table.add_column("Rows/s", justify="right")
+    if baseline is not None:
+        table.add_column("vs Baseline", justify="right")
+
+    for r in results:
+        cells = [r["benchmark"], f"{r['rows']:,}", f"{r['cold_seconds']:.4f}", f"{r['best_seconds']:.4f}",
+                 f"{r['peak_memory_bytes'] / 1024 / 1024:.1f} MB", f"{r['rows_per_second'] or 0:,}"]
+        if baseline is not None:
+            before = previous.get((r["benchmark"], r["rows"]))
+            if before and before["best_seconds"] > 0:
+                change = (r["best_seconds"] - before["best_seconds"]) / before["best_seconds"] * 100
+                color = "red" if change > 10 else "green" if change < -10 else "white"
+                cells.append(f"[{color}]{change:+.1f}%[/{color}]")
+            else:
+                cells.append("-")
+        table.add_row(*cells)
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="ledger sizes to benchmark (default: 10000 1000000; 10000000 for the largest run)")
+    parser.add_argument("--repeat", type=int, default=3, help="warm runs per entry point (default: 3)")
+    parser.add_argument("--storage", choices=["csv", "sqlite", "binary"], default="csv", help="storage backend (default: csv)")
+    parser.add_argument("--daemon", action="store_true", help="time the entry points as clients of a ledger daemon")
+    parser.add_argument("--seed", type=int, default=42, help="ledger generator seed (default: 42)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    os.environ[STORAGE_ENV] = args.storage
+    _silence_output()
+
+    results = []
+    for rows in args.rows:
+        results.extend(run_size(rows, args.repeat, args.storage, args.seed, args.daemon))
+
+    commit = _git_commit()
+    run = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage": args.storage,
+        "daemon": args.daemon,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(run, f, indent=4)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    console.print(f"[green]Results written to {output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""Non-interactive commands for scripts and scheduled jobs; results go to stdout as JSON or CSV.
+
+    python cli.py add expense 12.50 Food --description "Lunch"
+    python cli.py add --file rows.csv
+    python cli.py import statement.csv
+    python cli.py balance --month 2024-05
+    python cli.py budgets --format csv
+    python cli.py budgets --history 24
+    python cli.py report
+    python cli.py trends --months 24
+    python cli.py search "coffee shop" --limit 50
+    python cli.py export --format jsonl --start 2024-01-01 > transactions.jsonl
+    python cli.py ledgers add household
+    python cli.py --ledger household balance
+    python cli.py consolidated --month 2024-05
+    python cli.py daemon start &
+    python cli.py convert binary
+
+Amounts in output and batch files are in cents, as in the ledger. Each
+command imports only the modules it needs, so a call starts much faster than
+the interactive menu in main.py. Errors go to stderr with exit status 1.
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import date, datetime
+
+OUTPUT_FORMATS = ["json", "csv"]
+
+
+class CommandError(Exception):
+    """A problem with the command's input, reported without a traceback."""
+
+
+def _month(value):
+    try:
+        return datetime.strptime(value, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid month '{value}', expected YYYY-MM")
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+
+def _emit(data, fmt, columns):
+    """Writes a dict or a list of dicts to stdout as JSON or CSV (with a header row)."""
+    if fmt == "json":
+        json.dump(data, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    writer = csv.DictWriter(sys.stdout, columns, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    writer.writerows([data] if isinstance(data, dict) else data)
+
+
+def _validate(rows, first_row=1):
+    """Normalizes [date, type, category, description, amount in cents] rows or raises CommandError."""
+    from features.data_management.importer import MAX_REPORTED_ERRORS, validate_chunk
+
+    valid, errors = validate_chunk((first_row, rows))
+    if errors:
+        raise CommandError("\n".join(errors[:MAX_REPORTED_ERRORS]))
+    return valid
+
+
+def command_add(args):
+    """Appends one transaction, or every row of a batch file in a single write, and reports budget alerts."""
+    from features.budgets.status import record_expenses
+
+    if args.file:
+        if args.type or args.amount or args.category:
+            raise CommandError("give either --file or TYPE AMOUNT CATEGORY, not both")
+        if args.file == "-":
+            rows = [row for row in csv.reader(sys.stdin) if row]
+        else:
+            with open(args.file, "r", newline="", encoding="utf-8") as f:
+                rows = [row for row in csv.reader(f) if row]
+    else:
+        if not (args.type and args.amount and args.category):
+            raise CommandError("add needs TYPE AMOUNT CATEGORY, or --file")
+        try:
+            amount = round(float(args.amount) * 100)
+        except ValueError:
+            raise CommandError(f"invalid amount '{args.amount}'")
+        rows = [[args.date or date.today().isoformat(), args.type, args.category, args.description, str(amount)]]
+
+    rows = _validate(rows)
+    alerts = record_expenses(rows) if rows else []
+    _emit({"added": len(rows), "alerts": [alert.message for alert in alerts]}, args.format, ["added"])
+
+
+def command_import(args):
+    """Imports a CSV file, skipping rows the ledger already holds."""
+    from features.data_management.importer import import_file
+
+    result = import_file(args.path, workers=args.workers)
+    if result.errors:
+        raise CommandError("\n".join(result.errors))
+    _emit({"rows_read": result.rows_read, "imported": result.imported, "duplicates": result.duplicates,
+           "seconds": round(result.seconds, 3)},
+          args.format, ["rows_read", "imported", "duplicates", "seconds"])
+
+
+def command_balance(args):
+    """Prints income, expenses and balance for a month (default: the current one)."""
+    from features.data.provider import get_month_summary
+
+    month = args.month or date.today().strftime("%Y-%m")
+    total_income, total_expense, _, _ = get_month_summary(month)
+    _emit({"month": month, "income": total_income, "expenses": total_expense,
+           "balance": total_income - total_expense},
+          args.format, ["month", "income", "expenses", "balance"])
+
+
+BUDGET_COLUMNS = ["category", "period", "start", "end", "budget", "carried", "spent", "remaining",
+                  "utilization", "status"]
+
+
+def _budget_records(statuses):
+    return [{"category": s.category, "period": s.period, "start": s.start.isoformat(), "end": s.end.isoformat(),
+             "budget": s.budget, "carried": s.carried, "spent": s.spent, "remaining": s.remaining,
+             "utilization": round(s.utilization, 2), "status": s.status} for s in statuses]
+
+
+def command_budgets(args):
+    """Prints each budget's status for its period containing the day, or for every period of the last months."""
+    from features.budgets.status import budget_history, current_budget_statuses
+
+    if args.history:
+        history = budget_history(args.history, _report_day(args.month))
+        _emit(_budget_records(s for statuses in history.values() for s in statuses), args.format, BUDGET_COLUMNS)
+        return
+    _emit(_budget_records(current_budget_statuses(_report_day(args.month))), args.format, BUDGET_COLUMNS)
+
+
+def _report_day(month):
+    """The day a month's report is computed as of: today for the current month, else its last day."""
+    from features.analytics.report import month_period
+
+    today = date.today()
+    if month is None or month == today.strftime("%Y-%m"):
+        return today
+    return month_period(datetime.strptime(month, "%Y-%m").date()).end
+
+
+def command_report(args):
+    """Prints the financial report for a month compared with the month before."""
+    from features.analytics.report import build_financial_report
+
+    report = build_financial_report(_report_day(args.month))
+    current, previous = report.current, report.previous
+    data = {
+        "month": current.period.label,
+        "income": current.total_income,
+        "expenses": current.total_expense,
+        "savings": current.savings,
+        "savings_rate": round(current.savings_rate, 2),
+        "avg_daily_expense": round(report.avg_daily_expense),
+        "previous_month": previous.period.label,
+        "income_change": report.income_change,
+        "expense_change": report.expense_change,
+        "health_score": report.health_score,
+    }
+    if args.format == "csv":
+        _emit(data, args.format, list(data))
+        return
+
+    data.update({
+        "spending_by_category": dict(current.spending_by_category),
+        "income_by_source": dict(current.income_by_source),
+        "category_trends": report.category_trends,
+        "budgets": _budget_records(report.budget_statuses),
+        "recommendations": report.recommendations,
+    })
+    _emit(data, args.format, list(data))
+
+
+def command_trends(args):
+    """Prints month-by-month totals, rolling averages and year-over-year change."""
+    from features.analytics.trends import build_trend_report
+
+    report = build_trend_report(args.months)
+    columns = ["month", "income", "expenses", "savings", "savings_rate", "income_avg", "expenses_avg",
+               "expenses_last_year", "expenses_yoy_pct"]
+    records = []
+    for month, row in report.totals.iterrows():
+        record = {"month": month}
+        for column in columns[1:]:
+            value = row[column]
+            # Months without a year-earlier value have no comparison.
+            record[column] = None if value != value else round(float(value), 2)
+        for column in ("income", "expenses", "savings", "expenses_last_year"):
+            if record[column] is not None:
+                record[column] = int(record[column])
+        if args.format == "json":
+            record["categories"] = {c: int(v) for c, v in report.categories.loc[month].items()}
+        records.append(record)
+    _emit(records, args.format, columns)
+
+
+def command_search(args):
+    """Prints the transactions matching a free-text query, best matches first."""
+    from features.data_management.exporter import TRANSACTION_COLUMNS
+    from features.data.provider import search_transactions
+
+    total, transactions = search_transactions(args.query, args.offset, args.limit)
+    transactions = [t.as_dict() for t in transactions]
+    if args.format == "json":
+        _emit({"total": total, "offset": args.offset, "transactions": transactions}, args.format, [])
+        return
+    _emit(transactions, args.format, TRANSACTION_COLUMNS)
+
+
+def command_export(args):
+    """Streams transactions to stdout."""
+    from features.data_management.exporter import TRANSACTION_COLUMNS, write_records
+    from features.data.provider import iter_transactions
+
+    fmt = {"csv": "CSV", "json": "JSON", "jsonl": "JSON Lines"}[args.format]
+    records = (t.as_dict() for t in iter_transactions(start=args.start, end=args.end, type=args.type))
+    write_records(sys.stdout, fmt, records, TRANSACTION_COLUMNS)
+    if fmt == "JSON":
+        sys.stdout.write("\n")
+
+
+def command_ledgers(args):
+    """Lists the ledgers, or adds or removes one."""
+    from features.data.ledgers import add_ledger, list_ledgers, remove_ledger
+
+    if args.action != "list" and not args.name:
+        raise CommandError(f"ledgers {args.action} needs a NAME")
+    try:
+        if args.action == "add":
+            add_ledger(args.name, args.root)
+        elif args.action == "remove":
+            remove_ledger(args.name)
+    except ValueError as e:
+        raise CommandError(str(e))
+    _emit([{"ledger": name, "root": root} for name, root in list_ledgers().items()],
+          args.format, ["ledger", "root"])
+
+
+def command_consolidated(args):
+    """Prints one month's totals for every ledger and across all of them."""
+    from features.analytics.consolidated import build_consolidated_report
+
+    report = build_consolidated_report(_report_day(args.month), workers=args.workers)
+    records = [{"ledger": name, "income": s.total_income, "expenses": s.total_expense, "savings": s.savings}
+               for name, s in [*report.ledgers.items(), ("all", report.total)]]
+    if args.format == "json":
+        for record, summary in zip(records, [*report.ledgers.values(), report.total]):
+            record["spending_by_category"] = dict(summary.spending_by_category)
+        _emit({"month": report.total.period.label, "ledgers": records}, args.format, [])
+        return
+    _emit(records, args.format, ["ledger", "income", "expenses", "savings"])
+
+
+def command_daemon(args):
+    """Serves the ledger from a long-lived process, or reports on or stops the one running."""
+    from features.data.daemon import daemon_status, serve, stop_daemon
+
+    if args.action == "start":
+        try:
+            serve(on_ready=lambda path: print(f"serving on {path}", file=sys.stderr, flush=True))
+        except RuntimeError as e:
+            raise CommandError(str(e))
+    elif args.action == "stop":
+        _emit({"stopped": stop_daemon()}, args.format, ["stopped"])
+    else:
+        status = daemon_status()
+        _emit({"running": status is not None, **(status or {})}, args.format, ["running", "pid", "ledger", "rows"])
+
+
+def command_convert(args):
+    """Converts the ledger's transactions to the binary format or back to CSV."""
+    from features.data.storage import convert_binary_to_csv, convert_csv_to_binary, storage_name
+
+    source = {"binary": "csv", "csv": "binary"}[args.target]
+    if storage_name() != source:
+        raise CommandError(f"the ledger uses the {storage_name()} backend; only a {source} ledger "
+                           f"converts to {args.target}")
+    convert = convert_csv_to_binary if args.target == "binary" else convert_binary_to_csv
+    try:
+        count = convert()
+    except ValueError as e:
+        raise CommandError(str(e))
+    _emit({"converted": count, "storage": args.target}, args.format, ["converted", "storage"])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instrument", action="store_true",
+                        help="record timings and write them to stderr as JSON when done")
+    parser.add_argument("--ledger", help="ledger to use (default: $FINANCE_TRACKER_LEDGER or 'default')")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+    add = commands.add_parser("add", help="add a transaction, or a batch of them from a CSV file")
+    add.add_argument("type", nargs="?", type=str.lower, choices=["expense", "income"], help="expense or income")
+    add.add_argument("amount", nargs="?", help="amount, e.g. 12.50")
+    add.add_argument("category", nargs="?", help="category, e.g. Food")
+    add.add_argument("--description", default="", help="description (default: empty)")
+    add.add_argument("--date", type=_date, help="date, YYYY-MM-DD (default: today)")
+    add.add_argument("--file", help="CSV of date,type,category,description,amount_in_cents rows ('-' for stdin)")
+    add.set_defaults(handler=command_add)
+
+    import_ = commands.add_parser("import", help="import a CSV file, skipping rows already in the ledger")
+    import_.add_argument("path", help="CSV of date,type,category,description,amount_in_cents rows")
+    import_.add_argument("--workers", type=int, help="validation processes (default: one per CPU)")
+    import_.set_defaults(handler=command_import)
+
+    balance = commands.add_parser("balance", help="income, expenses and balance for a month")
+    balance.add_argument("--month", type=_month, help="YYYY-MM (default: current month)")
+    balance.set_defaults(handler=command_balance)
+
+    budgets = commands.add_parser("budgets", help="budget status for the current periods, or their history")
+    budgets.add_argument("--month", type=_month, help="as of the end of YYYY-MM (default: today)")
+    budgets.add_argument("--history", type=int, metavar="MONTHS", help="every budget period of the last MONTHS")
+    budgets.set_defaults(handler=command_budgets)
+
+    report = commands.add_parser("report", help="financial report for a month")
+    report.add_argument("--month", type=_month, help="YYYY-MM (default: current month)")
+    report.set_defaults(handler=command_report)
+
+    trends = commands.add_parser("trends", help="monthly trends with rolling averages and year-over-year change")
+    trends.add_argument("--months", type=int, default=12, help="months to show (default: 12)")
+    trends.set_defaults(handler=command_trends)
+
+    search = commands.add_parser("search", help="search descriptions and categories, best matches first")
+    search.add_argument("query", help="words to look for; each matches words starting with it")
+    search.add_argument("--limit", type=int, default=20, help="matches to print (default: 20)")
+    search.add_argument("--offset", type=int, default=0, help="matches to skip first (default: 0)")
+    search.set_defaults(handler=command_search)
+
+    ledgers = commands.add_parser("ledgers", help="list the ledgers, or add or remove one")
+    ledgers.add_argument("action", nargs="?", choices=["list", "add", "remove"], default="list")
+    ledgers.add_argument("name", nargs="?", help="ledger to add or remove")
+    ledgers.add_argument("--root", help="data directory for an added ledger (default: ledgers/NAME)")
+    ledgers.set_defaults(handler=command_ledgers)
+
+    consolidated = commands.add_parser("consolidated", help="one month's totals per ledger and across all ledgers")
+    consolidated.add_argument("--month", type=_month, help="YYYY-MM (default: current month)")
+    consolidated.add_argument("--workers", type=int, help="ledgers summarized in parallel (default: one per CPU)")
+    consolidated.set_defaults(handler=command_consolidated)
+
+    daemon = commands.add_parser("daemon", help="serve the ledger to other commands and the dashboard from memory")
+    daemon.add_argument("action", nargs="?", choices=["start", "status", "stop"], default="status")
+    daemon.set_defaults(handler=command_daemon)
+
+    convert = commands.add_parser("convert", help="convert the ledger to the binary format, or back to CSV")
+    convert.add_argument("target", choices=["binary", "csv"], help="format to convert to")
+    convert.set_defaults(handler=command_convert)
+
+    for command in (add, import_, balance, budgets, report, trends, search, ledgers, consolidated, daemon, convert):
+        command.add_argument("--format", choices=OUTPUT_FORMATS, default="json", help="output format (default: json)")
+
+    export = commands.add_parser("export", help="stream transactions to stdout")
+    export.add_argument("--format", choices=["csv", "json", "jsonl"], default="csv", help="output format (default: csv)")
+    export.add_argument("--start", type=_date, help="first date, YYYY-MM-DD")
+    export.add_argument("--end", type=_date, help="last date, YYYY-MM-DD")
+    export.add_argument("--type", type=str.lower, choices=["expense", "income"], help="only this type")
+    export.set_defaults(handler=command_export)
+    return parser
+
+
+def _use_ledger(name):
+    from features.data.ledgers import set_active_ledger
+
+    try:
+        set_active_ledger(name)
+    except ValueError as e:
+        raise CommandError(str(e))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.instrument:
+        from features.data.instrumentation import enable, stats_json
+        enable()
+
+    try:
+        if args.ledger:
+            _use_ledger(args.ledger)
+        args.handler(args)
+    except (CommandError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.instrument:
+            print(stats_json(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
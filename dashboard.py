@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from features.data.provider import get_all_transactions, get_budgets, get_monthly_spending
+from features.data.provider import get_recent_transactions, get_ledger_version, search_transactions
+from features.analytics.report import build_financial_report
+from features.data.instrumentation import is_enabled as is_instrumentation_enabled, get_stats, stats_json, histogram_labels
 from features.transactions.transactions import add_expense_from_streamlit, EXPENSE_CATEGORIES, add_income_from_streamlit, INCOME_CATEGORIES
 
+# Matches shown per page of transaction search results
+SEARCH_PAGE_SIZE = 25
+
 
 # --- Streamlit App ---
 
@@ -38,15 +43,22 @@ st.markdown(f"_Report for {datetime.now().strftime('%B %Y')}_")
 
 
 # --- Data Preparation ---
-transactions = get_all_transactions()
-budgets = get_budgets()
-monthly_spending = get_monthly_spending()
+# Streamlit reruns this script on every interaction. The prepared data is
+# cached across sessions and keyed on the ledger version, so a rerun only
+# recomputes it after the transactions or budgets actually changed.
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_dashboard_data(ledger_version, today):
+    return {
+        "report": build_financial_report(today),
+        "recent_transactions": get_recent_transactions(10),
+    }
+
 
-current_month_str = datetime.now().strftime("%Y-%m")
-current_month_transactions = [t for t in transactions if t['date'].startswith(current_month_str)]
+data = load_dashboard_data(get_ledger_version(), datetime.now().date())
+report = data["report"]
 
-total_income = sum(t['amount'] for t in current_month_transactions if t['type'] == 'Income') / 100
-total_expense = sum(t['amount'] for t in current_month_transactions if t['type'] == 'Expense') / 100
+total_income = report.current.total_income / 100
+total_expense = report.current.total_expense / 100
 current_balance = total_income - total_expense
 
 
@@ -56,21 +68,22 @@ col1, col2, col3 = st.columns(3)
 col1.metric("Total Income", f"${total_income:,.2f}", delta_color="normal")
 col2.metric("Total Expenses", f"${total_expense:,.2f}", delta_color="inverse")
 col3.metric("Current Balance", f"${current_balance:,.2f}")
+col1, col2 = st.columns(2)
+col1.metric("Savings Rate", f"{report.current.savings_rate:.1f}%")
+col2.metric("Financial Health Score", f"{report.health_score:.0f}/100")
 
 
 # --- Budget Status Section ---
 st.header("Budget Status")
-if not budgets:
+if not report.budgets:
     st.info("No budgets set. Use the CLI to set a budget.")
 else:
-    for category, budget_cents in budgets.items():
-        budget_amount = budget_cents / 100
-        spent_cents = monthly_spending.get(category, 0)
-        spent_amount = spent_cents / 100
+    for budget_status in report.budget_statuses:
+        budget_amount = budget_status.budget / 100
+        spent_amount = budget_status.spent / 100
+        utilization = budget_status.utilization
         
-        utilization = (spent_amount / budget_amount) * 100 if budget_amount > 0 else 0
-        
-        st.markdown(f"**{category}**")
+        st.markdown(f"**{budget_status.category}** ({budget_status.label})")
         col1, col2 = st.columns([3, 1])
         with col1:
             st.progress(min(int(utilization), 100))
@@ -91,6 +104,7 @@ with st.form("new_expense_form", clear_on_submit=True):
     submitted = st.form_submit_button("Add Expense")
     if submitted:
         message = add_expense_from_streamlit(amount, category, description, date)
+        load_dashboard_data.clear()
         st.success(message)
         st.rerun()
 
@@ -110,26 +124,22 @@ with st.form("new_income_form", clear_on_submit=True):
     submitted_income = st.form_submit_button("Add Income")
     if submitted_income:
         message_income = add_income_from_streamlit(amount_income, category_income, description_income, date_income)
+        load_dashboard_data.clear()
         st.success(message_income)
         st.rerun()
 
 # --- Recent Transactions Table ---
-st.header("Recent Transactions")
-if not transactions:
-    st.info("No transactions found.")
-else:
-    # Sort transactions by date (newest first) and take the last 10
-    recent_transactions = sorted(transactions, key=lambda t: t['date'], reverse=True)[:10]
-    
+def show_transactions(transactions):
+    """Shows transactions as a table, expenses in red and income in green."""
     # Prepare data for display
     display_data = []
-    for t in recent_transactions:
-        amount_display = f"${t['amount'] / 100:,.2f}"
+    for t in transactions:
+        amount_display = f"${t.amount / 100:,.2f}"
         display_data.append({
-            "Date": t['date'],
-            "Type": t['type'],
-            "Category": t['category'],
-            "Description": t['description'],
+            "Date": t.date,
+            "Type": t.type,
+            "Category": t.category,
+            "Description": t.description,
             "Amount": amount_display
         })
 
@@ -143,6 +153,36 @@ else:
     st.dataframe(df.style.apply(style_rows, axis=1), use_container_width=True, hide_index=True)
 
 
+st.header("Recent Transactions")
+recent_transactions = data["recent_transactions"]
+if not recent_transactions:
+    st.info("No transactions found.")
+else:
+    show_transactions(recent_transactions)
+
+
+# --- Transaction Search ---
+@st.cache_data(show_spinner=False, max_entries=32)
+def load_search_results(ledger_version, query, page):
+    return search_transactions(query, page * SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE)
+
+
+st.header("Search Transactions")
+search_query = st.text_input("Search descriptions and categories", placeholder="e.g. coffee, groc")
+if search_query.strip():
+    search_total, _ = load_search_results(get_ledger_version(), search_query, 0)
+    if not search_total:
+        st.info(f"No transactions match '{search_query}'.")
+    else:
+        search_pages = (search_total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+        search_page = 0
+        if search_pages > 1:
+            search_page = st.number_input("Page", min_value=1, max_value=search_pages, value=1) - 1
+        _, search_results = load_search_results(get_ledger_version(), search_query, search_page)
+        st.caption(f"{search_total} matches, best first (page {search_page + 1} of {search_pages})")
+        show_transactions(search_results)
+
+
 # --- Data Management Section ---
 st.header("Data Management")
 
@@ -152,7 +192,33 @@ with st.expander("Clear All Data"):
     if st.button("I understand, clear all data"):
         from features.data_management.data_manager import reset_streamlit_data
         if reset_streamlit_data():
+            load_dashboard_data.clear()
             st.success("All data has been successfully cleared.")
             st.rerun()
         else:
             st.error("An error occurred while clearing the data.")
+
+
+# --- Performance Stats ---
+# Shown when the dashboard runs with FINANCE_TRACKER_INSTRUMENT=1 (or is launched from 'main.py --instrument').
+if is_instrumentation_enabled():
+    st.header("Performance Stats")
+    stats = get_stats()
+    if not stats:
+        st.info("No operations recorded yet.")
+    else:
+        stats_df = pd.DataFrame([{
+            "Kind": s["kind"],
+            "Operation": s["operation"],
+            "Calls": s["calls"],
+            "Avg ms": round(s["avg_ms"], 2),
+            "Max ms": round(s["max_ms"], 2),
+            "Total ms": round(s["total_ms"], 1),
+            "Self ms": round(s["self_ms"], 1),
+            "Rows": s["rows_scanned"],
+            "Bytes Read": s["bytes_read"],
+            " / ".join(histogram_labels()): " / ".join(str(c) for c in s["histogram"].values()),
+        } for s in stats])
+        st.dataframe(stats_df, use_container_width=True, hide_index=True)
+        st.download_button("Download as JSON", stats_json(), file_name="performance_stats.json",
+                           mime="application/json")
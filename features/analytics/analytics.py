@@ -1,8 +1,10 @@
-from datetime import datetime, timedelta
+import questionary
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
-from features.data.provider import get_transactions_for_month, get_budgets, calculate_monthly_summary
+from datetime import datetime
+from features.analytics.report import build_financial_report, quarter_period, year_period
+from features.data.instrumentation import instrumented
 
 console = Console()
 
@@ -31,72 +33,57 @@ def create_pie_chart(data, title="Distribution"):
 
 def generate_financial_report():
     """Generates a comprehensive financial report for the current month."""
-    current_month_str = datetime.now().strftime("%Y-%m")
-    previous_month_str = (datetime.now().replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+    today = datetime.now().date()
+    render_financial_report(build_financial_report(today, [quarter_period(today), year_period(today)]))
 
-    # Get data
-    current_month_transactions = get_transactions_for_month(current_month_str)
-    previous_month_transactions = get_transactions_for_month(previous_month_str)
-    budgets = get_budgets()
 
-    (current_income, current_expense, current_spending_by_category,
-     current_income_by_source) = calculate_monthly_summary(current_month_transactions)
+@instrumented("render")
+def render_financial_report(report):
+    """Prints a FinancialReport with rich."""
+    current = report.current
+    previous_month_str = report.previous.period.label
 
-    (prev_income, prev_expense, prev_spending_by_category,
-     prev_income_by_source) = calculate_monthly_summary(previous_month_transactions)
-
-    console.print(Panel(f"[bold green]Financial Report for {datetime.now().strftime('%B %Y')}[/bold green]",
+    console.print(Panel(f"[bold green]Financial Report for {current.period.start.strftime('%B %Y')}[/bold green]",
                         expand=False))
 
     # --- Income Summary ---
     console.print(Panel("[bold cyan]Income Summary[/bold cyan]", expand=False))
-    console.print(f"Total Income this month: [green]{current_income / 100:.2f}[/green]")
-    income_diff = current_income - prev_income
+    console.print(f"Total Income this month: [green]{current.total_income / 100:.2f}[/green]")
+    income_diff = report.income_change
     income_trend = "[green]Up[/green]" if income_diff >= 0 else "[red]Down[/red]"
     console.print(f"Vs last month ({previous_month_str}): {income_diff / 100:.2f} ({income_trend})")
     
-    if current_income_by_source:
+    if current.income_by_source:
         table = Table("Source", "Amount")
-        for source, amount in current_income_by_source.items():
+        for source, amount in current.income_by_source.items():
             table.add_row(source, f"{amount / 100:.2f}")
         console.print(table)
 
 
     # --- Expense Summary ---
     console.print(Panel("[bold cyan]Expense Summary[/bold cyan]", expand=False))
-    console.print(f"Total Expenses this month: [red]{current_expense / 100:.2f}[/red]")
-    expense_diff = current_expense - prev_expense
+    console.print(f"Total Expenses this month: [red]{current.total_expense / 100:.2f}[/red]")
+    expense_diff = report.expense_change
     expense_trend = "[red]Up[/red]" if expense_diff >= 0 else "[green]Down[/green]"
     console.print(f"Vs last month ({previous_month_str}): {expense_diff / 100:.2f} ({expense_trend})")
 
-    avg_daily_expense = current_expense / datetime.now().day if datetime.now().day > 0 else 0
-    console.print(f"Average daily expense: [yellow]{avg_daily_expense / 100:.2f}[/yellow]")
+    console.print(f"Average daily expense: [yellow]{report.avg_daily_expense / 100:.2f}[/yellow]")
     
-    console.print(create_pie_chart(current_spending_by_category, "Spending by Category"))
+    console.print(create_pie_chart(current.spending_by_category, "Spending by Category"))
 
     # Top 3 spending categories
-    if current_spending_by_category:
-        top_spending = sorted(current_spending_by_category.items(), key=lambda item: item[1], reverse=True)[:3]
+    if current.spending_by_category:
         console.print("\n[bold]Top 3 Spending Categories:[/bold]")
-        for category, amount in top_spending:
+        for category, amount in current.top_spending(3):
             console.print(f"- {category}: {amount / 100:.2f}")
 
     # --- Budget Adherence ---
     console.print(Panel("[bold cyan]Budget Adherence[/bold cyan]", expand=False))
-    budget_adherence_score_factor = 0
-    over_budget_categories = []
-    if budgets:
-        for category, budgeted_amount in budgets.items():
-            spent = current_spending_by_category.get(category, 0)
-            if spent > budgeted_amount:
-                over_budget_categories.append(category)
-            
-        if not over_budget_categories:
+    if report.budgets:
+        if not report.over_budget_categories:
             console.print("[green]Excellent! You are within all your budgets.[/green]")
-            budget_adherence_score_factor = 1 # Full points
         else:
-            console.print(f"[red]Warning! You are over budget in: {', '.join(over_budget_categories)}[/red]")
-            budget_adherence_score_factor = 0.5 # Partial points for being over in some
+            console.print(f"[red]Warning! You are over budget in: {', '.join(report.over_budget_categories)}[/red]")
 
         console.print("[yellow]Review 'View Budgets' for detailed breakdown.[/yellow]")
     else:
@@ -105,37 +92,20 @@ def generate_financial_report():
 
     # --- Savings Analysis ---
     console.print(Panel("[bold cyan]Savings Analysis[/bold cyan]", expand=False))
-    monthly_savings = current_income - current_expense
-    console.print(f"Monthly Savings: {monthly_savings / 100:.2f}")
+    console.print(f"Monthly Savings: {current.savings / 100:.2f}")
+    console.print(f"Savings Rate: [green]{current.savings_rate:.2f}%[/green]")
 
-    savings_rate = (monthly_savings / current_income) * 100 if current_income > 0 else 0
-    console.print(f"Savings Rate: [green]{savings_rate:.2f}%[/green]")
+    if report.extra:
+        console.print("\n[bold]Longer Periods:[/bold]")
+    for summary in report.extra:
+        console.print(f"- {summary.period.label}: income {summary.total_income / 100:.2f}, "
+                      f"expenses {summary.total_expense / 100:.2f}, savings rate {summary.savings_rate:.2f}%")
 
 
     # --- Financial Health Score ---
     console.print(Panel("[bold cyan]Financial Health Score[/bold cyan]", expand=False))
-    score = 0
-    recommendations = []
-
-    # Savings rate (30 points)
-    if savings_rate >= 20:
-        score += 30
-    elif savings_rate >= 10:
-        score += 15
-    else:
-        recommendations.append("Increase your savings rate. Aim for at least 10-20% of your income.")
-
-    # Budget adherence (25 points)
-    budget_adherence_points = budget_adherence_score_factor * 25
-    score += budget_adherence_points
-    if budget_adherence_score_factor < 1 and budgets:
-        recommendations.append("Review your budget adherence and try to stick to your spending limits.")
-
-    # Income vs expenses (25 points)
-    if current_income > current_expense:
-        score += 25
-    else:
-        recommendations.append("Your expenses are matching or exceeding your income. Look for ways to reduce spending or increase income.")
+    score = report.health_score
+    recommendations = report.recommendations
 
     console.print(f"[bold]Overall Financial Health Score: [cyan]{score:.0f}/100[/cyan][/bold]")
     
@@ -151,4 +121,108 @@ def generate_financial_report():
         for rec in recommendations:
             console.print(f"- {rec}")
     else:
-        console.print("\n[green]No specific recommendations at this time. Keep up the good work![/green]")
\ No newline at end of file
+        console.print("\n[green]No specific recommendations at this time. Keep up the good work![/green]")
+
+
+# Window sizes offered by view_trends().
+TREND_WINDOWS = {"Last 12 months": 12, "Last 24 months": 24, "Last 5 years": 60}
+
+
+def view_trends():
+    """Shows monthly income, spending and savings trends with per-category changes."""
+    choice = questionary.select("Trend period:", choices=[*TREND_WINDOWS, "Back"]).ask()
+    if choice not in TREND_WINDOWS:
+        return
+    # pandas is only loaded when trends are asked for.
+    from features.analytics.trends import build_trend_report, ROLLING_MONTHS
+    try:
+        render_trend_report(build_trend_report(TREND_WINDOWS[choice]), ROLLING_MONTHS)
+    except Exception as e:
+        console.print(f"[bold red]An error occurred: {e}[/bold red]")
+
+
+def _change(value):
+    """Formats a change in spending (cents): increases in red, decreases in green."""
+    if value != value:  # NaN: no earlier month to compare with
+        return "-"
+    color = "red" if value > 0 else "green" if value < 0 else "white"
+    return f"[{color}]{value / 100:+.2f}[/{color}]"
+
+
+@instrumented("render")
+def render_trend_report(report, rolling):
+    """Prints a TrendReport with rich."""
+    totals = report.totals
+    table = Table(title=f"Monthly Trends ({report.months[0]} to {report.months[-1]})")
+    table.add_column("Month", style="cyan")
+    table.add_column("Income", justify="right", style="green")
+    table.add_column("Expenses", justify="right", style="red")
+    table.add_column("Savings", justify="right")
+    table.add_column("Savings Rate", justify="right")
+    table.add_column(f"{rolling}-mo Avg Expenses", justify="right")
+    table.add_column("Expenses YoY", justify="right")
+
+    for month, row in totals.iterrows():
+        yoy = row["expenses_yoy_pct"]
+        table.add_row(
+            month,
+            f"{row['income'] / 100:.2f}",
+            f"{row['expenses'] / 100:.2f}",
+            f"{row['savings'] / 100:.2f}",
+            f"{row['savings_rate']:.1f}%",
+            f"{row['expenses_avg'] / 100:.2f}",
+            "-" if yoy != yoy else f"{yoy:+.1f}%",
+        )
+    console.print(table)
+
+    if report.categories.empty:
+        return
+    latest = report.months[-1]
+    previous = report.months[-2] if len(report.months) > 1 else "-"
+    table = Table(title=f"Spending by Category ({latest})")
+    table.add_column("Category", style="cyan")
+    table.add_column("This Month", justify="right")
+    table.add_column(f"Change vs {previous}", justify="right")
+    table.add_column("Monthly Average", justify="right")
+    averages = report.categories.mean()
+    for category in report.categories.columns:
+        table.add_row(
+            category,
+            f"{report.categories.at[latest, category] / 100:.2f}",
+            _change(report.category_change.at[latest, category]),
+            f"{averages[category] / 100:.2f}",
+        )
+    console.print(table)
+
+
+def generate_consolidated_report():
+    """Shows this month's totals for every ledger and all of them combined."""
+    from features.analytics.consolidated import build_consolidated_report
+    try:
+        render_consolidated_report(build_consolidated_report(datetime.now().date()))
+    except Exception as e:
+        console.print(f"[bold red]An error occurred: {e}[/bold red]")
+
+
+@instrumented("render")
+def render_consolidated_report(report):
+    """Prints a ConsolidatedReport with rich."""
+    total = report.total
+    table = Table(title=f"Consolidated Report for {total.period.start.strftime('%B %Y')}")
+    table.add_column("Ledger", style="cyan")
+    table.add_column("Income", justify="right", style="green")
+    table.add_column("Expenses", justify="right", style="red")
+    table.add_column("Savings", justify="right")
+    table.add_column("Savings Rate", justify="right")
+    for name, summary in [*report.ledgers.items(), ("All ledgers", total)]:
+        table.add_row(
+            f"[bold]{name}[/bold]" if summary is total else name,
+            f"{summary.total_income / 100:.2f}",
+            f"{summary.total_expense / 100:.2f}",
+            f"{summary.savings / 100:.2f}",
+            f"{summary.savings_rate:.1f}%",
+        )
+    console.print(table)
+
+    console.print(create_pie_chart(total.spending_by_category, "Combined Spending"))
+    console.print(f"[dim]{len(report.ledgers)} ledgers summarized in {report.seconds:.2f}s.[/dim]")
@@ -0,0 +1,65 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+
+from features.analytics.report import PeriodSummary, month_period, summarize_periods
+from features.data.instrumentation import instrumented
+from features.data.ledgers import list_ledgers, using_ledger
+from features.data.storage import reset_storage
+
+
+def summarize_ledger(task):
+    """Summarizes one ledger's month; runs in a worker process and returns (ledger, PeriodSummary)."""
+    ledger, day = task
+    with using_ledger(ledger):
+        return ledger, summarize_periods([month_period(day)])[0]
+
+
+def merge_summaries(period, summaries):
+    """Adds up PeriodSummary partials of the same period into one."""
+    merged = PeriodSummary(period)
+    for summary in summaries:
+        for category, amount in summary.income_by_source.items():
+            merged.add("Income", category, amount)
+        for category, amount in summary.spending_by_category.items():
+            merged.add("Expense", category, amount)
+    return merged
+
+
+@dataclass
+class ConsolidatedReport:
+    """One month across several ledgers: each ledger's summary and their sum."""
+    total: PeriodSummary
+    ledgers: dict
+    seconds: float
+
+
+@instrumented("aggregate")
+def build_consolidated_report(today=None, ledgers=None, workers=None):
+    """Builds the month containing today for every ledger (default: all registered) and merges them.
+
+    Ledgers are summarized in a process pool, one task per ledger, so the
+    report takes about as long as the slowest ledger when there are enough
+    CPUs. Each worker opens its own storage, from rollups or SQL aggregates.
+    """
+    started = time.perf_counter()
+    today = today or date.today()
+    ledgers = list(ledgers or list_ledgers())
+    workers = min(workers or os.cpu_count() or 1, len(ledgers))
+
+    tasks = [(ledger, today) for ledger in ledgers]
+    if workers <= 1:
+        results = [summarize_ledger(task) for task in tasks]
+    else:
+        # Storage handles (SQLite connections) inherited from this process must not be reused.
+        with ProcessPoolExecutor(max_workers=workers, initializer=reset_storage) as pool:
+            results = list(pool.map(summarize_ledger, tasks))
+
+    summaries = dict(results)
+    return ConsolidatedReport(
+        total=merge_summaries(month_period(today), summaries.values()),
+        ledgers=summaries,
+        seconds=time.perf_counter() - started,
+    )
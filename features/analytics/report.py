@@ -0,0 +1,239 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from features.budgets.status import current_budget_statuses
+from features.data.daemon import served
+from features.data.instrumentation import instrumented
+from features.data.provider import get_budgets, get_month_totals, iter_transactions
+from features.data.store import date_to_ordinal
+
+
+@dataclass(frozen=True)
+class Period:
+    """An inclusive date range a report covers."""
+    label: str
+    start: date
+    end: date
+
+    @property
+    def days(self):
+        return (self.end - self.start).days + 1
+
+    def months(self):
+        """Returns the YYYY-MM months the period spans."""
+        months = []
+        year, month = self.start.year, self.start.month
+        while (year, month) <= (self.end.year, self.end.month):
+            months.append(f"{year:04d}-{month:02d}")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
+
+    def is_whole_months(self):
+        return self.start.day == 1 and (self.end + timedelta(days=1)).day == 1
+
+
+def month_period(day):
+    """Returns the calendar month containing a day."""
+    start = day.replace(day=1)
+    next_start = (start + timedelta(days=32)).replace(day=1)
+    return Period(start.strftime("%Y-%m"), start, next_start - timedelta(days=1))
+
+
+def previous_month_period(day):
+    """Returns the calendar month before the one containing a day."""
+    return month_period(day.replace(day=1) - timedelta(days=1))
+
+
+def quarter_period(day):
+    """Returns the calendar quarter containing a day."""
+    quarter = (day.month - 1) // 3
+    start = date(day.year, quarter * 3 + 1, 1)
+    end = month_period(date(day.year, quarter * 3 + 3, 1)).end
+    return Period(f"{day.year}-Q{quarter + 1}", start, end)
+
+
+def year_period(day):
+    """Returns the calendar year containing a day."""
+    return Period(str(day.year), date(day.year, 1, 1), date(day.year, 12, 31))
+
+
+@dataclass
+class PeriodSummary:
+    """Income and spending totals (in cents) for one period."""
+    period: Period
+    total_income: int = 0
+    total_expense: int = 0
+    spending_by_category: dict = field(default_factory=lambda: defaultdict(int))
+    income_by_source: dict = field(default_factory=lambda: defaultdict(int))
+
+    @property
+    def savings(self):
+        return self.total_income - self.total_expense
+
+    @property
+    def savings_rate(self):
+        return (self.savings / self.total_income) * 100 if self.total_income > 0 else 0
+
+    def add(self, type_, category, amount):
+        if type_ == "Income":
+            self.total_income += amount
+            self.income_by_source[category] += amount
+        elif type_ == "Expense":
+            self.total_expense += amount
+            self.spending_by_category[category] += amount
+
+    def top_spending(self, limit=3):
+        return sorted(self.spending_by_category.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def split_period(period):
+    """Splits a period into the whole calendar months it covers and the leftover date ranges.
+
+    Each leftover (start, end) range lies within a single month.
+    """
+    months = []
+    ranges = []
+    day = period.start
+    while day <= period.end:
+        month = month_period(day)
+        last = min(month.end, period.end)
+        if day == month.start and last == month.end:
+            months.append(month.label)
+        else:
+            ranges.append((day.isoformat(), last.isoformat()))
+        day = last + timedelta(days=1)
+    return months, ranges
+
+
+@instrumented("aggregate")
+def summarize_periods(periods):
+    """Computes a PeriodSummary for each period in one pass over the data.
+
+    The whole calendar months in the periods are assembled from per-month
+    totals (rollups or SQL aggregates), fetching each month once no matter
+    how many periods share it. Only the rows of partially covered months are
+    read, each such month once.
+    """
+    summaries = [PeriodSummary(period) for period in periods]
+    month_totals = {}
+    partial = {}
+    for summary in summaries:
+        months, ranges = split_period(summary.period)
+        for month in months:
+            if month not in month_totals:
+                month_totals[month] = get_month_totals(month)
+            for type_, categories in month_totals[month].items():
+                for category, amount in categories.items():
+                    summary.add(type_, category, amount)
+        for first, last in ranges:
+            partial.setdefault(first[:7], []).append((summary, first, last))
+
+    for bounds in partial.values():
+        start = min(first for _, first, _ in bounds)
+        end = max(last for _, _, last in bounds)
+        ordinals = [(summary, date_to_ordinal(first), date_to_ordinal(last)) for summary, first, last in bounds]
+        for t in iter_transactions(start=start, end=end):
+            for summary, first, last in ordinals:
+                if first <= t.ordinal <= last:
+                    summary.add(t.type, t.category, t.amount)
+
+    return summaries
+
+
+@dataclass
+class FinancialReport:
+    """Everything the financial report shows, computed once and rendered separately."""
+    current: PeriodSummary
+    previous: PeriodSummary
+    extra: list
+    budgets: dict
+    budget_statuses: list
+    days_elapsed: int
+
+    @property
+    def income_change(self):
+        return self.current.total_income - self.previous.total_income
+
+    @property
+    def expense_change(self):
+        return self.current.total_expense - self.previous.total_expense
+
+    @property
+    def category_trends(self):
+        """Change in spending per category versus the previous period."""
+        current, previous = self.current.spending_by_category, self.previous.spending_by_category
+        return {c: current.get(c, 0) - previous.get(c, 0) for c in set(current) | set(previous)}
+
+    @property
+    def avg_daily_expense(self):
+        return self.current.total_expense / self.days_elapsed if self.days_elapsed > 0 else 0
+
+    @property
+    def over_budget_categories(self):
+        return [s.category for s in self.budget_statuses if s.is_over]
+
+    @property
+    def budget_adherence_factor(self):
+        if not self.budgets:
+            return 0
+        # Full points within every budget, partial points when over in some
+        return 0.5 if self.over_budget_categories else 1
+
+    @property
+    def health_score(self):
+        return score_financial_health(self)[0]
+
+    @property
+    def recommendations(self):
+        return score_financial_health(self)[1]
+
+
+def score_financial_health(report):
+    """Returns the 0-100 health score of a report and the recommendations behind it."""
+    score = 0
+    recommendations = []
+    summary = report.current
+
+    # Savings rate (30 points)
+    if summary.savings_rate >= 20:
+        score += 30
+    elif summary.savings_rate >= 10:
+        score += 15
+    else:
+        recommendations.append("Increase your savings rate. Aim for at least 10-20% of your income.")
+
+    # Budget adherence (25 points)
+    score += report.budget_adherence_factor * 25
+    if report.budget_adherence_factor < 1 and report.budgets:
+        recommendations.append("Review your budget adherence and try to stick to your spending limits.")
+
+    # Income vs expenses (25 points)
+    if summary.total_income > summary.total_expense:
+        score += 25
+    else:
+        recommendations.append("Your expenses are matching or exceeding your income. Look for ways to reduce spending or increase income.")
+
+    return score, recommendations
+
+
+@served("financial_report")
+@instrumented("aggregate")
+def build_financial_report(today=None, extra_periods=()):
+    """Builds the report for the month containing today, compared with the previous month.
+
+    extra_periods (e.g. quarter_period(today), year_period(today)) are
+    summarized in the same pass and exposed as report.extra.
+    """
+    today = today or datetime.now().date()
+    summaries = summarize_periods([month_period(today), previous_month_period(today), *extra_periods])
+    budgets = get_budgets()
+
+    return FinancialReport(
+        current=summaries[0],
+        previous=summaries[1],
+        extra=summaries[2:],
+        budgets=budgets,
+        budget_statuses=current_budget_statuses(today),
+        days_elapsed=today.day,
+    )
@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from features.data.daemon import served
+from features.data.instrumentation import instrumented
+from features.data.provider import (
+    get_month_snapshots, save_month_snapshots, get_month_store, get_transaction_store,
+)
+
+# Months averaged by the rolling columns of a trend report.
+ROLLING_MONTHS = 3
+
+# When more closed months than this lack a snapshot, they are summarized in
+# one pass over the whole ledger instead of reading them month by month.
+FULL_SCAN_MONTHS = 6
+
+SUMMARY_COLUMNS = ["month", "type", "category", "amount", "count"]
+
+
+def month_range(end_month, count):
+    """Returns the count YYYY-MM months ending with end_month, oldest first."""
+    year, month = (int(part) for part in end_month.split("-"))
+    index = year * 12 + month - 1
+    return [f"{i // 12:04d}-{i % 12 + 1:02d}" for i in range(index - count + 1, index + 1)]
+
+
+def summarize_store(store):
+    """Groups a TransactionStore into (month, type, category) totals and row counts."""
+    if not len(store):
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    # Few distinct dates, so months are formatted once per date, not per row.
+    ordinals, inverse = np.unique(store.dates, return_inverse=True)
+    months = np.array([date.fromordinal(o).strftime("%Y-%m") for o in ordinals.tolist()])
+    frame = pd.DataFrame({
+        "month": months[inverse],
+        "type": pd.Categorical.from_codes(store.type_codes, store.types),
+        "category": pd.Categorical.from_codes(store.category_codes, store.categories),
+        "amount": store.amounts,
+    })
+    summary = frame.groupby(["month", "type", "category"], observed=True)["amount"].agg(["sum", "size"])
+    summary = summary.reset_index().rename(columns={"sum": "amount", "size": "count"})
+    return summary.astype({"type": str, "category": str})
+
+
+def _snapshot_frame(snapshots, months):
+    records = [(month, *cell) for month in months for cell in snapshots[month]]
+    return pd.DataFrame.from_records(records, columns=SUMMARY_COLUMNS)
+
+
+@instrumented("aggregate")
+def monthly_totals(months, today=None):
+    """Returns a DataFrame of amount and row count per (month, type, category) for the given months.
+
+    Months before today's are closed: their summaries come from stored
+    snapshots, and those missing are computed once and stored. Only rows of
+    the current (or a future) month are read on every call.
+    """
+    current = (today or date.today()).strftime("%Y-%m")
+    token, snapshots = get_month_snapshots()
+    closed = [m for m in months if m < current]
+    missing = [m for m in closed if m not in snapshots]
+
+    computed = pd.DataFrame(columns=SUMMARY_COLUMNS)
+    if len(missing) > FULL_SCAN_MONTHS:
+        summary = summarize_store(get_transaction_store())
+        computed = summary[summary["month"].isin(missing)]
+    elif missing:
+        computed = pd.concat([summarize_store(get_month_store(m)) for m in missing])
+    if missing:
+        new = {month: [] for month in missing}
+        for month, type_, category, amount, count in computed.itertuples(index=False):
+            new[month].append([type_, category, int(amount), int(count)])
+        save_month_snapshots(token, new)
+
+    frames = [_snapshot_frame(snapshots, [m for m in closed if m in snapshots]), computed]
+    frames += [summarize_store(get_month_store(m)) for m in months if m >= current]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS).astype({"amount": "int64", "count": "int64"})
+    return pd.concat(frames, ignore_index=True).astype({"amount": "int64", "count": "int64"})
+
+
+@dataclass
+class TrendReport:
+    """Monthly trends over a window of months, all amounts in cents.
+
+    totals is indexed by month with income, expenses, savings, savings_rate,
+    rolling averages of income and expenses, and the same months a year
+    earlier. categories holds expenses per month x category and
+    category_change its month-over-month change.
+    """
+    months: list
+    totals: pd.DataFrame
+    categories: pd.DataFrame
+    category_change: pd.DataFrame
+
+
+@served("trend_report")
+@instrumented("aggregate")
+def build_trend_report(months=12, today=None, rolling=ROLLING_MONTHS):
+    """Builds month-by-month trends for the months ending with today's.
+
+    A year before the window is loaded as well, for year-over-year columns
+    and full rolling windows from the first month on.
+    """
+    today = today or date.today()
+    window = month_range(today.strftime("%Y-%m"), months)
+    history = month_range(window[-1], months + 12)
+    frame = monthly_totals(history, today)
+
+    by_type = frame.pivot_table(index="month", columns="type", values="amount", aggfunc="sum", fill_value=0)
+    by_type = by_type.reindex(index=history, fill_value=0)
+    income = by_type["Income"] if "Income" in by_type else pd.Series(0, index=history)
+    expenses = by_type["Expense"] if "Expense" in by_type else pd.Series(0, index=history)
+
+    totals = pd.DataFrame({"income": income, "expenses": expenses}, index=history).astype("int64")
+    totals["savings"] = totals["income"] - totals["expenses"]
+    totals["savings_rate"] = (totals["savings"] / totals["income"].where(totals["income"] > 0) * 100).fillna(0)
+    totals["income_avg"] = totals["income"].rolling(rolling, min_periods=1).mean()
+    totals["expenses_avg"] = totals["expenses"].rolling(rolling, min_periods=1).mean()
+    totals["income_last_year"] = totals["income"].shift(12)
+    totals["expenses_last_year"] = totals["expenses"].shift(12)
+    totals["expenses_yoy_pct"] = ((totals["expenses"] - totals["expenses_last_year"])
+                                  / totals["expenses_last_year"].where(totals["expenses_last_year"] > 0) * 100)
+    totals.index.name = "month"
+
+    expenses_only = frame[frame["type"] == "Expense"]
+    categories = expenses_only.pivot_table(index="month", columns="category", values="amount",
+                                           aggfunc="sum", fill_value=0)
+    categories = categories.reindex(index=history, fill_value=0).astype("int64")
+    categories.index.name = "month"
+    category_change = categories.diff()
+
+    return TrendReport(
+        months=window,
+        totals=totals.loc[window],
+        categories=categories.loc[window],
+        category_change=category_change.loc[window],
+    )
@@ -2,40 +2,43 @@ import questionary
 from rich.console import Console
 from rich.table import Table
 from rich.progress_bar import ProgressBar
-import csv
-from features.data.provider import get_budgets, get_monthly_spending
+from features.data.provider import set_budget as save_budget
+from features.data.storage import BUDGET_PERIODS
+from features.budgets.status import budget_history, current_budget_statuses
+from features.data.instrumentation import instrumented
 
-BUDGET_FILE = "database/budgets.txt"
 BUDGET_CATEGORIES = ["Food", "Transport", "Shopping", "Bills", "Entertainment", "Health"]
 
+# Months offered by the budget history view
+HISTORY_WINDOWS = [6, 12, 24]
+
+STATUS_COLORS = {"OK": "green", "Warning": "yellow", "Over": "red"}
+
 console = Console()
 
 def set_budget():
-    """Sets a monthly budget for a category."""
+    """Sets a weekly, monthly, quarterly or yearly budget for a category."""
     try:
         category = questionary.select("Select category to budget:", choices=BUDGET_CATEGORIES).ask()
         if not category:
             return
+        period = questionary.select("Budget period:", choices=list(BUDGET_PERIODS), default="monthly").ask()
+        if not period:
+            return
 
-        amount_str = questionary.text(f"Enter monthly budget for {category} (e.g., 500.00):").ask()
+        amount_str = questionary.text(f"Enter {period} budget for {category} (e.g., 500.00):").ask()
         amount = int(float(amount_str) * 100)
         if amount <= 0:
             console.print("[bold red]Budget amount must be a positive number.[/bold red]")
             return
+        rollover = questionary.confirm(
+            "Carry what is left (or overspent) into the next period? Resets every January.", default=False).ask()
 
-        # Read existing budgets
-        budgets = get_budgets()
+        # Update or add the budget through the storage backend
+        save_budget(category, amount, period, bool(rollover))
 
-        # Update or add new budget
-        budgets[category] = amount
-
-        # Write all budgets back to file
-        with open(BUDGET_FILE, "w", newline="") as f:
-            writer = csv.writer(f)
-            for cat, amt in budgets.items():
-                writer.writerow([cat, amt])
-
-        console.print(f"[bold green]Budget for {category} set to {amount / 100:.2f}[/bold green]")
+        console.print(f"[bold green]{period.capitalize()} budget for {category} set to {amount / 100:.2f}"
+                      f"{' with rollover' if rollover else ''}[/bold green]")
 
     except (ValueError, TypeError):
         console.print("[bold red]Invalid amount. Please enter a valid number.[/bold red]")
@@ -43,17 +46,17 @@ def set_budget():
         console.print(f"[bold red]An error occurred: {e}[/bold red]")
 
 
+@instrumented("render")
 def view_budgets():
-    """Displays budget status."""
-    budgets = get_budgets()
-    if not budgets:
+    """Displays the status of every budget for its current period."""
+    statuses = current_budget_statuses()
+    if not statuses:
         console.print("[bold yellow]No budgets set. Please set a budget first.[/bold yellow]")
         return
 
-    spending = get_monthly_spending()
-
     table = Table(title="Budget Status")
     table.add_column("Category", style="cyan")
+    table.add_column("Period", style="magenta")
     table.add_column("Budget", justify="right", style="green")
     table.add_column("Spent", justify="right", style="yellow")
     table.add_column("Remaining", justify="right")
@@ -63,37 +66,29 @@ def view_budgets():
     total_budget = 0
     total_spent = 0
 
-    for category, budget_cents in budgets.items():
-        budget = budget_cents / 100
-        spent_cents = spending.get(category, 0)
-        spent = spent_cents / 100
-        remaining = budget - spent
-        utilization = (spent / budget) * 100 if budget > 0 else 0
-
-        status = ""
-        color = ""
-        if utilization < 70:
-            status = "OK"
-            color = "green"
-        elif 70 <= utilization <= 100:
-            status = "Warning"
-            color = "yellow"
-        else:
-            status = "Over"
-            color = "red"
-            
+    for budget_status in statuses:
+        budget = budget_status.budget / 100
+        spent = budget_status.spent / 100
+        remaining = budget_status.remaining / 100
+        utilization = budget_status.utilization
+
+        status = budget_status.status
+        color = STATUS_COLORS[status]
+        carried = f" ({budget_status.carried / 100:+.2f})" if budget_status.carried else ""
+
         progress_bar = ProgressBar(total=100, completed=min(utilization, 100), width=15)
 
         table.add_row(
-            category,
-            f"{budget:.2f}",
+            budget_status.category,
+            budget_status.label,
+            f"{budget:.2f}{carried}",
             f"{spent:.2f}",
             f"[{'red' if remaining < 0 else 'green'}]{remaining:.2f}[/]",
             progress_bar,
             f"[{color}]{status}[/]",
         )
-        total_budget += budget_cents
-        total_spent += spent_cents
+        total_budget += budget_status.budget
+        total_spent += budget_status.spent
     
     console.print(table)
 
@@ -105,3 +100,42 @@ def view_budgets():
     console.print(f"Total Spent: [yellow]{total_spent / 100:.2f}[/yellow]")
     console.print(f"Total Remaining: {total_remaining / 100:.2f}")
     console.print(f"Overall Utilization: {total_utilization:.2f}%")
+
+
+@instrumented("render")
+def view_budget_history():
+    """Summarizes how each budget fared over every period of the last months."""
+    window = questionary.select("Show budget history for:", choices=[f"{m} months" for m in HISTORY_WINDOWS]).ask()
+    if not window:
+        return
+    months = int(window.split()[0])
+    history = budget_history(months)
+    if not history:
+        console.print("[bold yellow]No budgets set. Please set a budget first.[/bold yellow]")
+        return
+
+    table = Table(title=f"Budget History (last {months} months)")
+    table.add_column("Category", style="cyan")
+    table.add_column("Period", style="magenta")
+    table.add_column("Periods", justify="right")
+    for status in STATUS_COLORS:
+        table.add_column(status, justify="right", style=STATUS_COLORS[status])
+    table.add_column("Avg. Utilization", justify="right")
+    table.add_column("Worst Period")
+
+    for category, statuses in history.items():
+        counts = {status: 0 for status in STATUS_COLORS}
+        for budget_status in statuses:
+            counts[budget_status.status] += 1
+        worst = max(statuses, key=lambda s: s.utilization)
+        average = sum(s.utilization for s in statuses) / len(statuses)
+        table.add_row(
+            category,
+            statuses[0].period,
+            str(len(statuses)),
+            *(str(counts[status]) for status in STATUS_COLORS),
+            f"{average:.1f}%",
+            f"[{STATUS_COLORS[worst.status]}]{worst.label} ({worst.utilization:.0f}%)[/]",
+        )
+
+    console.print(table)
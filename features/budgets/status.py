@@ -0,0 +1,298 @@
+import os
+import threading
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+
+import numpy as np
+
+from features.data.daemon import served
+from features.data.instrumentation import instrumented
+from features.data.provider import (
+    add_transactions, appended_exactly, get_budget_rules, get_ledger_version, iter_transactions,
+)
+from features.data.storage import DEFAULT_BUDGET_PERIOD
+from features.data.validation import validate_rows
+from features.data.store import TransactionStore
+
+# Utilization thresholds (percent) for the budget status colours and alerts.
+# Override both as "warning,over", e.g. FINANCE_TRACKER_BUDGET_THRESHOLDS=80,100.
+THRESHOLDS_ENV = "FINANCE_TRACKER_BUDGET_THRESHOLDS"
+WARNING_THRESHOLD = 70
+OVER_THRESHOLD = 100
+
+# Statuses from best to worst; recording expenses that move a budget to a
+# later one raises an alert.
+STATUS_LEVELS = ("OK", "Warning", "Over")
+
+# Months per period; weekly budgets are numbered separately.
+PERIOD_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def budget_thresholds():
+    """Returns the configured (warning, over) utilization thresholds in percent."""
+    value = os.environ.get(THRESHOLDS_ENV, "").strip()
+    if not value:
+        return WARNING_THRESHOLD, OVER_THRESHOLD
+    try:
+        warning, over = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError(f"{THRESHOLDS_ENV} must be two percentages, warning and over, e.g. '70,100'.")
+    if not 0 < warning <= over:
+        raise ValueError(f"{THRESHOLDS_ENV} needs 0 < warning <= over, got '{value}'.")
+    return warning, over
+
+
+def period_indexes(ordinals, period):
+    """Numbers the periods containing date ordinals so that consecutive periods get consecutive numbers."""
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    if period == "weekly":
+        # Ordinal 1 (0001-01-01) is a Monday, so weeks run Monday to Sunday.
+        return (ordinals - 1) // 7
+    months = (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return (months + 1970 * 12) // PERIOD_MONTHS[period]
+
+
+def period_index(day, period):
+    """Returns the number of the period containing a date."""
+    return int(period_indexes([day.toordinal()], period)[0])
+
+
+def period_bounds(index, period):
+    """Returns the first and last date of a numbered period."""
+    if period == "weekly":
+        first = date.fromordinal(index * 7 + 1)
+        return first, first + timedelta(days=6)
+    month = index * PERIOD_MONTHS[period]
+    following = month + PERIOD_MONTHS[period]
+    return (date(month // 12, month % 12 + 1, 1),
+            date(following // 12, following % 12 + 1, 1) - timedelta(days=1))
+
+
+def period_label(period, start):
+    """Names the period starting on a date, e.g. 'Oct 2024', 'Q4 2024' or 'week of 2024-10-07'."""
+    if period == "weekly":
+        return f"week of {start.isoformat()}"
+    if period == "quarterly":
+        return f"Q{(start.month - 1) // 3 + 1} {start.year}"
+    if period == "yearly":
+        return str(start.year)
+    return start.strftime("%b %Y")
+
+
+@dataclass
+class BudgetStatus:
+    """How much of one category's budget has been used in one period.
+
+    budget is what the period allows: the budgeted amount plus anything
+    carried over from earlier periods, which is negative after overspending.
+    """
+    category: str
+    budget: int
+    spent: int
+    period: str = DEFAULT_BUDGET_PERIOD
+    start: date = None
+    end: date = None
+    carried: int = 0
+    rollover: bool = False
+
+    @property
+    def remaining(self):
+        return self.budget - self.spent
+
+    @property
+    def utilization(self):
+        if self.budget > 0:
+            return (self.spent / self.budget) * 100
+        return 100 if self.spent > self.budget else 0
+
+    @property
+    def status(self):
+        if self.budget <= 0:
+            return "Over" if self.spent > self.budget else "OK"
+        warning, over = budget_thresholds()
+        if self.utilization < warning:
+            return "OK"
+        if self.utilization <= over:
+            return "Warning"
+        return "Over"
+
+    @property
+    def is_over(self):
+        return self.spent > self.budget
+
+    @property
+    def label(self):
+        return period_label(self.period, self.start) if self.start else ""
+
+
+def _first_index_of_year(index, period):
+    """Returns the first period starting in the same year as a numbered period."""
+    year = period_bounds(index, period)[0].year
+    first = period_index(date(year, 1, 1), period)
+    if period_bounds(first, period)[0].year < year:
+        # A week that starts in December belongs to the previous year.
+        first += 1
+    return first
+
+
+def _expense_store(categories, first_day, last_day):
+    return TransactionStore.from_records(iter_transactions(
+        start=first_day, end=last_day, type="expense", categories=categories))
+
+
+@instrumented("aggregate")
+def evaluate_budget_periods(rules, first_day, last_day):
+    """Evaluates every budget over each of its periods from the one containing first_day to the one containing last_day.
+
+    rules is {category: (cents, period, rollover)}. The expenses of the whole
+    window are read in one pass and totalled per budget and period with array
+    operations. Rollover budgets carry what was left (or overspent) into the
+    next period; carried amounts restart every January, so their window
+    reaches back to the start of the year. Spending is counted up to
+    last_day. Returns {category: [BudgetStatus, ...]}, oldest period first.
+    """
+    if not rules:
+        return {}
+
+    windows = {}
+    for _, period, rollover in rules.values():
+        first, last = period_index(first_day, period), period_index(last_day, period)
+        lowest = _first_index_of_year(first, period) if rollover else first
+        previous = windows.get(period, (lowest, first, last))
+        windows[period] = (min(previous[0], lowest), first, last)
+    data_start = min(period_bounds(lowest, period)[0] for period, (lowest, _, _) in windows.items())
+    store = _expense_store(set(rules), data_start.isoformat(), last_day.isoformat())
+
+    results = {}
+    for period, (lowest, first, last) in windows.items():
+        categories = [category for category, rule in rules.items() if rule[1] == period]
+        columns = last - lowest + 1
+
+        # Budget row of each expense (-1 for categories budgeted per another period).
+        lookup = np.full(len(store.categories), -1, dtype=np.int64)
+        for row, category in enumerate(categories):
+            if category in store.categories:
+                lookup[store.categories.index(category)] = row
+        rows = lookup[store.category_codes]
+        column = period_indexes(store.dates, period) - lowest
+        keep = (rows >= 0) & (column >= 0) & (column < columns)
+        spent = np.zeros((len(categories), columns), dtype=np.int64)
+        np.add.at(spent, (rows[keep], column[keep]), store.amounts[keep])
+
+        amounts = np.array([rules[category][0] for category in categories], dtype=np.int64)[:, None]
+        rollover = np.array([rules[category][2] for category in categories], dtype=bool)[:, None]
+        bounds = [period_bounds(index, period) for index in range(lowest, last + 1)]
+        # Carried into each period: the net of the earlier periods of its year.
+        net = amounts - spent
+        earlier = np.cumsum(net, axis=1) - net
+        years = np.array([start.year for start, _ in bounds])
+        carried = np.where(rollover, earlier - earlier[:, np.searchsorted(years, years)], 0)
+
+        for row, category in enumerate(categories):
+            results[category] = [
+                BudgetStatus(category, int(amounts[row, 0] + carried[row, c]), int(spent[row, c]), period,
+                             bounds[c][0], bounds[c][1], int(carried[row, c]), bool(rollover[row, 0]))
+                for c in range(first - lowest, columns)
+            ]
+    return {category: results[category] for category in rules}
+
+
+@served("budget_history")
+def budget_history(months=24, today=None):
+    """Returns {category: [BudgetStatus, ...]} for every period of the last months, read in one pass."""
+    today = today or date.today()
+    month = today.year * 12 + today.month - months
+    return evaluate_budget_periods(get_budget_rules(), date(month // 12, month % 12 + 1, 1), today)
+
+
+@dataclass
+class BudgetAlert:
+    """A budget that newly reached the warning or over threshold."""
+    status: BudgetStatus
+    previous: str
+
+    @property
+    def message(self):
+        s = self.status
+        text = (f"{s.category} budget for {s.label}: {s.utilization:.0f}% used "
+                f"({s.spent / 100:.2f} of {s.budget / 100:.2f})")
+        return f"{text}, over budget!" if s.status == "Over" else f"{text}."
+
+
+class BudgetTracker:
+    """Keeps the current period's status of every budget, updated as expenses are recorded.
+
+    Statuses are computed once per ledger version. Recording expenses adds
+    their amounts to the statuses they fall in instead of re-reading the
+    ledger, so threshold crossings are known as soon as the rows are stored.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._statuses = {}
+
+    def _current(self, today):
+        key = (get_ledger_version(), today)
+        if key != self._key:
+            periods = evaluate_budget_periods(get_budget_rules(), today, today)
+            self._statuses = {category: statuses[-1] for category, statuses in periods.items()}
+            self._key = key
+        return self._statuses
+
+    def statuses(self, today):
+        """Returns the status of every budget for the periods containing today."""
+        with self._lock:
+            return [replace(status) for status in self._current(today).values()]
+
+    def record(self, rows, today):
+        """Appends transaction rows; returns a BudgetAlert for each budget they moved to a worse status."""
+        with self._lock:
+            rows = validate_rows(rows)
+            statuses = self._current(today)
+            version = self._key[0]
+            before = {category: status.status for category, status in statuses.items()}
+            add_transactions(rows)
+
+            incremental = True
+            for date_str, type_, category, _, amount in rows:
+                status = statuses.get(category)
+                if type_ != "Expense" or status is None:
+                    continue
+                try:
+                    day = date.fromisoformat(date_str)
+                except ValueError:
+                    continue
+                if status.start <= day <= min(status.end, today):
+                    status.spent += int(amount)
+                elif day < status.start and status.rollover and day.year == status.start.year:
+                    # A backdated expense changes what a rollover budget carries.
+                    incremental = False
+            after = get_ledger_version()
+            # Another writer's rows since the statuses were computed are not in them.
+            if incremental and appended_exactly(version, after, rows):
+                self._key = (after, today)
+            else:
+                self._key = None
+                statuses = self._current(today)
+
+            return [BudgetAlert(replace(status), before[category])
+                    for category, status in statuses.items()
+                    if STATUS_LEVELS.index(status.status) > STATUS_LEVELS.index(before[category])]
+
+
+_tracker = BudgetTracker()
+
+
+@served("budget_statuses")
+def current_budget_statuses(today=None):
+    """Returns the status of every budget for its period containing today."""
+    return _tracker.statuses(today or date.today())
+
+
+@served("record_expenses")
+def record_expenses(rows, today=None):
+    """Appends [date, type, category, description, amount] rows and returns the budget alerts they raised."""
+    return _tracker.record(rows, today or date.today())
@@ -0,0 +1,386 @@
+import contextlib
+import csv
+import itertools
+import json
+import mmap
+import os
+import struct
+from datetime import date
+
+import numpy as np
+
+from features.data.instrumentation import instrumented, record_io
+from features.data.ledger_file import file_identity
+from features.data.store import TransactionStore
+from features.data.transaction import parse_row
+from features.data.writer import encode_rows, file_lock, fsync_policy
+
+# transactions.bin: a header, then one fixed-width record per transaction in
+# ledger order. Descriptions are UTF-8 in transactions.heap; type and
+# category names are listed in transactions.vocab (one JSON line each, in
+# code order). Writers append to the heap and the vocabulary first and to
+# the records last, so a reader that maps the records never sees a code or
+# description that is not yet on disk.
+MAGIC = b"FTLEDGER"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sII")  # magic, format version, record size
+
+RECORD = np.dtype([
+    ("date", "<i4"),         # proleptic Gregorian ordinal
+    ("type", "u1"),          # code into the vocabulary's types
+    ("reserved", "u1"),
+    ("category", "<u2"),     # code into the vocabulary's categories
+    ("amount", "<i8"),       # cents
+    ("offset", "<u8"),       # description position in the heap
+    ("length", "<u4"),       # description length in bytes
+])
+
+HEAP_SUFFIX = ".heap"
+VOCAB_SUFFIX = ".vocab"
+
+# Rows converted per chunk by csv_to_binary() and binary_to_csv().
+CONVERT_CHUNK_ROWS = 50000
+
+_MAX_CODES = {"type": 2 ** 8, "category": 2 ** 16}
+
+
+def heap_path(path):
+    return os.path.splitext(path)[0] + HEAP_SUFFIX
+
+
+def vocab_path(path):
+    return os.path.splitext(path)[0] + VOCAB_SUFFIX
+
+
+def ledger_paths(path):
+    """Returns the record, heap and vocabulary files of a binary ledger."""
+    return path, heap_path(path), vocab_path(path)
+
+
+def record_count(path):
+    """Returns how many whole records a binary ledger holds (0 if it does not exist)."""
+    identity = file_identity(path)
+    if identity is None or identity[1] < HEADER.size:
+        return 0
+    return (identity[1] - HEADER.size) // RECORD.itemsize
+
+
+class DescriptionHeap:
+    """Sequence of descriptions decoded from the mapped heap on access.
+
+    Mapping a ledger creates no per-row string; a description is only
+    decoded when a row is actually read.
+    """
+
+    def __init__(self, heap, offsets, lengths):
+        self._heap = heap
+        self._offsets = offsets
+        self._lengths = lengths
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        start = int(self._offsets[i])
+        return self._heap[start:start + int(self._lengths[i])].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def take(self, positions):
+        """Returns the descriptions at the given positions, still undecoded."""
+        return DescriptionHeap(self._heap, self._offsets[positions], self._lengths[positions])
+
+    def joined(self):
+        """Returns (bytes, starts): every description on its own line, and where each one starts.
+
+        Built with array operations, so no per-row string is created.
+        """
+        lengths = self._lengths.astype(np.int64)
+        starts = np.cumsum(lengths + 1) - (lengths + 1)
+        total = int(lengths.sum())
+        out = np.full(total + len(lengths), ord("\n"), dtype=np.uint8)
+        if total:
+            heap = np.frombuffer(self._heap, dtype=np.uint8)
+            within = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            out[np.repeat(starts, lengths) + within] = heap[np.repeat(self._offsets.astype(np.int64), lengths) + within]
+        return out.tobytes(), starts
+
+
+def read_vocabulary(path):
+    """Returns ([types], [categories]) listed in a ledger's vocabulary, in code order."""
+    types, categories = [], []
+    try:
+        with open(vocab_path(path), "rb") as f:
+            lines = f.read().split(b"\n")
+    except FileNotFoundError:
+        return types, categories
+    # The last element is empty, or a line torn by a crash; neither is used.
+    for line in lines[:-1]:
+        kind, name = json.loads(line)
+        (types if kind == "type" else categories).append(name)
+    return types, categories
+
+
+def _map(path):
+    with open(path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _check_header(data, path):
+    magic, version, record_size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD.itemsize:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} binary ledger.")
+
+
+@instrumented("parse")
+def map_store(path):
+    """Returns a TransactionStore whose columns are read-only views of the mapped ledger.
+
+    Only the vocabulary is parsed: dates, codes and amounts stay in the page
+    cache and descriptions are decoded on access, so opening and aggregating
+    a ledger costs no Python object per row.
+    """
+    count = record_count(path)
+    if not count:
+        return TransactionStore()
+    # Records first: the heap and vocabulary already cover every record mapped.
+    data = _map(path)
+    _check_header(data, path)
+    records = np.frombuffer(data, dtype=RECORD, count=count, offset=HEADER.size)
+    types, categories = read_vocabulary(path)
+    record_io(rows=count, bytes_read=HEADER.size + count * RECORD.itemsize)
+
+    store = TransactionStore(types, categories)
+    store.dates = records["date"]
+    store.type_codes = records["type"]
+    store.category_codes = records["category"]
+    store.amounts = records["amount"]
+    store.descriptions = DescriptionHeap(_map(heap_path(path)), records["offset"], records["length"])
+    return store
+
+
+def _ordinal(date_str):
+    ordinal = date.fromisoformat(date_str).toordinal()
+    # Only the canonical YYYY-MM-DD spelling survives a round trip.
+    if date.fromordinal(ordinal).isoformat() != date_str:
+        raise ValueError(f"Date '{date_str}' is not in YYYY-MM-DD form.")
+    return ordinal
+
+
+class _Encoder:
+    """Turns raw rows into record bytes, heap bytes and new vocabulary lines."""
+
+    def __init__(self, types, categories, heap_size):
+        self.codes = {"type": {name: code for code, name in enumerate(types)},
+                      "category": {name: code for code, name in enumerate(categories)}}
+        self.heap_size = heap_size
+
+    def _code(self, kind, name, vocab_lines):
+        codes = self.codes[kind]
+        code = codes.get(name)
+        if code is None:
+            if len(codes) >= _MAX_CODES[kind]:
+                raise ValueError(f"A binary ledger holds at most {_MAX_CODES[kind]} {kind} names.")
+            code = codes[name] = len(codes)
+            vocab_lines.append(json.dumps([kind, name]).encode("utf-8") + b"\n")
+        return code
+
+    def encode(self, rows):
+        records = []
+        heap = []
+        vocab_lines = []
+        ordinals = {}
+        for row in rows:
+            ordinal = ordinals.get(row[0])
+            if ordinal is None:
+                ordinal = ordinals[row[0]] = _ordinal(row[0])
+            description = row[3].encode("utf-8")
+            records.append((ordinal, self._code("type", row[1], vocab_lines), 0,
+                            self._code("category", row[2], vocab_lines), int(row[4]),
+                            self.heap_size, len(description)))
+            heap.append(description)
+            self.heap_size += len(description)
+        return np.array(records, dtype=RECORD).tobytes(), b"".join(heap), b"".join(vocab_lines)
+
+
+def _write_all(f, data):
+    if data:
+        f.write(data)
+        f.flush()
+        if fsync_policy() == "always":
+            os.fsync(f.fileno())
+
+
+@contextlib.contextmanager
+def _appending(path):
+    """Opens the record, heap and vocabulary files for appending, with every torn tail cut off.
+
+    Everything written inside the block is truncated away again if it fails.
+    """
+    files = []
+    try:
+        for name in ledger_paths(path):
+            f = open(name, "ab")
+            files.append(f)
+        records, heap, vocab = files
+        if not records.tell():
+            _write_all(records, HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.itemsize))
+        else:
+            with open(path, "rb") as f:
+                _check_header(f.read(HEADER.size), path)
+        # A crash can leave half a record or half a vocabulary line.
+        records.truncate(HEADER.size + record_count(path) * RECORD.itemsize)
+        with open(vocab_path(path), "rb") as f:
+            vocab.truncate(f.read().rfind(b"\n") + 1)
+        for f in files:
+            f.seek(0, os.SEEK_END)
+
+        sizes = [f.tell() for f in files]
+        try:
+            yield records, heap, vocab
+        except BaseException:
+            for f, size in zip(files, sizes):
+                f.truncate(size)
+            raise
+    finally:
+        for f in files:
+            f.close()
+
+
+@instrumented("write")
+def append_rows(path, batches):
+    """Appends batches of [date, type, category, description, amount] rows as one unit.
+
+    Either every row is stored or none is: the records, written last, are
+    what makes rows visible, and on any error all three files are cut back.
+    """
+    with file_lock(path):
+        types, categories = read_vocabulary(path)
+        with _appending(path) as (records, heap, vocab):
+            encoder = _Encoder(types, categories, heap.tell())
+            encoded = [encoder.encode(rows) for rows in batches]
+            _write_all(heap, b"".join(chunk[1] for chunk in encoded))
+            _write_all(vocab, b"".join(chunk[2] for chunk in encoded))
+            _write_all(records, b"".join(chunk[0] for chunk in encoded))
+
+
+def clear_ledger(path):
+    """Deletes every transaction, keeping an empty ledger.
+
+    Empty files replace the old ones rather than truncating them, so
+    processes that still map the old files keep reading them safely. The
+    records go first, so a new reader never sees rows without their heap.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with file_lock(path):
+        try:
+            for name in ledger_paths(temp_path):
+                with open(name, "wb") as f:
+                    if name == temp_path:
+                        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.itemsize))
+            for temp, final in zip(ledger_paths(temp_path), ledger_paths(path)):
+                os.replace(temp, final)
+        finally:
+            remove_ledger_files(temp_path)
+
+
+def remove_ledger_files(path):
+    """Deletes a binary ledger's files, records first."""
+    for name in ledger_paths(path):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(name)
+
+
+def _read_csv_chunks(csv_path):
+    """Yields the CSV ledger's rows in chunks, leaving out rows reads would skip."""
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        chunk = []
+        for row in csv.reader(f):
+            if parse_row(row) is not None:
+                chunk.append(row)
+                if len(chunk) == CONVERT_CHUNK_ROWS:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+
+@instrumented("write")
+def csv_to_binary(csv_path, path):
+    """Writes every row of a CSV ledger to a new binary ledger and returns the row count.
+
+    The binary files are built under temporary names and renamed into place
+    records last, so the ledger appears complete or not at all. Refuses to
+    overwrite a binary ledger that holds rows.
+    """
+    if record_count(path):
+        raise ValueError(f"{path} already contains transactions.")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    count = 0
+    try:
+        with _appending(temp_path) as (records, heap, vocab):
+            encoder = _Encoder([], [], 0)
+            for rows in _read_csv_chunks(csv_path):
+                record_bytes, heap_bytes, vocab_bytes = encoder.encode(rows)
+                heap.write(heap_bytes)
+                vocab.write(vocab_bytes)
+                records.write(record_bytes)
+                count += len(rows)
+            for f in (heap, vocab, records):
+                f.flush()
+                if fsync_policy() == "always":
+                    os.fsync(f.fileno())
+        for temp, final in reversed(list(zip(ledger_paths(temp_path), ledger_paths(path)))):
+            os.replace(temp, final)
+    finally:
+        remove_ledger_files(temp_path)
+    return count
+
+
+def iter_rows(path):
+    """Yields every [date, type, category, description, amount] row of a binary ledger, in order."""
+    store = map_store(path)
+    dates = {}
+    for start in range(0, len(store), CONVERT_CHUNK_ROWS):
+        end = min(start + CONVERT_CHUNK_ROWS, len(store))
+        for ordinal, type_code, category_code, amount, i in zip(
+                store.dates[start:end].tolist(), store.type_codes[start:end].tolist(),
+                store.category_codes[start:end].tolist(), store.amounts[start:end].tolist(),
+                range(start, end)):
+            date_str = dates.get(ordinal)
+            if date_str is None:
+                date_str = dates[ordinal] = date.fromordinal(ordinal).isoformat()
+            yield [date_str, store.types[type_code], store.categories[category_code],
+                   store.descriptions[i], amount]
+
+
+@instrumented("write")
+def binary_to_csv(path, csv_path):
+    """Writes every row of a binary ledger to a CSV ledger, replacing it; returns the row count.
+
+    Rows are encoded exactly as the CSV backend appends them, so every field
+    reads back unchanged.
+    """
+    temp_path = f"{csv_path}.{os.getpid()}.tmp"
+    count = 0
+    try:
+        with open(temp_path, "wb") as f:
+            rows = iter_rows(path)
+            while True:
+                chunk = list(itertools.islice(rows, CONVERT_CHUNK_ROWS))
+                if not chunk:
+                    break
+                f.write(encode_rows(chunk))
+                count += len(chunk)
+            f.flush()
+            if fsync_policy() == "always":
+                os.fsync(f.fileno())
+        os.replace(temp_path, csv_path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
+    return count
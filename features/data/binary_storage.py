@@ -0,0 +1,202 @@
+import re
+import threading
+
+import numpy as np
+
+from features.data import binary_ledger
+from features.data.csv_storage import read_budget_rules, write_budget_rules
+from features.data.ledger_file import file_identity, read_anchor
+from features.data.row_hashes import row_hash
+from features.data.search_index import tokenize
+from features.data.storage import DEFAULT_BUDGET_PERIOD, Storage
+from features.data.store import date_to_ordinal
+from features.data.writer import file_lock
+
+_WORD_CHAR = re.compile(r"\w")
+
+
+class BinaryStorage(Storage):
+    """Keeps the ledger as fixed-width binary records read through mmap.
+
+    Opening the ledger maps its records instead of parsing them, so loads,
+    month slices and totals are array operations on the page cache with no
+    Python object per row. Budgets stay in the CSV budgets file.
+    """
+
+    def __init__(self, transaction_file, budget_file):
+        self.transaction_file = transaction_file
+        self.budget_file = budget_file
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drops the mapped ledger and cached budgets so the next read goes to disk."""
+        self._cache.clear()
+
+    def version(self):
+        return (file_identity(self.transaction_file), file_identity(self.budget_file))
+
+    def load_store(self):
+        """Returns the mapped ledger, remapping it only when the file changed."""
+        identity = file_identity(self.transaction_file)
+        with self._lock:
+            entry = self._cache.get(self.transaction_file)
+            if entry is None or entry["identity"] != identity:
+                entry = {"identity": identity, "store": binary_ledger.map_store(self.transaction_file)}
+                self._cache[self.transaction_file] = entry
+            return entry["store"]
+
+    def iter_transactions(self, start=None, end=None, type_=None, categories=None):
+        store = self.load_store()
+        yield from store.iter_rows(store.mask(
+            date_to_ordinal(start) if start is not None else None,
+            date_to_ordinal(end) if end is not None else None,
+            type_, categories))
+
+    def month_store(self, month_str):
+        return self.load_store().month_slice(month_str)
+
+    def month_totals(self, month_str):
+        month = self.month_store(month_str)
+        return {type_: month.sum_by("category", type=type_) for type_ in month.sum_by("type")}
+
+    def _search_text(self, store):
+        """Returns the lower-cased descriptions joined one per line and each row's start in it, or None.
+
+        Cached per mapping. None when lower-casing changes the text's length,
+        so positions could not be mapped back to rows.
+        """
+        with self._lock:
+            entry = self._cache.get("search")
+            if entry is None or entry["store"] is not store:
+                data, starts = store.descriptions.joined()
+                text = data.decode("utf-8")
+                lower = text.lower()
+                if len(lower) != len(text):
+                    lower = None
+                elif len(text) != len(data):
+                    # Byte offsets to character offsets: count the bytes that start a character.
+                    first_bytes = (np.frombuffer(data, dtype=np.uint8) & 0xC0) != 0x80
+                    starts = np.cumsum(first_bytes)[starts] - 1
+                entry = self._cache["search"] = {"store": store, "text": lower, "starts": starts}
+            return entry["text"], entry["starts"]
+
+    def search_transactions(self, query, offset=0, limit=20):
+        """Matches the terms with one regular expression pass each over all descriptions.
+
+        Scores follow search_index.rank_matches(): 2 for an exact word, 1 for
+        a word the term begins, best score first and newest row first on ties.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+        store = self.load_store()
+        if not len(store):
+            return 0, []
+        text, starts = self._search_text(store)
+        if text is None:
+            return super().search_transactions(query, offset, limit)
+
+        total = np.zeros(len(store), dtype=np.int64)
+        matched = np.ones(len(store), dtype=bool)
+        category_tokens = [set(tokenize(category)) for category in store.categories]
+        for term in terms:
+            positions, exact = [], []
+            # A literal-first pattern lets the regex engine skip ahead; word starts are checked after.
+            for match in re.finditer(rf"{re.escape(term)}(\w*)", text):
+                start = match.start()
+                if start and _WORD_CHAR.match(text, start - 1):
+                    continue
+                positions.append(start)
+                exact.append(not match.group(1))
+            scores = np.zeros(len(store), dtype=np.int64)
+            if positions:
+                rows = np.searchsorted(starts, positions, side="right") - 1
+                np.maximum.at(scores, rows, np.where(exact, 2, 1))
+            category_scores = np.array(
+                [2 if term in tokens else 1 if any(t.startswith(term) for t in tokens) else 0
+                 for tokens in category_tokens], dtype=np.int64)
+            scores = np.maximum(scores, category_scores[store.category_codes])
+            matched &= scores > 0
+            total += scores
+
+        positions = np.flatnonzero(matched)
+        ranked = positions[np.lexsort((positions, total[positions]))[::-1]]
+        return len(ranked), [store.row(i) for i in ranked[offset:offset + limit].tolist()]
+
+    def load_month_snapshots(self):
+        # Month totals come straight from the mapped columns, so no summaries are stored.
+        return self.version(), {}
+
+    def save_month_snapshots(self, token, snapshots):
+        pass
+
+    def append_transactions(self, rows):
+        binary_ledger.append_rows(self.transaction_file, [rows])
+
+    def appended_exactly(self, before, after, rows):
+        (old, budgets), (new, new_budgets) = before, after
+        if old is None or new is None or budgets != new_budgets or old[0] != new[0]:
+            return False
+        return new[1] - old[1] == len(rows) * binary_ledger.RECORD.itemsize
+
+    def import_transactions(self, batches):
+        binary_ledger.append_rows(self.transaction_file, batches)
+
+    def _hashed_rows_intact(self, entry, identity):
+        """Checks whether the rows an entry counted are still the first rows of the records file."""
+        if entry is None or identity is None or entry["identity"][0] != identity[0]:
+            return False
+        end = binary_ledger.HEADER.size + entry["rows"] * binary_ledger.RECORD.itemsize
+        return identity[1] >= end and read_anchor(self.transaction_file, end) == entry["anchor"]
+
+    def row_hash_counts(self, hashes):
+        """Counts row hashes over the mapped ledger, hashing only rows added since the last call.
+
+        The counts are kept with the records file's identity (inode, size,
+        mtime). While it only grew, with the bytes before the last counted row
+        unchanged, just the new rows are hashed; anything else starts over.
+        """
+        store = self.load_store()
+        identity = file_identity(self.transaction_file)
+        with self._lock:
+            entry = self._cache.get("hashes")
+            if entry is None or entry["identity"] != identity or entry["rows"] != len(store):
+                if not self._hashed_rows_intact(entry, identity) or entry["rows"] > len(store):
+                    entry = {"rows": 0, "counts": {}}
+                counts = entry["counts"]
+                for i in range(entry["rows"], len(store)):
+                    digest = row_hash(store.row(i).as_row())
+                    counts[digest] = counts.get(digest, 0) + 1
+                end = binary_ledger.HEADER.size + len(store) * binary_ledger.RECORD.itemsize
+                entry.update(identity=identity, rows=len(store),
+                             anchor=read_anchor(self.transaction_file, end) if identity else b"")
+                self._cache["hashes"] = entry
+            counts = entry["counts"]
+        return {digest: counts[digest] for digest in hashes if digest in counts}
+
+    def get_budget_rules(self):
+        identity = file_identity(self.budget_file)
+        entry = self._cache.get(self.budget_file)
+        if entry is None or entry["identity"] != identity:
+            entry = self._cache[self.budget_file] = {"identity": identity,
+                                                     "budgets": read_budget_rules(self.budget_file)}
+        return dict(entry["budgets"])
+
+    def set_budget(self, category, amount, period=DEFAULT_BUDGET_PERIOD, rollover=False):
+        with file_lock(self.budget_file):
+            budgets = read_budget_rules(self.budget_file)
+            budgets[category] = (amount, period, rollover)
+            write_budget_rules(self.budget_file, budgets)
+        self._cache.pop(self.budget_file, None)
+
+    def clear(self):
+        binary_ledger.clear_ledger(self.transaction_file)
+        with file_lock(self.budget_file):
+            with open(self.budget_file, "w"):
+                pass
+        self.invalidate()
+
+    def rebuild_indexes(self):
+        # The records are their own index; there is nothing derived to rebuild.
+        self.invalidate()
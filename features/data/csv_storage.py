@@ -0,0 +1,312 @@
+import csv
+import io
+import os
+import threading
+
+from features.data import month_index, month_snapshots, rollups, row_hashes, search_index
+from features.data.instrumentation import instrumented, record_io
+from features.data.ledger_file import file_identity, read_anchor
+from features.data.storage import DEFAULT_BUDGET_PERIOD, Storage, row_predicate
+from features.data.store import TransactionStore, date_to_ordinal
+from features.data.transaction import Transaction, parse_row, transactions_from_rows
+from features.data.writer import encode_rows, get_writer, file_lock
+
+
+def read_budget_rules(path):
+    """Reads {category: (cents, period, rollover)} from a budgets file.
+
+    Rows are category,amount[,period,rollover]; two-column rows predate
+    budget periods and stay monthly without rollover.
+    """
+    budgets = {}
+    try:
+        with open(path, "r") as f:
+            for row in csv.reader(f):
+                if row:
+                    period = row[2] if len(row) > 2 and row[2] else DEFAULT_BUDGET_PERIOD
+                    rollover = len(row) > 3 and row[3] == "1"
+                    budgets[row[0]] = (int(row[1]), period, rollover)
+    except FileNotFoundError:
+        pass
+    return budgets
+
+
+def write_budget_rules(path, budgets):
+    """Replaces a budgets file with {category: (cents, period, rollover)}."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        for cat, (amt, per, roll) in budgets.items():
+            # Plain monthly budgets keep the original two-column format.
+            if per == DEFAULT_BUDGET_PERIOD and not roll:
+                writer.writerow([cat, amt])
+            else:
+                writer.writerow([cat, amt, per, int(roll)])
+    os.replace(tmp_path, path)
+
+
+class CsvStorage(Storage):
+    """Keeps the ledger and budgets as plain CSV text files.
+
+    Parsed files are cached per process and keyed on the file identity
+    (inode, size, mtime). When the ledger has only grown, just the appended
+    bytes are parsed. Month queries go through the sidecar month index and
+    monthly totals through the persisted rollups.
+    """
+
+    def __init__(self, transaction_file, budget_file):
+        self.transaction_file = transaction_file
+        self.budget_file = budget_file
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, path=None, appended=False):
+        """Drops cached data for a file (or all files) so the next read goes to disk.
+
+        Paths that only appended to the file pass appended=True, which keeps
+        the rows parsed so far and lets the next read pick up just the new tail.
+        """
+        if path is None:
+            self._cache.clear()
+        elif appended and path in self._cache:
+            self._cache[path]["identity"] = None
+        else:
+            self._cache.pop(path, None)
+
+    def version(self):
+        return (file_identity(self.transaction_file), file_identity(self.budget_file))
+
+    @instrumented("parse")
+    def _read_transactions_from(self, offset, entry):
+        """Parses ledger rows starting at a byte offset into the cache entry."""
+        with open(self.transaction_file, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+
+        # Only consume whole lines so a half-written row is re-read next time.
+        end = data.rfind(b"\n") + 1
+        complete = end == len(data)
+
+        # Rows after the last newline are parsed but not marked as consumed;
+        # the entry is rebuilt from scratch once the file changes again.
+        text = data.decode("utf-8")
+        parsed = len(entry["store"])
+        entry["store"].extend(row for row in csv.reader(io.StringIO(text, newline="")) if row)
+        record_io(rows=len(entry["store"]) - parsed, bytes_read=len(data))
+
+        entry["offset"] = offset + end
+        entry["complete"] = complete
+        entry["anchor"] = read_anchor(self.transaction_file, entry["offset"])
+
+    def _can_read_tail(self, entry, identity):
+        """Checks whether the ledger has only grown since the entry was cached."""
+        if not entry.get("complete") or entry["inode"] != identity[0]:
+            return False
+        if identity[1] <= entry["offset"]:
+            return False
+        return read_anchor(self.transaction_file, entry["offset"]) == entry["anchor"]
+
+    def load_store(self):
+        """Returns the cached ledger store, reading only what changed on disk."""
+        identity = file_identity(self.transaction_file)
+        if identity is None:
+            self._cache.pop(self.transaction_file, None)
+            return TransactionStore()
+
+        with self._lock:
+            entry = self._cache.get(self.transaction_file)
+            if entry and entry["identity"] == identity:
+                return entry["store"]
+
+            if entry and self._can_read_tail(entry, identity):
+                self._read_transactions_from(entry["offset"], entry)
+            else:
+                entry = {"store": TransactionStore()}
+                self._read_transactions_from(0, entry)
+
+            entry["inode"] = identity[0]
+            entry["identity"] = identity
+            self._cache[self.transaction_file] = entry
+            return entry["store"]
+
+    def _current_store(self):
+        """Returns the cached ledger store if it matches the file on disk, else None."""
+        entry = self._cache.get(self.transaction_file)
+        if entry and entry["identity"] == file_identity(self.transaction_file):
+            return entry["store"]
+        return None
+
+    def iter_transactions(self, start=None, end=None, type_=None, categories=None):
+        """Filters the cached ledger when it is current, else streams only the matching months."""
+        store = self._current_store()
+        if store is not None:
+            yield from store.iter_rows(store.mask(
+                date_to_ordinal(start) if start is not None else None,
+                date_to_ordinal(end) if end is not None else None,
+                type_, categories))
+            return
+
+        if file_identity(self.transaction_file) is None:
+            return
+        if start is None and end is None:
+            f = open(self.transaction_file, "r", newline="")
+            rows = csv.reader(f)
+        else:
+            f = None
+            ranges = month_index.ranges_between(
+                self.transaction_file,
+                start[:7] if start is not None else None,
+                end[:7] if end is not None else None)
+            rows = month_index.iter_range_rows(self.transaction_file, ranges)
+
+        matches = row_predicate(start, end, type_, categories)
+        scanned = 0
+        try:
+            for row in rows:
+                scanned += 1
+                parsed = parse_row(row)
+                if parsed is not None and matches(row):
+                    yield Transaction(parsed[0], row[1], row[2], row[3], parsed[1])
+        finally:
+            if f is not None:
+                record_io(bytes_read=f.buffer.tell())
+                f.close()
+            record_io(rows=scanned)
+
+    def month_store(self, month_str):
+        """Slices the cached ledger when it is current, else reads only the month's byte ranges."""
+        store = self._current_store()
+        if store is not None:
+            return store.month_slice(month_str)
+
+        store = TransactionStore()
+        store.extend(month_index.read_month_rows(self.transaction_file, month_str))
+        return store
+
+    def _month_rows_newest_first(self, month_str, start, type_):
+        """Reads the rows of one month that match the filters, newest first."""
+        matches = row_predicate(start, None, type_)
+        rows = [row for row in month_index.read_month_rows(self.transaction_file, month_str)
+                if parse_row(row) is not None and matches(row)]
+        # reverse=True keeps same-date rows in ledger order.
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return rows
+
+    def _month_counts_newest_first(self, start, type_):
+        """Yields (month, matching rows) newest month first, counted from the rollups.
+
+        Only the month containing start, which the rollups cannot split by
+        day, is read from the ledger.
+        """
+        start_month = start[:7] if start is not None else None
+        for month, cells in sorted(rollups.load_rollups(self.transaction_file).items(), reverse=True):
+            if start_month is not None and month < start_month:
+                break
+            if month == start_month and not start.endswith("-01"):
+                yield month, len(self._month_rows_newest_first(month, start, type_))
+                continue
+            types = [type_] if type_ is not None else list(cells)
+            yield month, sum(cell[1] for t in types for cell in cells.get(t, {}).values())
+
+    def count_transactions(self, start=None, type_=None):
+        """Counts from the cached ledger when it is current, else from the rollups."""
+        if self._current_store() is not None:
+            return super().count_transactions(start, type_)
+        return sum(count for _, count in self._month_counts_newest_first(start, type_))
+
+    def transaction_page(self, offset, limit, start=None, type_=None):
+        """Pages the cached ledger when it is current, else reads only the months the page spans."""
+        if self._current_store() is not None:
+            return super().transaction_page(offset, limit, start, type_)
+
+        rows = []
+        for month, count in self._month_counts_newest_first(start, type_):
+            if offset >= count:
+                offset -= count
+                continue
+            month_rows = self._month_rows_newest_first(month, start, type_)
+            rows.extend(month_rows[offset:offset + limit - len(rows)])
+            offset = 0
+            if len(rows) >= limit:
+                break
+        return list(transactions_from_rows(rows))
+
+    def month_totals(self, month_str):
+        cells = rollups.load_rollups(self.transaction_file).get(month_str, {})
+        return {type_: {category: cell[0] for category, cell in categories.items()}
+                for type_, categories in cells.items()}
+
+    def load_month_snapshots(self):
+        return month_snapshots.load_snapshots(self.transaction_file)
+
+    def save_month_snapshots(self, token, snapshots):
+        month_snapshots.save_snapshots(self.transaction_file, token, snapshots)
+
+    def search_transactions(self, query, offset=0, limit=20):
+        total, rows = search_index.search(self.transaction_file, query, offset, limit)
+        return total, list(transactions_from_rows(rows))
+
+    def refresh_after_append(self):
+        """Brings the cache and the sidecar indexes up to date after rows were appended."""
+        self.invalidate(self.transaction_file, appended=True)
+        month_index.load_index(self.transaction_file)
+        rollups.load_rollups(self.transaction_file)
+        search_index.refresh_search_index(self.transaction_file)
+
+    def append_transactions(self, rows):
+        get_writer(self.transaction_file).append(rows)
+        self.refresh_after_append()
+
+    def appended_exactly(self, before, after, rows):
+        # Any other write changes the budgets' identity, the inode, or adds bytes of its own.
+        (old, budgets), (new, new_budgets) = before, after
+        if old is None or new is None or budgets != new_budgets or old[0] != new[0]:
+            return False
+        return new[1] - old[1] == len(encode_rows(rows))
+
+    def import_transactions(self, batches):
+        get_writer(self.transaction_file).append_batches(batches)
+        self.refresh_after_append()
+
+    def row_hash_counts(self, hashes):
+        counts = row_hashes.load_row_hashes(self.transaction_file)
+        return {digest: counts[digest] for digest in hashes if digest in counts}
+
+    def get_budget_rules(self):
+        identity = file_identity(self.budget_file)
+        entry = self._cache.get(self.budget_file)
+        if identity is None:
+            self._cache.pop(self.budget_file, None)
+            return {}
+        if entry and entry["identity"] == identity:
+            return dict(entry["budgets"])
+
+        budgets = read_budget_rules(self.budget_file)
+        self._cache[self.budget_file] = {"identity": identity, "budgets": budgets}
+        return dict(budgets)
+
+    def set_budget(self, category, amount, period=DEFAULT_BUDGET_PERIOD, rollover=False):
+        # CSV has no in-place update, so the (small) budget file is rewritten.
+        # The lock keeps concurrent sessions from losing each other's budgets.
+        with file_lock(self.budget_file):
+            self.invalidate(self.budget_file)
+            budgets = self.get_budget_rules()
+            budgets[category] = (amount, period, rollover)
+            write_budget_rules(self.budget_file, budgets)
+        self.invalidate(self.budget_file)
+
+    def clear(self):
+        with file_lock(self.transaction_file), file_lock(self.budget_file):
+            with open(self.transaction_file, "w"):
+                pass
+            with open(self.budget_file, "w"):
+                pass
+        self.invalidate()
+
+    def rebuild_indexes(self):
+        self.invalidate(self.transaction_file)
+        month_index.rebuild_index(self.transaction_file)
+        rollups.rebuild_rollups(self.transaction_file)
+        row_hashes.rebuild_row_hashes(self.transaction_file)
+        month_snapshots.discard_snapshots(self.transaction_file)
+        search_index.discard_search_index(self.transaction_file)
@@ -0,0 +1,401 @@
+"""A long-lived process that owns one ledger and serves it over a Unix domain socket.
+
+    python cli.py daemon start     # runs until stopped (Ctrl+C or `cli.py daemon stop`)
+
+While a daemon serves the active ledger, the provider and the functions
+marked @served send their calls to it instead of opening the data files:
+the ledger is parsed once, every write goes through the daemon's single
+event loop, and warm reads are a socket round trip. Whole-ledger reads
+receive the daemon's columnar store rather than parsing the files again. Without a daemon
+(or with FINANCE_TRACKER_DAEMON=off) everything reads the files directly.
+"""
+import functools
+import importlib
+import os
+import pickle
+import socket
+import struct
+import threading
+
+from features.data.ledgers import active_ledger, ledger_root
+from features.data.storage import DEFAULT_BUDGET_PERIOD, Storage, get_storage, storage_name
+
+# Set to "off" to ignore a running daemon and always use the data files.
+DAEMON_ENV = "FINANCE_TRACKER_DAEMON"
+
+SOCKET_FILENAME = "daemon.sock"
+
+# Storage methods a daemon answers. Whole-ledger reads arrive as columnar
+# stores (select_store, month_store), which copy far faster than the files
+# parse; a binary ledger is mapped by each process instead, see DaemonStorage.
+REMOTE_METHODS = {
+    "version", "select_store", "recent_transactions", "count_transactions", "transaction_page",
+    "search_transactions", "month_store", "month_totals", "top_categories", "load_month_snapshots",
+    "save_month_snapshots", "append_transactions", "import_transactions", "row_hash_counts",
+    "get_budget_rules", "get_budgets", "set_budget", "clear", "rebuild_indexes",
+}
+# Calls that must not be repeated against the files if the daemon stops mid-request.
+WRITE_METHODS = {"save_month_snapshots", "append_transactions", "import_transactions", "set_budget",
+                 "clear", "rebuild_indexes", "record_expenses"}
+
+# Modules whose @served functions a daemon registers at start-up.
+SERVED_MODULES = ["features.analytics.report", "features.analytics.trends", "features.budgets.status"]
+
+# Rows fetched per request while iterating transactions through a daemon.
+ITER_CHUNK_ROWS = 100000
+
+_HEADER = struct.Struct("!I")
+_FALLBACK = object()
+
+_queries = {}
+_clients = {}
+_serving = False
+_lock = threading.Lock()
+
+
+class DaemonError(ConnectionError):
+    """The daemon stopped answering after a write was sent, so it may or may not have been stored."""
+
+
+def socket_path(ledger=None):
+    """Returns the socket a daemon for a ledger listens on (default: the active ledger)."""
+    return os.path.join(ledger_root(ledger), SOCKET_FILENAME)
+
+
+def _frame(message):
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("The daemon closed the connection.")
+        data += chunk
+    return bytes(data)
+
+
+class DaemonClient:
+    """One connection to a daemon, shared by the threads of a process."""
+
+    def __init__(self, path):
+        self.path = path
+        self._sock = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        # (daemon version, TransactionStore) of the last whole ledger received.
+        self.ledger_store = None
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def request(self, kind, name, args=(), kwargs=None):
+        """Sends one call and returns its result, re-raising the daemon's exception.
+
+        Returns _FALLBACK when the daemon cannot be reached and the call is
+        safe to run against the files instead.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the parent keeps using the inherited connection.
+                self._sock, self._pid = None, os.getpid()
+            try:
+                if self._sock is None:
+                    self._connect()
+            except OSError:
+                return _FALLBACK
+            try:
+                self._sock.sendall(_frame((kind, name, args, kwargs or {})))
+                size, = _HEADER.unpack(_recv_exactly(self._sock, _HEADER.size))
+                status, value = pickle.loads(_recv_exactly(self._sock, size))
+            except OSError as e:
+                self._close()
+                if name in WRITE_METHODS:
+                    raise DaemonError(f"Lost the connection to the ledger daemon during {name}: {e}")
+                return _FALLBACK
+        if status == "error":
+            raise value
+        return value
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+class DaemonStorage(Storage):
+    """Storage backend that forwards calls to the daemon serving a ledger.
+
+    Calls fall back to the ledger's own backend when the daemon has gone
+    away, except writes that may already have reached it. The whole ledger
+    is fetched once per version and kept with the client.
+    """
+
+    def __init__(self, client, ledger):
+        self.client = client
+        self.ledger = ledger
+
+    def _local(self):
+        return get_storage(ledger=self.ledger)
+
+    def _call(self, method, *args):
+        result = self.client.request("storage", method, args)
+        if result is _FALLBACK:
+            return getattr(self._local(), method)(*args)
+        return result
+
+    def version(self):
+        return self._call("version")
+
+    def _reads_locally(self):
+        # A mapped binary ledger costs nothing to open and shares the page cache.
+        return storage_name(self.ledger) == "binary"
+
+    def load_store(self):
+        if self._reads_locally():
+            return self._local().load_store()
+        version = self.version()
+        cached = self.client.ledger_store
+        if cached is None or cached[0] != version:
+            cached = self.client.ledger_store = (version, self._call("select_store"))
+        return cached[1]
+
+    def select_store(self, start=None, end=None, type_=None, categories=None, offset=0, limit=None):
+        return self._call("select_store", start, end, type_, categories, offset, limit)
+
+    def recent_transactions(self, limit):
+        return self._call("recent_transactions", limit)
+
+    def iter_transactions(self, start=None, end=None, type_=None, categories=None):
+        if self._reads_locally():
+            return self._local().iter_transactions(start, end, type_, categories)
+        return self._iter_chunks(start, end, type_, categories)
+
+    def _iter_chunks(self, start, end, type_, categories):
+        offset = 0
+        while True:
+            chunk = self.select_store(start, end, type_, categories, offset, ITER_CHUNK_ROWS)
+            yield from chunk
+            if len(chunk) < ITER_CHUNK_ROWS:
+                return
+            offset += len(chunk)
+
+    def count_transactions(self, start=None, type_=None):
+        return self._call("count_transactions", start, type_)
+
+    def transaction_page(self, offset, limit, start=None, type_=None):
+        return self._call("transaction_page", offset, limit, start, type_)
+
+    def search_transactions(self, query, offset=0, limit=20):
+        return self._call("search_transactions", query, offset, limit)
+
+    def month_store(self, month_str):
+        if self._reads_locally():
+            return self._local().month_store(month_str)
+        return self._call("month_store", month_str)
+
+    def month_totals(self, month_str):
+        return self._call("month_totals", month_str)
+
+    def top_categories(self, month_str, type_, limit):
+        return self._call("top_categories", month_str, type_, limit)
+
+    def load_month_snapshots(self):
+        return self._call("load_month_snapshots")
+
+    def save_month_snapshots(self, token, snapshots):
+        return self._call("save_month_snapshots", token, snapshots)
+
+    def append_transactions(self, rows):
+        return self._call("append_transactions", list(rows))
+
+    def import_transactions(self, batches):
+        # One message, so the daemon still stores all of it or none of it.
+        return self._call("import_transactions", [list(batch) for batch in batches])
+
+    def row_hash_counts(self, hashes):
+        return self._call("row_hash_counts", list(hashes))
+
+    def get_budget_rules(self):
+        return self._call("get_budget_rules")
+
+    def get_budgets(self):
+        return self._call("get_budgets")
+
+    def set_budget(self, category, amount, period=DEFAULT_BUDGET_PERIOD, rollover=False):
+        return self._call("set_budget", category, amount, period, rollover)
+
+    def clear(self):
+        return self._call("clear")
+
+    def rebuild_indexes(self):
+        return self._call("rebuild_indexes")
+
+
+def daemon_client(ledger=None):
+    """Returns a client for the daemon serving a ledger (default: the active one), or None without one."""
+    if _serving or os.environ.get(DAEMON_ENV, "").strip().lower() == "off":
+        return None
+    path = socket_path(ledger)
+    if not os.path.exists(path):
+        return None
+    with _lock:
+        client = _clients.get(path)
+        if client is None:
+            client = _clients[path] = DaemonClient(path)
+    return client
+
+
+def daemon_storage(ledger=None):
+    """Returns a DaemonStorage for the active ledger when a daemon serves it, else None."""
+    ledger = ledger or active_ledger()
+    client = daemon_client(ledger)
+    return DaemonStorage(client, ledger) if client is not None else None
+
+
+def served(name):
+    """Runs the decorated function in the daemon when one serves the active ledger.
+
+    The function's arguments and result are pickled, so both must be plain
+    data. Without a daemon, or if it cannot be reached, it runs here.
+    """
+    def decorate(func):
+        _queries[name] = func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            client = daemon_client()
+            if client is not None:
+                result = client.request("query", name, args, kwargs)
+                if result is not _FALLBACK:
+                    return result
+            return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def daemon_status(ledger=None):
+    """Returns {"pid": ..., "ledger": ..., "rows": ...} from a running daemon, or None."""
+    path = socket_path(ledger)
+    if not os.path.exists(path):
+        return None
+    result = DaemonClient(path).request("control", "status")
+    return None if result is _FALLBACK else result
+
+
+def stop_daemon(ledger=None):
+    """Asks the daemon serving a ledger to exit; returns False when none was running."""
+    path = socket_path(ledger)
+    if not os.path.exists(path):
+        return False
+    return DaemonClient(path).request("control", "stop") is not _FALLBACK
+
+
+def _dispatch(request, stop):
+    kind, name, args, kwargs = request
+    if kind == "storage" and name in REMOTE_METHODS:
+        return getattr(get_storage(), name)(*args, **kwargs)
+    if kind == "query" and name in _queries:
+        return _queries[name](*args, **kwargs)
+    if kind == "control" and name == "status":
+        return {"pid": os.getpid(), "ledger": active_ledger(), "rows": get_storage().count_transactions()}
+    if kind == "control" and name == "stop":
+        stop()
+        return True
+    raise ValueError(f"The daemon does not serve {kind} '{name}'.")
+
+
+def serve(on_ready=None):
+    """Serves the active ledger until stopped; on_ready(path) is called once it accepts connections.
+
+    Requests are answered one at a time on a single event loop, so the
+    daemon is the ledger's only writer and takes no locks of its own.
+    """
+    import asyncio
+    import signal
+
+    global _serving
+    path = socket_path()
+    if daemon_status() is not None:
+        raise RuntimeError(f"A daemon is already serving {path}.")
+    _serving = True
+    if os.path.exists(path):
+        os.remove(path)  # Left behind by a daemon that did not exit cleanly.
+
+    for module in SERVED_MODULES:
+        importlib.import_module(module)
+    # Warm the caches before the first client asks.
+    get_storage().load_store()
+    _queries["financial_report"]()
+    _queries["budget_statuses"]()
+
+    connections = set()
+
+    async def handle(reader, writer):
+        connections.add(writer)
+        try:
+            while True:
+                size, = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                request = pickle.loads(await reader.readexactly(size))
+                try:
+                    response = ("ok", _dispatch(request, stopped.set))
+                except Exception as e:
+                    response = ("error", e)
+                try:
+                    message = _frame(response)
+                except Exception as e:
+                    message = _frame(("error", RuntimeError(f"Unpicklable daemon response: {e}")))
+                writer.write(message)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # Stopping cancels idle connections; on Python 3.11 a re-raised
+            # cancellation is logged as an error by the stream protocol.
+            if not stopped.is_set():
+                raise
+        finally:
+            connections.discard(writer)
+            writer.close()
+
+    async def main():
+        nonlocal stopped
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopped.set)
+        # Only this user may connect.
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(handle, path)
+        finally:
+            os.umask(umask)
+        try:
+            if on_ready:
+                on_ready(path)
+            await stopped.wait()
+        finally:
+            server.close()
+            for writer in list(connections):
+                writer.close()
+            await server.wait_closed()
+
+    stopped = None
+    try:
+        asyncio.run(main())
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        _serving = False
@@ -0,0 +1,210 @@
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import types
+from datetime import datetime
+
+# Set to 1 to record timings for the whole process (main.py also takes --instrument).
+INSTRUMENT_ENV = "FINANCE_TRACKER_INSTRUMENT"
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the last bucket is open-ended.
+HISTOGRAM_BOUNDS_MS = (0.1, 1, 10, 100, 1000)
+
+_enabled = os.environ.get(INSTRUMENT_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+_stats = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable():
+    """Turns instrumentation on for the rest of the process."""
+    global _enabled
+    _enabled = True
+
+
+def is_enabled():
+    return _enabled
+
+
+class _Frame:
+    """One in-progress measured call."""
+    __slots__ = ("kind", "name", "elapsed_ns", "child_ns", "rows", "bytes_read", "error")
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.elapsed_ns = 0
+        self.child_ns = 0
+        self.rows = 0
+        self.bytes_read = 0
+        self.error = False
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _enter(frame):
+    _stack().append(frame)
+    return time.perf_counter_ns()
+
+
+def _leave(frame, started):
+    spent = time.perf_counter_ns() - started
+    frame.elapsed_ns += spent
+    stack = _stack()
+    stack.pop()
+    if stack:
+        stack[-1].child_ns += spent
+
+
+def _record(frame):
+    bucket = bisect.bisect_left(HISTOGRAM_BOUNDS_MS, frame.elapsed_ns / 1e6)
+    with _lock:
+        stat = _stats.get((frame.kind, frame.name))
+        if stat is None:
+            stat = _stats[(frame.kind, frame.name)] = {
+                "calls": 0, "errors": 0, "total_ns": 0, "self_ns": 0, "max_ns": 0,
+                "rows": 0, "bytes_read": 0, "histogram": [0] * (len(HISTOGRAM_BOUNDS_MS) + 1),
+            }
+        stat["calls"] += 1
+        stat["errors"] += frame.error
+        stat["total_ns"] += frame.elapsed_ns
+        stat["self_ns"] += frame.elapsed_ns - frame.child_ns
+        stat["max_ns"] = max(stat["max_ns"], frame.elapsed_ns)
+        stat["rows"] += frame.rows
+        stat["bytes_read"] += frame.bytes_read
+        stat["histogram"][bucket] += 1
+
+
+def _resume(frame, call):
+    started = _enter(frame)
+    try:
+        return call()
+    except StopIteration:
+        raise
+    except BaseException:
+        frame.error = True
+        raise
+    finally:
+        _leave(frame, started)
+
+
+def _measured_iterator(frame, iterator):
+    """Times a generator across all of its resumptions and records it as one call."""
+    try:
+        while True:
+            try:
+                item = _resume(frame, iterator.__next__)
+            except StopIteration:
+                return
+            yield item
+    finally:
+        iterator.close()
+        _record(frame)
+
+
+@contextlib.contextmanager
+def measure(kind, name):
+    """Records the time spent in a block under (kind, name)."""
+    if not _enabled:
+        yield
+        return
+    frame = _Frame(kind, name)
+    started = _enter(frame)
+    try:
+        yield
+    except BaseException:
+        frame.error = True
+        raise
+    finally:
+        _leave(frame, started)
+        _record(frame)
+
+
+def instrumented(kind, name=None):
+    """Decorator recording each call's latency, rows scanned and bytes read under (kind, name).
+
+    kind groups operations ("data", "parse", "write", "render", ...); name
+    defaults to module.function. Functions returning a generator are timed
+    until the generator is exhausted or closed. When instrumentation is off
+    the wrapper only checks a flag.
+    """
+    def decorate(func):
+        operation = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            frame = _Frame(kind, operation)
+            try:
+                result = _resume(frame, lambda: func(*args, **kwargs))
+            except BaseException:
+                _record(frame)
+                raise
+            if isinstance(result, types.GeneratorType):
+                return _measured_iterator(frame, result)
+            _record(frame)
+            return result
+        return wrapper
+    return decorate
+
+
+def record_io(rows=0, bytes_read=0):
+    """Adds rows scanned and bytes read to every measured call in progress on this thread."""
+    if not _enabled:
+        return
+    for frame in _stack():
+        frame.rows += rows
+        frame.bytes_read += bytes_read
+
+
+def histogram_labels():
+    labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS]
+    return labels + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+
+
+def get_stats():
+    """Returns one dict per measured operation, slowest total first."""
+    labels = histogram_labels()
+    with _lock:
+        items = [(key, dict(stat)) for key, stat in _stats.items()]
+    stats = []
+    for (kind, name), stat in items:
+        stats.append({
+            "kind": kind,
+            "operation": name,
+            "calls": stat["calls"],
+            "errors": stat["errors"],
+            "total_ms": stat["total_ns"] / 1e6,
+            "self_ms": stat["self_ns"] / 1e6,
+            "avg_ms": stat["total_ns"] / stat["calls"] / 1e6,
+            "max_ms": stat["max_ns"] / 1e6,
+            "rows_scanned": stat["rows"],
+            "bytes_read": stat["bytes_read"],
+            "histogram": dict(zip(labels, stat["histogram"])),
+        })
+    return sorted(stats, key=lambda s: s["total_ms"], reverse=True)
+
+
+def stats_json():
+    """Returns the collected stats as a JSON document for monitoring tools."""
+    return json.dumps({
+        "exported": datetime.now().isoformat(timespec="seconds"),
+        "pid": os.getpid(),
+        "enabled": _enabled,
+        "operations": get_stats(),
+    }, indent=4)
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
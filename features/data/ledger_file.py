@@ -0,0 +1,48 @@
+import os
+
+# Number of bytes before a consumed offset that must be unchanged for a
+# grown file to be treated as an append rather than a rewrite.
+ANCHOR_SIZE = 64
+
+
+def file_identity(path):
+    """Returns (inode, size, mtime) for a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def read_anchor(path, offset):
+    """Returns the bytes just before an offset, used to detect rewrites."""
+    start = max(0, offset - ANCHOR_SIZE)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(offset - start)
+
+
+def iter_row_spans(data, base_offset=0):
+    """Yields (start, end, complete) byte spans of the CSV rows in data.
+
+    Quotes are tracked so a newline inside a quoted description does not split
+    a row. The last span is marked incomplete when data does not end in a
+    newline.
+    """
+    start = 0
+    pos = 0
+    in_quotes = False
+    while True:
+        newline = data.find(b"\n", pos)
+        if newline == -1:
+            break
+        if data.count(b'"', pos, newline) % 2:
+            in_quotes = not in_quotes
+        pos = newline + 1
+        if not in_quotes:
+            if data[start:pos].strip():
+                yield base_offset + start, base_offset + pos, True
+            start = pos
+
+    if data[start:].strip():
+        yield base_offset + start, base_offset + len(data), False
@@ -0,0 +1,120 @@
+import contextlib
+import contextvars
+import json
+import os
+import re
+import threading
+
+from features.data.writer import file_lock
+
+# The ledger kept in database/, which always exists.
+DEFAULT_LEDGER = "default"
+DEFAULT_ROOT = "database"
+
+# New ledgers get a directory here unless given another root; the registry
+# of every added ledger lives here as well.
+LEDGERS_DIR = "ledgers"
+REGISTRY_FILE = os.path.join(LEDGERS_DIR, "ledgers.json")
+
+# Names the ledger a process starts with (default: DEFAULT_LEDGER).
+LEDGER_ENV = "FINANCE_TRACKER_LEDGER"
+
+LEDGER_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+_active = None
+_lock = threading.Lock()
+
+# The ledger a using_ledger() block reads and writes. Kept per thread and
+# task, so concurrent blocks (dashboard sessions, report workers) and other
+# threads of the process never see each other's ledger.
+_scoped = contextvars.ContextVar("scoped_ledger", default=None)
+
+
+def _read_registry():
+    try:
+        with open(REGISTRY_FILE, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_registry(registry):
+    tmp_path = f"{REGISTRY_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp_path, REGISTRY_FILE)
+
+
+def list_ledgers():
+    """Returns {name: data directory} for every ledger, the default one first."""
+    return {DEFAULT_LEDGER: DEFAULT_ROOT, **_read_registry()}
+
+
+def ledger_root(name=None):
+    """Returns the data directory of a ledger (default: the active one)."""
+    name = name or active_ledger()
+    if name == DEFAULT_LEDGER:
+        return DEFAULT_ROOT
+    root = _read_registry().get(name)
+    if root is None:
+        raise ValueError(f"Unknown ledger '{name}'. Add it first.")
+    return root
+
+
+def add_ledger(name, root=None):
+    """Registers a ledger and creates its data directory; returns the directory."""
+    if not LEDGER_NAME.match(name or ""):
+        raise ValueError("Ledger names use letters, digits, '.', '_' and '-', starting with a letter or digit.")
+    root = root or os.path.join(LEDGERS_DIR, name)
+    os.makedirs(LEDGERS_DIR, exist_ok=True)
+    with file_lock(REGISTRY_FILE):
+        registry = _read_registry()
+        if name == DEFAULT_LEDGER or name in registry:
+            raise ValueError(f"A ledger named '{name}' already exists.")
+        if os.path.abspath(root) in {os.path.abspath(r) for r in list_ledgers().values()}:
+            raise ValueError(f"{root} already holds another ledger.")
+        os.makedirs(root, exist_ok=True)
+        registry[name] = root
+        _write_registry(registry)
+    return root
+
+
+def remove_ledger(name):
+    """Unregisters a ledger. Its data directory is left in place."""
+    global _active
+    if name == DEFAULT_LEDGER:
+        raise ValueError("The default ledger cannot be removed.")
+    if not os.path.exists(REGISTRY_FILE):
+        raise ValueError(f"Unknown ledger '{name}'.")
+    with file_lock(REGISTRY_FILE):
+        registry = _read_registry()
+        if registry.pop(name, None) is None:
+            raise ValueError(f"Unknown ledger '{name}'.")
+        _write_registry(registry)
+    with _lock:
+        if _active == name:
+            _active = None
+
+
+def active_ledger():
+    """Returns the name of the ledger this thread reads and writes."""
+    return _scoped.get() or _active or os.environ.get(LEDGER_ENV, "").strip() or DEFAULT_LEDGER
+
+
+def set_active_ledger(name):
+    """Makes a registered ledger the one this process reads and writes."""
+    ledger_root(name)
+    global _active
+    with _lock:
+        _active = name
+
+
+@contextlib.contextmanager
+def using_ledger(name):
+    """Makes a ledger the active one for the duration of the block, in the current thread only."""
+    ledger_root(name)
+    token = _scoped.set(name)
+    try:
+        yield
+    finally:
+        _scoped.reset(token)
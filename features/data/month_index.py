@@ -0,0 +1,59 @@
+import csv
+import io
+
+from features.data.instrumentation import record_io
+from features.data.sidecar import load_sidecar, discard_sidecar
+
+INDEX_SUFFIX = ".idx"
+
+
+def _consume(months, rows):
+    """Adds the byte span of each new row to its month's ranges."""
+    for start, end, raw in rows:
+        month = raw.lstrip()[:7].decode("utf-8", "replace")
+        ranges = months.setdefault(month, [])
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+
+
+def load_index(ledger_path):
+    """Returns the YYYY-MM -> byte ranges index, extending or rebuilding it when stale."""
+    return load_sidecar(ledger_path, INDEX_SUFFIX, _consume)
+
+
+def rebuild_index(ledger_path):
+    """Discards the month index for a ledger and rebuilds it from scratch."""
+    discard_sidecar(ledger_path, INDEX_SUFFIX)
+    return load_index(ledger_path)
+
+
+def iter_range_rows(ledger_path, ranges):
+    """Yields the raw CSV rows stored in the given byte ranges of the ledger."""
+    if not ranges:
+        # Also covers a ledger whose file has not been written yet.
+        return
+    with open(ledger_path, "rb") as f:
+        for start, end in ranges:
+            f.seek(start)
+            text = f.read(end - start).decode("utf-8")
+            record_io(bytes_read=end - start)
+            for row in csv.reader(io.StringIO(text, newline="")):
+                if row:
+                    yield row
+
+
+def ranges_between(ledger_path, start_month=None, end_month=None):
+    """Returns the byte ranges of every month in an inclusive YYYY-MM range, in file order."""
+    index = load_index(ledger_path)
+    ranges = [r for month, month_ranges in index.items()
+              if (start_month is None or month >= start_month)
+              and (end_month is None or month <= end_month)
+              for r in month_ranges]
+    return sorted(ranges)
+
+
+def read_month_rows(ledger_path, month_str):
+    """Reads only the raw CSV rows of a YYYY-MM month from the ledger."""
+    return list(iter_range_rows(ledger_path, load_index(ledger_path).get(month_str, [])))
@@ -0,0 +1,26 @@
+from features.data.sidecar import load_sidecar_copy, discard_sidecar, update_sidecar
+
+SNAPSHOT_SUFFIX = ".snapshots"
+
+
+def _consume(months, rows):
+    """Drops the snapshot of every month that received a new row."""
+    for _, _, raw in rows:
+        months.pop(raw.lstrip()[:7].decode("utf-8", "replace"), None)
+
+
+def load_snapshots(ledger_path):
+    """Returns (offset, {month: [[type, category, sum, count], ...]}).
+
+    Months that received rows since their snapshot was taken are left out.
+    """
+    return load_sidecar_copy(ledger_path, SNAPSHOT_SUFFIX, _consume)
+
+
+def save_snapshots(ledger_path, offset, snapshots):
+    """Stores month snapshots computed from the ledger up to offset, unless it has grown since."""
+    return update_sidecar(ledger_path, SNAPSHOT_SUFFIX, lambda months: months.update(snapshots), offset)
+
+
+def discard_snapshots(ledger_path):
+    discard_sidecar(ledger_path, SNAPSHOT_SUFFIX)
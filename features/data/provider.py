@@ -1,72 +1,214 @@
-import csv
 from collections import defaultdict
 from datetime import datetime
 
-TRANSACTION_FILE = "database/transactions.txt"
-BUDGET_FILE = "database/budgets.txt"
+from features.data.daemon import daemon_storage
+from features.data.instrumentation import instrumented
+from features.data.ledgers import active_ledger
+from features.data.row_hashes import row_hash
+from features.data.storage import DEFAULT_BUDGET_PERIOD, get_storage, migrate_csv_to_sqlite
+from features.data.store import TransactionStore, month_date_range
+from features.data.validation import TRANSACTION_TYPES, validate_rows
 
+
+def _storage():
+    """Returns the daemon serving the active ledger when one runs, else the ledger's own backend."""
+    return daemon_storage() or get_storage()
+
+
+def _iso_date(value):
+    """Accepts a YYYY-MM-DD string or a date object and returns the string."""
+    return value if value is None or isinstance(value, str) else value.isoformat()
+
+
+def _transaction_type(type_):
+    """Maps a case-insensitive transaction type onto the stored spelling."""
+    return TRANSACTION_TYPES.get(type_.lower(), type_) if type_ is not None else None
+
+
+@instrumented("data")
+def get_transaction_store():
+    """Returns the columnar store for the whole ledger.
+
+    The store is shared with the backend's cache, so callers must treat it as
+    read-only.
+    """
+    return _storage().load_store()
+
+
+def get_ledger_version():
+    """Returns a hashable token that changes whenever the active ledger, its transactions or budgets change."""
+    return (active_ledger(), _storage().version())
+
+
+@instrumented("data")
+def get_recent_transactions(limit=10):
+    """Returns the newest transactions (newest first) using a bounded top-K selection."""
+    return _storage().recent_transactions(limit)
+
+
+@instrumented("write")
+def add_transactions(rows):
+    """Validates [date, type, category, description, amount] rows and appends them to the ledger.
+
+    A bad row raises ValueError before anything is written.
+    """
+    _storage().append_transactions(validate_rows(rows))
+
+
+def add_transaction(date_str, type_, category, description, amount):
+    """Appends a single transaction to the ledger."""
+    add_transactions([[date_str, type_, category, description, amount]])
+
+
+def appended_exactly(before, after, rows):
+    """Checks whether ledger version after is version before plus only these rows appended."""
+    return before[0] == after[0] and _storage().appended_exactly(before[1], after[1], rows)
+
+
+@instrumented("write")
+def import_transactions(batches):
+    """Appends batches of rows as one atomic unit; on error nothing is stored."""
+    _storage().import_transactions(batches)
+
+
+@instrumented("data")
+def get_row_hash_counts(hashes):
+    """Returns {row hash: occurrences in the ledger} for the given row_hash() digests."""
+    return _storage().row_hash_counts(hashes)
+
+
+@instrumented("data")
+def get_month_snapshots():
+    """Returns (token, {month: [[type, category, cents, rows], ...]}) of stored month summaries."""
+    return _storage().load_month_snapshots()
+
+
+@instrumented("write")
+def save_month_snapshots(token, snapshots):
+    """Stores summaries of closed months; token comes from get_month_snapshots()."""
+    _storage().save_month_snapshots(token, snapshots)
+
+
+@instrumented("write")
+def set_budget(category, amount, period=DEFAULT_BUDGET_PERIOD, rollover=False):
+    """Creates or replaces the budget for a category (weekly, monthly, quarterly or yearly)."""
+    _storage().set_budget(category, amount, period, rollover)
+
+
+@instrumented("write")
+def clear_all_data():
+    """Deletes every transaction and budget."""
+    _storage().clear()
+
+
+@instrumented("write")
+def rebuild_indexes():
+    """Rebuilds the storage backend's derived indexes (month index, rollups)."""
+    _storage().rebuild_indexes()
+
+
+@instrumented("data")
+def iter_transactions(start=None, end=None, type=None, categories=None):
+    """Lazily yields transactions matching every given filter, in ledger order.
+
+    start and end are inclusive dates (YYYY-MM-DD strings or date objects),
+    type is matched case-insensitively and categories is a collection of
+    category names. Filters are applied while reading, so only matching rows
+    are ever materialized.
+    """
+    if categories is not None:
+        categories = set(categories)
+    return _storage().iter_transactions(_iso_date(start), _iso_date(end),
+                                           _transaction_type(type), categories)
+
+
+@instrumented("data")
+def count_transactions(start=None, type=None):
+    """Counts the transactions dated on or after start and of a type."""
+    return _storage().count_transactions(_iso_date(start), _transaction_type(type))
+
+
+@instrumented("data")
+def get_transaction_page(offset, limit, start=None, type=None):
+    """Returns up to limit transactions newest first, skipping the first offset.
+
+    Only the requested page is materialized; takes the same start and type
+    filters as count_transactions().
+    """
+    return _storage().transaction_page(offset, limit, _iso_date(start), _transaction_type(type))
+
+
+@instrumented("data")
+def search_transactions(query, offset=0, limit=20):
+    """Returns (total matches, up to limit transactions) for a free-text query, best matches first.
+
+    Each word of the query matches the words of descriptions and categories
+    that start with it, case-insensitively; every word must match.
+    """
+    return _storage().search_transactions(query, offset, limit)
+
+@instrumented("data")
 def get_all_transactions():
     """Reads all transactions from the file."""
-    transactions = []
-    try:
-        with open(TRANSACTION_FILE, "r") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if row:
-                    transactions.append({
-                        "date": row[0],
-                        "type": row[1],
-                        "category": row[2],
-                        "description": row[3],
-                        "amount": int(row[4])
-                    })
-    except FileNotFoundError:
-        pass
-    return transactions
+    return list(get_transaction_store())
 
+@instrumented("data")
 def get_budgets():
     """Reads all set budgets."""
-    budgets = {}
-    try:
-        with open(BUDGET_FILE, "r") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if row:
-                    budgets[row[0]] = int(row[1])
-    except FileNotFoundError:
-        pass
-    return budgets
+    return _storage().get_budgets()
+
+@instrumented("data")
+def get_budget_rules():
+    """Returns {category: (cents, period, rollover)} for every budget."""
+    return _storage().get_budget_rules()
 
+@instrumented("data")
 def get_transactions_for_month(month_str):
     """Filters transactions for a specific month from all transactions."""
-    all_transactions = get_all_transactions()
-    return [t for t in all_transactions if t['date'].startswith(month_str)]
+    start, end = month_date_range(month_str)
+    return list(iter_transactions(start=start, end=end))
+
+@instrumented("data")
+def get_month_store(month_str):
+    """Returns the columnar store of transactions for a YYYY-MM month."""
+    return _storage().month_store(month_str)
 
+@instrumented("data")
 def get_monthly_spending():
     """Calculates spending per category for the current month."""
-    spending = defaultdict(int)
     current_month_str = datetime.now().strftime("%Y-%m")
-    current_month_transactions = get_transactions_for_month(current_month_str)
-    
-    for t in current_month_transactions:
-        if t['type'] == "Expense":
-            spending[t['category']] += t['amount']
-            
-    return spending
+    return defaultdict(int, _storage().month_totals(current_month_str).get("Expense", {}))
 
+@instrumented("data")
+def get_month_totals(month_str):
+    """Returns {type: {category: amount}} for a YYYY-MM month without scanning rows."""
+    return _storage().month_totals(month_str)
+
+@instrumented("data")
+def get_month_summary(month_str):
+    """Returns the same totals as calculate_monthly_summary() for a month without scanning rows."""
+    totals = get_month_totals(month_str)
+    spending_by_category = defaultdict(int, totals.get("Expense", {}))
+    income_by_source = defaultdict(int, totals.get("Income", {}))
+    total_income = sum(income_by_source.values())
+    total_expense = sum(spending_by_category.values())
+
+    return total_income, total_expense, spending_by_category, income_by_source
+
+@instrumented("data")
+def get_top_categories(month_str, type_="Expense", limit=3):
+    """Returns the highest (category, amount) pairs of a type in a month."""
+    return _storage().top_categories(month_str, type_, limit)
+
+@instrumented("aggregate")
 def calculate_monthly_summary(transactions):
     """Calculates total income and expenses for a list of transactions."""
-    total_income = 0
-    total_expense = 0
-    spending_by_category = defaultdict(int)
-    income_by_source = defaultdict(int)
-
-    for t in transactions:
-        if t["type"] == "Income":
-            total_income += t["amount"]
-            income_by_source[t["category"]] += t["amount"]
-        elif t["type"] == "Expense":
-            total_expense += t["amount"]
-            spending_by_category[t["category"]] += t["amount"]
+    if not isinstance(transactions, TransactionStore):
+        transactions = TransactionStore.from_records(transactions)
+
+    total_income = transactions.total("Income")
+    total_expense = transactions.total("Expense")
+    spending_by_category = defaultdict(int, transactions.sum_by("category", type="Expense"))
+    income_by_source = defaultdict(int, transactions.sum_by("category", type="Income"))
 
     return total_income, total_expense, spending_by_category, income_by_source
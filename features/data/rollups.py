@@ -0,0 +1,38 @@
+import csv
+import io
+
+from features.data.sidecar import load_sidecar, discard_sidecar
+from features.data.transaction import parse_row
+
+ROLLUP_SUFFIX = ".rollup"
+
+
+def _consume(months, rows):
+    """Adds each new row's amount to its month x type x category cell."""
+    text = b"".join(raw for _, _, raw in rows).decode("utf-8")
+    for row in csv.reader(io.StringIO(text, newline="")):
+        parsed = parse_row(row)
+        # Unreadable rows are left out of reads, so they add to no total.
+        if parsed is None:
+            continue
+        month, type_, category, amount = row[0][:7], row[1], row[2], parsed[1]
+        cell = months.setdefault(month, {}).setdefault(type_, {}).setdefault(category, [0, 0])
+        cell[0] += amount
+        cell[1] += 1
+
+
+def load_rollups(ledger_path):
+    """Returns {month: {type: {category: [sum, count]}}}, folding in any new rows first."""
+    return load_sidecar(ledger_path, ROLLUP_SUFFIX, _consume)
+
+
+def rebuild_rollups(ledger_path):
+    """Discards the persisted rollups for a ledger and recomputes them from every row."""
+    discard_sidecar(ledger_path, ROLLUP_SUFFIX)
+    return load_rollups(ledger_path)
+
+
+def month_totals(ledger_path, month_str, type_):
+    """Returns {category: sum} for one month and transaction type."""
+    cells = load_rollups(ledger_path).get(month_str, {}).get(type_, {})
+    return {category: cell[0] for category, cell in cells.items()}
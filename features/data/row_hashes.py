@@ -0,0 +1,36 @@
+import csv
+import hashlib
+import io
+
+from features.data.sidecar import load_sidecar, discard_sidecar
+from features.data.transaction import parse_row
+
+ROW_HASH_SUFFIX = ".hashes"
+
+
+def row_hash(row):
+    """Returns a stable 64-bit hex digest of a [date, type, category, description, amount] row."""
+    key = "\x1f".join([row[0], row[1], row[2], row[3], str(int(row[4]))])
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _consume(counts, rows):
+    """Counts how often each new row's hash occurs in the ledger."""
+    text = b"".join(raw for _, _, raw in rows).decode("utf-8")
+    for row in csv.reader(io.StringIO(text, newline="")):
+        # Unreadable rows are left out of reads, so nothing can duplicate them.
+        if parse_row(row) is None:
+            continue
+        digest = row_hash(row)
+        counts[digest] = counts.get(digest, 0) + 1
+
+
+def load_row_hashes(ledger_path):
+    """Returns {row hash: occurrences} for the ledger, folding in any new rows first."""
+    return load_sidecar(ledger_path, ROW_HASH_SUFFIX, _consume)
+
+
+def rebuild_row_hashes(ledger_path):
+    """Discards the persisted row hashes for a ledger and recomputes them from every row."""
+    discard_sidecar(ledger_path, ROW_HASH_SUFFIX)
+    return load_row_hashes(ledger_path)
@@ -0,0 +1,283 @@
+import base64
+import bisect
+import csv
+import io
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+from features.data.instrumentation import instrumented, record_io
+from features.data.ledger_file import file_identity, read_anchor, iter_row_spans
+from features.data.sidecar import sidecar_path
+from features.data.transaction import parse_row
+from features.data.writer import file_lock
+
+SEARCH_SUFFIX = ".search"
+
+# Segments the index file may hold before they are merged into one.
+MAX_SEGMENTS = 32
+
+TOKEN = re.compile(r"\w+")
+
+# Search indexes loaded in this process, keyed by index path.
+_loaded = {}
+_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Splits text into lower-case word tokens."""
+    return TOKEN.findall(text.lower())
+
+
+def row_tokens(category, description):
+    """Returns the distinct tokens of a transaction's category and description."""
+    return set(tokenize(description)) | set(tokenize(category))
+
+
+def rank_matches(terms, candidates):
+    """Orders (position, tokens) candidates by how well they match every term, best first.
+
+    Each term scores 2 for an exact token and 1 for a token it is a prefix
+    of; rows missing a term are dropped. Ties go to the later position, i.e.
+    the most recently added row. Returns the positions.
+    """
+    scored = []
+    for position, tokens in candidates:
+        score = 0
+        for term in terms:
+            if term in tokens:
+                score += 2
+            elif any(token.startswith(term) for token in tokens):
+                score += 1
+            else:
+                break
+        else:
+            scored.append((score, position))
+    scored.sort(reverse=True)
+    return [position for _, position in scored]
+
+
+def _encode(offsets, start):
+    """Packs ascending row offsets as base64 little-endian uint32 gaps from start."""
+    gaps = np.diff(np.asarray(offsets, dtype=np.int64), prepend=start).astype("<u4")
+    return base64.b64encode(gaps.tobytes()).decode("ascii")
+
+
+def _decode(text, start):
+    gaps = np.frombuffer(base64.b64decode(text), dtype="<u4")
+    return np.cumsum(gaps, dtype=np.int64) + start
+
+
+def _empty_state():
+    return {"identity": None, "inode": None, "end": 0, "anchor": "", "segments": 0,
+            "file_identity": None, "file_position": 0, "postings": {}, "vocabulary": None}
+
+
+def _segment_postings(ledger_path, start):
+    """Tokenizes the complete ledger rows after start; returns (end offset, {token: [row offsets]})."""
+    with open(ledger_path, "rb") as f:
+        f.seek(start)
+        data = f.read()
+
+    spans = [(s, e) for s, e, complete in iter_row_spans(data, start) if complete]
+    end = spans[-1][1] if spans else start
+    postings = {}
+    # Each span is parsed on its own, so a blank or torn line cannot shift rows onto other offsets.
+    for row_start, row_end in spans:
+        try:
+            text = data[row_start - start:row_end - start].decode("utf-8")
+            row = next(csv.reader(io.StringIO(text, newline="")), [])
+        except (ValueError, csv.Error):
+            continue
+        if parse_row(row) is None:
+            continue
+        for token in row_tokens(row[2], row[3]):
+            postings.setdefault(token, []).append(row_start)
+    record_io(rows=len(spans), bytes_read=len(data))
+    return end, postings
+
+
+def _merge(state, segment):
+    for token, encoded in segment["postings"].items():
+        state["postings"].setdefault(token, []).append(_decode(encoded, segment["start"]))
+    state["end"] = segment["end"]
+    state["anchor"] = segment["anchor"]
+    state["inode"] = segment["inode"]
+    state["segments"] += 1
+    state["vocabulary"] = None
+
+
+def _read_segments(path, state):
+    """Merges the segments written to the index file since state was last read.
+
+    Starts over when the file was replaced (after compaction) or a segment
+    does not continue where the previous one ended.
+    """
+    identity = file_identity(path)
+    if identity is None:
+        return _empty_state()
+    if state["file_identity"] is None or identity[0] != state["file_identity"][0] \
+            or identity[1] < state["file_position"]:
+        state = _empty_state()
+
+    with open(path, "rb") as f:
+        f.seek(state["file_position"])
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            segment = json.loads(line)
+            if segment["start"] != state["end"]:
+                return _empty_state()
+            _merge(state, segment)
+            state["file_position"] += len(line)
+    state["file_identity"] = file_identity(path)
+    return state
+
+
+def _is_append_of(ledger_path, state, identity):
+    if state["segments"] == 0:
+        return True
+    if state["inode"] != identity[0] or identity[1] < state["end"]:
+        return False
+    return read_anchor(ledger_path, state["end"]).hex() == state["anchor"]
+
+
+def _write_segment(path, state, start, end, postings, inode, anchor, mode):
+    segment = {"inode": inode, "start": start, "end": end, "anchor": anchor,
+               "postings": {token: _encode(offsets, start) for token, offsets in postings.items()}}
+    line = (json.dumps(segment) + "\n").encode("utf-8")
+    if mode == "wb":
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(line)
+        os.replace(tmp_path, path)
+        state = _empty_state()
+    else:
+        with open(path, "ab") as f:
+            f.write(line)
+    return _read_segments(path, state)
+
+
+def _compact(path, state, inode):
+    """Rewrites the index file as a single segment."""
+    postings = {token: np.concatenate(arrays).tolist() for token, arrays in state["postings"].items()}
+    return _write_segment(path, state, 0, state["end"], postings, inode, state["anchor"], "wb")
+
+
+@instrumented("index", "search.load")
+def load_search_index(ledger_path):
+    """Returns the in-memory search index for a ledger, extending it with any appended rows first.
+
+    New rows are tokenized and written as one more segment of the index
+    file, so an append costs time in proportion to the rows added. When the
+    ledger was rewritten the index is rebuilt from the first row.
+    """
+    identity = file_identity(ledger_path)
+    if identity is None:
+        return _empty_state()
+
+    path = sidecar_path(ledger_path, SEARCH_SUFFIX)
+    with _lock:
+        state = _loaded.get(path)
+        if state is not None and state["identity"] == identity:
+            return state
+
+        with file_lock(path):
+            state = _read_segments(path, state or _empty_state())
+            mode = "ab"
+            if not _is_append_of(ledger_path, state, identity):
+                state = _empty_state()
+                mode = "wb"
+            if identity[1] > state["end"] or state["segments"] == 0:
+                start = state["end"]
+                end, postings = _segment_postings(ledger_path, start)
+                state = _write_segment(path, state, start, end, postings, identity[0],
+                                       read_anchor(ledger_path, end).hex(), mode)
+            if state["segments"] > MAX_SEGMENTS:
+                state = _compact(path, state, identity[0])
+
+        state["identity"] = identity
+        _loaded[path] = state
+        return state
+
+
+def refresh_search_index(ledger_path):
+    """Folds appended rows into the search index if this process has it loaded."""
+    if sidecar_path(ledger_path, SEARCH_SUFFIX) in _loaded:
+        load_search_index(ledger_path)
+
+
+def discard_search_index(ledger_path):
+    """Deletes the search index so the next search rebuilds it."""
+    path = sidecar_path(ledger_path, SEARCH_SUFFIX)
+    with _lock:
+        _loaded.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _postings(state, token):
+    arrays = state["postings"][token]
+    if len(arrays) > 1:
+        arrays[:] = [np.concatenate(arrays)]
+    return arrays[0]
+
+
+def _term_matches(state, term):
+    """Returns (rows with the exact token, rows with a longer token starting with term)."""
+    vocabulary = state["vocabulary"]
+    if vocabulary is None:
+        vocabulary = state["vocabulary"] = sorted(state["postings"])
+    exact = _postings(state, term) if term in state["postings"] else np.empty(0, dtype=np.int64)
+    first = bisect.bisect_right(vocabulary, term)
+    last = bisect.bisect_left(vocabulary, term + "\U0010ffff", first)
+    longer = [_postings(state, token) for token in vocabulary[first:last]]
+    prefixed = np.unique(np.concatenate(longer)) if longer else np.empty(0, dtype=np.int64)
+    return exact, prefixed
+
+
+def _read_row(f, offset):
+    f.seek(offset)
+    line = f.readline()
+    # A quoted description may span several lines.
+    while line.count(b'"') % 2:
+        more = f.readline()
+        if not more:
+            break
+        line += more
+    return next(csv.reader(io.StringIO(line.decode("utf-8"), newline="")))
+
+
+@instrumented("data", "search.query")
+def search(ledger_path, query, offset=0, limit=20):
+    """Returns (total matches, rows) for a query, best matches first.
+
+    Every query word must match a description or category token exactly or
+    as a prefix. Exact matches rank above prefix matches, and ties go to the
+    most recently added rows. Only the rows of the requested page are read.
+    """
+    terms = tokenize(query)
+    state = load_search_index(ledger_path)
+    if not terms or not state["postings"]:
+        return 0, []
+
+    candidates = None
+    scores = []
+    for term in terms:
+        exact, prefixed = _term_matches(state, term)
+        matched = np.union1d(exact, prefixed)
+        candidates = matched if candidates is None else np.intersect1d(candidates, matched, assume_unique=True)
+        scores.append(exact)
+    score = len(terms) + sum(np.isin(candidates, exact).astype(np.int64) for exact in scores)
+    order = np.lexsort((-candidates, -score))
+    page = candidates[order[offset:offset + limit]].tolist()
+
+    with open(ledger_path, "rb") as f:
+        rows = [_read_row(f, row_offset) for row_offset in page]
+    record_io(rows=len(page))
+    return len(candidates), rows
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+
+from features.data.instrumentation import instrumented, record_io
+from features.data.ledger_file import file_identity, read_anchor, iter_row_spans
+
+# Sidecars already loaded in this process, keyed by sidecar path.
+_loaded = {}
+_lock = threading.Lock()
+
+
+def sidecar_path(ledger_path, suffix):
+    """Returns the path of a sidecar file stored next to a ledger file."""
+    return os.path.splitext(ledger_path)[0] + suffix
+
+
+def _empty_sidecar():
+    return {"identity": None, "inode": None, "offset": 0, "anchor": "", "complete": True, "data": {}}
+
+
+def _read_sidecar(path):
+    try:
+        with open(path, "r") as f:
+            sidecar = json.load(f)
+        if "data" in sidecar and "offset" in sidecar:
+            return sidecar
+    except (FileNotFoundError, ValueError):
+        pass
+    return _empty_sidecar()
+
+
+def _save_sidecar(path, sidecar):
+    # Unique per writer so concurrent processes never share a temp file.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(sidecar, f)
+    os.replace(tmp_path, path)
+
+
+def _is_append_of(ledger_path, sidecar, identity):
+    """Checks whether the ledger only grew past what the sidecar covers."""
+    if sidecar["inode"] != identity[0] or not sidecar["complete"]:
+        return False
+    if identity[1] < sidecar["offset"]:
+        return False
+    return read_anchor(ledger_path, sidecar["offset"]).hex() == sidecar["anchor"]
+
+
+@instrumented("index", "sidecar.scan")
+def _scan(ledger_path, sidecar, consume):
+    """Feeds the ledger rows after the covered offset to consume()."""
+    offset = sidecar["offset"]
+    with open(ledger_path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+
+    rows = []
+    for start, end, complete in iter_row_spans(data, offset):
+        rows.append((start, end, data[start - offset:end - offset]))
+        sidecar["offset"] = end
+        sidecar["complete"] = complete
+    if rows:
+        consume(sidecar["data"], rows)
+    record_io(rows=len(rows), bytes_read=len(data))
+    sidecar["anchor"] = read_anchor(ledger_path, sidecar["offset"]).hex()
+
+
+def load_sidecar(ledger_path, suffix, consume):
+    """Returns a sidecar's data, bringing it up to date with the ledger first.
+
+    consume(data, rows) folds newly appended rows, given as (start, end, raw
+    bytes) tuples, into the sidecar's data. When the ledger was truncated or
+    rewritten the sidecar is rebuilt from the first row.
+    """
+    identity = file_identity(ledger_path)
+    if identity is None:
+        return {}
+
+    path = sidecar_path(ledger_path, suffix)
+    with _lock:
+        sidecar = _loaded.get(path) or _read_sidecar(path)
+        if sidecar["identity"] == list(identity):
+            _loaded[path] = sidecar
+            return sidecar["data"]
+
+        if not _is_append_of(ledger_path, sidecar, identity):
+            sidecar = _empty_sidecar()
+        _scan(ledger_path, sidecar, consume)
+        sidecar["inode"] = identity[0]
+        sidecar["identity"] = list(identity)
+        _save_sidecar(path, sidecar)
+        _loaded[path] = sidecar
+        return sidecar["data"]
+
+
+def discard_sidecar(ledger_path, suffix):
+    """Deletes a sidecar so the next load rebuilds it from scratch."""
+    path = sidecar_path(ledger_path, suffix)
+    with _lock:
+        _loaded.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def load_sidecar_copy(ledger_path, suffix, consume):
+    """Like load_sidecar(), but returns (covered ledger offset, shallow copy of the data).
+
+    The offset is None when there is no ledger yet.
+    """
+    load_sidecar(ledger_path, suffix, consume)
+    with _lock:
+        sidecar = _loaded.get(sidecar_path(ledger_path, suffix))
+        if sidecar is None:
+            return None, {}
+        return sidecar["offset"], dict(sidecar["data"])
+
+
+def update_sidecar(ledger_path, suffix, update, offset):
+    """Applies update(data) to a loaded sidecar and saves it.
+
+    Nothing changes when the sidecar no longer covers exactly offset, i.e.
+    rows were appended since the caller read it. Returns whether it saved.
+    """
+    path = sidecar_path(ledger_path, suffix)
+    with _lock:
+        sidecar = _loaded.get(path)
+        if sidecar is None or sidecar["offset"] != offset:
+            return False
+        update(sidecar["data"])
+        _save_sidecar(path, sidecar)
+        return True
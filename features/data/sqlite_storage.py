@@ -0,0 +1,402 @@
+import sqlite3
+import threading
+
+from features.data.instrumentation import instrumented, record_io
+from features.data.row_hashes import row_hash
+from features.data.search_index import tokenize
+from features.data.storage import DEFAULT_BUDGET_PERIOD, Storage
+from features.data.store import TransactionStore, month_date_range
+from features.data.transaction import transactions_from_rows
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT NOT NULL,
+    amount INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date);
+CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions (type, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, date);
+CREATE TABLE IF NOT EXISTS budgets (
+    category TEXT PRIMARY KEY,
+    amount INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('budgets', 0);
+CREATE TABLE IF NOT EXISTS row_hashes (
+    hash TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO meta (key, value) VALUES ('hashed_generation', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('hashed_id', 0);
+CREATE TABLE IF NOT EXISTS month_snapshots (
+    month TEXT NOT NULL,
+    type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (month, type, category)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshot_months (
+    month TEXT PRIMARY KEY
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('snapshot_generation', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('snapshot_id', 0);
+"""
+
+# Full-text index over descriptions and categories, kept up to date by a
+# trigger. Rows are only ever deleted all at once, by clear().
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5 (
+    description, category, content = 'transactions', content_rowid = 'id', prefix = '2 3'
+);
+CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+    INSERT INTO transactions_fts (rowid, description, category) VALUES (new.id, new.description, new.category);
+END;
+INSERT OR IGNORE INTO meta (key, value) VALUES ('search_indexed', 0);
+"""
+
+COLUMNS = "date, type, category, description, amount"
+
+# Row hashes are looked up in groups of this size (below SQLite's parameter limit).
+HASH_LOOKUP_SIZE = 500
+# Rows hashed per step when catching the row_hashes table up with the ledger.
+HASH_SYNC_BATCH = 10000
+
+# Seconds a connection waits for another session's write to finish.
+BUSY_TIMEOUT = 30
+
+
+def _where_clause(start=None, end=None, type_=None, categories=None):
+    """Builds a WHERE clause and its parameters for the transaction filters."""
+    clauses = []
+    params = []
+    if start is not None:
+        clauses.append("date >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("date <= ?")
+        params.append(end)
+    if type_ is not None:
+        clauses.append("type = ?")
+        params.append(type_)
+    if categories is not None:
+        categories = list(categories)
+        clauses.append(f"category IN ({', '.join('?' * len(categories))})")
+        params.extend(categories)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+class SqliteStorage(Storage):
+    """Keeps the ledger and budgets in a SQLite database in WAL mode.
+
+    Month filters, per-category totals and top-N queries are answered by SQL
+    over the date, type and category indexes instead of in Python.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._cache = None
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            self._add_budget_periods(conn)
+        self._searchable = self._create_search_index()
+
+    def _connect(self):
+        # sqlite3 connections may not be shared across threads (Streamlit
+        # serves each session on its own thread), so keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # SQLite serializes writers itself; wait for a busy writer instead of failing.
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _add_budget_periods(self, conn):
+        """Adds the period and rollover columns to budget tables created before they existed."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(budgets)")}
+        if "period" not in columns:
+            conn.execute(f"ALTER TABLE budgets ADD COLUMN period TEXT NOT NULL DEFAULT '{DEFAULT_BUDGET_PERIOD}'")
+        if "rollover" not in columns:
+            conn.execute("ALTER TABLE budgets ADD COLUMN rollover INTEGER NOT NULL DEFAULT 0")
+
+    def _create_search_index(self):
+        """Creates the full-text index, filling it from existing rows once; False if FTS5 is missing."""
+        try:
+            with self._connect() as conn:
+                conn.executescript(SEARCH_SCHEMA)
+                if not conn.execute("SELECT value FROM meta WHERE key = 'search_indexed'").fetchone()[0]:
+                    conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+                    conn.execute("UPDATE meta SET value = 1 WHERE key = 'search_indexed'")
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    def count_transactions(self, start=None, type_=None):
+        where, params = _where_clause(start, None, type_)
+        return self._connect().execute(f"SELECT COUNT(*) FROM transactions{where}", params).fetchone()[0]
+
+    def transaction_page(self, offset, limit, start=None, type_=None):
+        where, params = _where_clause(start, None, type_)
+        rows = self._connect().execute(
+            f"SELECT {COLUMNS} FROM transactions{where} ORDER BY date DESC, id LIMIT ? OFFSET ?",
+            params + [limit, offset])
+        return list(transactions_from_rows(rows))
+
+    def _version(self):
+        """Returns (generation, last row id); the generation is bumped whenever rows are deleted."""
+        row = self._connect().execute(
+            "SELECT (SELECT value FROM meta WHERE key = 'generation'),"
+            " (SELECT COALESCE(MAX(id), 0) FROM transactions)").fetchone()
+        return tuple(row)
+
+    def version(self):
+        budgets = self._connect().execute("SELECT value FROM meta WHERE key = 'budgets'").fetchone()[0]
+        return self._version() + (budgets,)
+
+    @instrumented("query")
+    def load_store(self):
+        """Returns every transaction, fetching only rows added since the last call."""
+        version = self._version()
+        with self._lock:
+            cached = self._cache
+            if cached and cached["version"] == version:
+                return cached["store"]
+
+            if cached and cached["version"][0] == version[0] and cached["version"][1] <= version[1]:
+                store, last_id = cached["store"], cached["version"][1]
+            else:
+                store, last_id = TransactionStore(), 0
+            fetched = len(store)
+            store.extend(self._connect().execute(
+                f"SELECT {COLUMNS} FROM transactions WHERE id > ? AND id <= ? ORDER BY id",
+                (last_id, version[1])))
+            record_io(rows=len(store) - fetched)
+            self._cache = {"version": version, "store": store}
+            return store
+
+    def iter_transactions(self, start=None, end=None, type_=None, categories=None):
+        where, params = _where_clause(start, end, type_, categories)
+
+        # A dedicated connection keeps the lazy cursor independent of other queries.
+        conn = sqlite3.connect(self.path)
+        fetched = 0
+        try:
+            for transaction in transactions_from_rows(
+                    conn.execute(f"SELECT {COLUMNS} FROM transactions{where} ORDER BY id", params)):
+                fetched += 1
+                yield transaction
+        finally:
+            conn.close()
+            record_io(rows=fetched)
+
+    def month_store(self, month_str):
+        store = TransactionStore()
+        store.extend(self._connect().execute(
+            f"SELECT {COLUMNS} FROM transactions WHERE date BETWEEN ? AND ? ORDER BY id",
+            month_date_range(month_str)))
+        return store
+
+    def month_totals(self, month_str):
+        totals = {}
+        rows = self._connect().execute(
+            "SELECT type, category, SUM(amount) FROM transactions"
+            " WHERE date BETWEEN ? AND ? GROUP BY type, category",
+            month_date_range(month_str))
+        for type_, category, amount in rows:
+            totals.setdefault(type_, {})[category] = amount
+        return totals
+
+    def top_categories(self, month_str, type_, limit):
+        first, last = month_date_range(month_str)
+        return self._connect().execute(
+            "SELECT category, SUM(amount) AS total FROM transactions"
+            " WHERE type = ? AND date BETWEEN ? AND ?"
+            " GROUP BY category ORDER BY total DESC LIMIT ?",
+            (type_, first, last, limit)).fetchall()
+
+    def _touched_months(self, conn, after_id):
+        return [row[0] for row in conn.execute(
+            "SELECT DISTINCT substr(date, 1, 7) FROM transactions WHERE id > ?", (after_id,))]
+
+    def _drop_snapshots(self, conn, months=None):
+        if months is None:
+            conn.execute("DELETE FROM month_snapshots")
+            conn.execute("DELETE FROM snapshot_months")
+            return
+        conn.executemany("DELETE FROM month_snapshots WHERE month = ?", ((m,) for m in months))
+        conn.executemany("DELETE FROM snapshot_months WHERE month = ?", ((m,) for m in months))
+
+    def load_month_snapshots(self):
+        """Drops snapshots of months that received rows since the last call, then returns the rest.
+
+        The token is the ledger version the snapshots are valid for.
+        """
+        conn = self._connect()
+        token = self._version()
+        marker = dict(conn.execute(
+            "SELECT key, value FROM meta WHERE key IN ('snapshot_generation', 'snapshot_id')"))
+        if (marker["snapshot_generation"], marker["snapshot_id"]) != token:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                marker = dict(conn.execute(
+                    "SELECT key, value FROM meta WHERE key IN ('snapshot_generation', 'snapshot_id')"))
+                if marker["snapshot_generation"] != token[0]:
+                    self._drop_snapshots(conn)
+                else:
+                    self._drop_snapshots(conn, self._touched_months(conn, marker["snapshot_id"]))
+                token = self._version()
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'snapshot_generation'", (token[0],))
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'snapshot_id'", (token[1],))
+
+        snapshots = {month: [] for (month,) in conn.execute("SELECT month FROM snapshot_months")}
+        for month, type_, category, amount, count in conn.execute(
+                "SELECT month, type, category, amount, count FROM month_snapshots"):
+            snapshots.setdefault(month, []).append([type_, category, amount, count])
+        return token, snapshots
+
+    def save_month_snapshots(self, token, snapshots):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            generation, _ = self._version()
+            if generation != token[0]:
+                return
+            snapshots = dict(snapshots)
+            for month in self._touched_months(conn, token[1]):
+                snapshots.pop(month, None)
+            self._drop_snapshots(conn, list(snapshots))
+            conn.executemany("INSERT INTO snapshot_months (month) VALUES (?)", ((m,) for m in snapshots))
+            conn.executemany(
+                "INSERT INTO month_snapshots (month, type, category, amount, count) VALUES (?, ?, ?, ?, ?)",
+                ((month, *cell) for month, cells in snapshots.items() for cell in cells))
+
+    def append_transactions(self, rows):
+        with self._connect() as conn:
+            conn.executemany(f"INSERT INTO transactions ({COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                             ((r[0], r[1], r[2], r[3], int(r[4])) for r in rows))
+
+    def appended_exactly(self, before, after, rows):
+        # (generation, last row id, budgets): row ids are consecutive within one insert.
+        generation, last_id, budgets = before
+        return after == (generation, last_id + len(rows), budgets)
+
+    def import_transactions(self, batches):
+        # One transaction for every batch: SQLite rolls all of it back on error.
+        with self._connect() as conn:
+            for rows in batches:
+                conn.executemany(f"INSERT INTO transactions ({COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                                 ((r[0], r[1], r[2], r[3], int(r[4])) for r in rows))
+
+    def _sync_row_hashes(self, conn):
+        """Folds rows added since the last sync into the row_hashes table.
+
+        The table is rebuilt from scratch after the ledger was cleared.
+        """
+        generation, last_id = self._version()
+        hashed = dict(conn.execute(
+            "SELECT key, value FROM meta WHERE key IN ('hashed_generation', 'hashed_id')"))
+        if hashed["hashed_generation"] == generation and hashed["hashed_id"] == last_id:
+            return
+
+        with conn:
+            # Take the write lock before re-reading the meta rows so two
+            # sessions never fold the same rows in twice.
+            conn.execute("BEGIN IMMEDIATE")
+            hashed = dict(conn.execute(
+                "SELECT key, value FROM meta WHERE key IN ('hashed_generation', 'hashed_id')"))
+            generation = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+            if hashed["hashed_generation"] != generation:
+                conn.execute("DELETE FROM row_hashes")
+                hashed["hashed_id"] = 0
+            last_id = hashed["hashed_id"]
+            cursor = conn.execute(f"SELECT id, {COLUMNS} FROM transactions WHERE id > ? ORDER BY id",
+                                  (last_id,))
+            while True:
+                rows = cursor.fetchmany(HASH_SYNC_BATCH)
+                if not rows:
+                    break
+                conn.executemany(
+                    "INSERT INTO row_hashes (hash, count) VALUES (?, 1)"
+                    " ON CONFLICT (hash) DO UPDATE SET count = count + 1",
+                    ((row_hash(row[1:]),) for row in rows))
+                last_id = rows[-1][0]
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'hashed_generation'", (generation,))
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'hashed_id'", (last_id,))
+
+    def row_hash_counts(self, hashes):
+        conn = self._connect()
+        self._sync_row_hashes(conn)
+        hashes = list(hashes)
+        counts = {}
+        for i in range(0, len(hashes), HASH_LOOKUP_SIZE):
+            group = hashes[i:i + HASH_LOOKUP_SIZE]
+            counts.update(conn.execute(
+                f"SELECT hash, count FROM row_hashes WHERE hash IN ({', '.join('?' * len(group))})",
+                group))
+        return counts
+
+    @instrumented("query")
+    def search_transactions(self, query, offset=0, limit=20):
+        terms = tokenize(query)
+        if not self._searchable:
+            return super().search_transactions(query, offset, limit)
+        if not terms:
+            return 0, []
+        # Each word must match a token, whole or as its prefix.
+        match = " ".join(f'"{term}"*' for term in terms)
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM transactions_fts WHERE transactions_fts MATCH ?",
+                             (match,)).fetchone()[0]
+        rows = conn.execute(
+            "SELECT t.date, t.type, t.category, t.description, t.amount"
+            " FROM transactions_fts JOIN transactions AS t ON t.id = transactions_fts.rowid"
+            " WHERE transactions_fts MATCH ? ORDER BY transactions_fts.rank, t.date DESC, t.id DESC"
+            " LIMIT ? OFFSET ?",
+            (match, limit, offset)).fetchall()
+        record_io(rows=len(rows))
+        return total, list(transactions_from_rows(rows))
+
+    def get_budget_rules(self):
+        rows = self._connect().execute("SELECT category, amount, period, rollover FROM budgets")
+        return {category: (amount, period, bool(rollover)) for category, amount, period, rollover in rows}
+
+    def set_budget(self, category, amount, period=DEFAULT_BUDGET_PERIOD, rollover=False):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO budgets (category, amount, period, rollover) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (category) DO UPDATE SET amount = excluded.amount,"
+                " period = excluded.period, rollover = excluded.rollover",
+                (category, amount, period, int(rollover)))
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'budgets'")
+
+    def clear(self):
+        with self._connect() as conn:
+            if self._searchable:
+                conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('delete-all')")
+            conn.execute("DELETE FROM transactions")
+            conn.execute("DELETE FROM budgets")
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key IN ('generation', 'budgets')")
+        with self._lock:
+            self._cache = None
+
+    def rebuild_indexes(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM row_hashes")
+            conn.execute("UPDATE meta SET value = 0 WHERE key = 'hashed_id'")
+            self._drop_snapshots(conn)
+            if self._searchable:
+                conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+            conn.execute("REINDEX transactions")
+            conn.execute("ANALYZE")
@@ -0,0 +1,285 @@
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from features.data.ledgers import ledger_root
+from features.data.search_index import tokenize, row_tokens, rank_matches
+from features.data.store import date_to_ordinal
+from features.data.writer import file_lock
+
+# Data files inside each ledger's directory.
+TRANSACTION_FILENAME = "transactions.txt"
+BUDGET_FILENAME = "budgets.txt"
+DATABASE_FILENAME = "finance.db"
+BINARY_FILENAME = "transactions.bin"
+
+LedgerFiles = namedtuple("LedgerFiles", ["transactions", "budgets", "database", "binary"])
+
+# Set to "csv", "sqlite" or "binary" to force a backend. Without it the
+# SQLite backend is used once the ledger's finance.db exists (i.e. after a
+# migration), else the binary one once transactions.bin exists.
+STORAGE_ENV = "FINANCE_TRACKER_STORAGE"
+
+# Periods a budget can cover. Budgets saved before periods existed are monthly.
+BUDGET_PERIODS = ("weekly", "monthly", "quarterly", "yearly")
+DEFAULT_BUDGET_PERIOD = "monthly"
+
+_backends = {}
+_lock = threading.Lock()
+
+
+class Storage:
+    """Interface implemented by every ledger storage backend.
+
+    Transactions are exchanged as raw rows ([date, type, category,
+    description, amount]) with amounts in cents, budgets as a
+    {category: (cents, period, rollover)} dict.
+    """
+
+    def version(self):
+        """Returns a token that changes whenever transactions or budgets change."""
+        raise NotImplementedError
+
+    def load_store(self):
+        """Returns a TransactionStore with every transaction."""
+        raise NotImplementedError
+
+    def iter_transactions(self, start=None, end=None, type_=None, categories=None):
+        """Lazily yields Transactions in ledger order, filtered while reading.
+
+        start and end are inclusive YYYY-MM-DD strings; categories is a
+        collection of category names.
+        """
+        raise NotImplementedError
+
+    def select_store(self, start=None, end=None, type_=None, categories=None, offset=0, limit=None):
+        """Returns a TransactionStore of the matching transactions in ledger order, from offset on.
+
+        Takes the filters of iter_transactions(); limit bounds the rows returned.
+        """
+        store = self.load_store()
+        positions = np.flatnonzero(store.mask(
+            date_to_ordinal(start) if start is not None else None,
+            date_to_ordinal(end) if end is not None else None,
+            type_, categories))
+        return store.take(positions[offset:offset + limit if limit is not None else None])
+
+    def recent_transactions(self, limit):
+        """Returns the newest limit transactions, newest first."""
+        return list(self.load_store().latest(limit))
+
+    def count_transactions(self, start=None, type_=None):
+        """Counts the transactions dated on or after start and of a type."""
+        start = date_to_ordinal(start) if start is not None else None
+        return self.load_store().count(start, type_)
+
+    def transaction_page(self, offset, limit, start=None, type_=None):
+        """Returns up to limit Transactions newest first, skipping the first offset.
+
+        Transactions sharing a date keep their ledger order.
+        """
+        start = date_to_ordinal(start) if start is not None else None
+        return list(self.load_store().page(offset, limit, start, type_))
+
+    def search_transactions(self, query, offset=0, limit=20):
+        """Returns (total matches, up to limit Transactions) for a free-text query, best first.
+
+        Every word of the query must match a word of the description or
+        category, whole or as its beginning. This default scans the whole
+        ledger; backends override it with an index.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+        transactions = list(self.iter_transactions())
+        ranked = rank_matches(terms, ((i, row_tokens(t.category, t.description))
+                                      for i, t in enumerate(transactions)))
+        return len(ranked), [transactions[i] for i in ranked[offset:offset + limit]]
+
+    def month_store(self, month_str):
+        """Returns a TransactionStore with the transactions of a YYYY-MM month."""
+        raise NotImplementedError
+
+    def month_totals(self, month_str):
+        """Returns {type: {category: cents}} for a YYYY-MM month."""
+        raise NotImplementedError
+
+    def top_categories(self, month_str, type_, limit):
+        """Returns the highest (category, cents) pairs of a type in a month."""
+        totals = self.month_totals(month_str).get(type_, {})
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def load_month_snapshots(self):
+        """Returns (token, {month: [[type, category, cents, rows], ...]}) of stored month summaries.
+
+        Months that received rows since their summary was stored are left
+        out. Pass the token back to save_month_snapshots().
+        """
+        raise NotImplementedError
+
+    def save_month_snapshots(self, token, snapshots):
+        """Stores month summaries computed after load_month_snapshots() returned token.
+
+        Summaries are dropped instead when rows were added to their month in
+        the meantime.
+        """
+        raise NotImplementedError
+
+    def append_transactions(self, rows):
+        """Appends transaction rows to the ledger."""
+        raise NotImplementedError
+
+    def appended_exactly(self, before, after, rows):
+        """Checks whether going from version before to after was just these rows being appended.
+
+        Backends that cannot tell answer False, so callers recompute.
+        """
+        return False
+
+    def import_transactions(self, batches):
+        """Appends an iterable of row batches atomically: either every row is stored or none is."""
+        raise NotImplementedError
+
+    def row_hash_counts(self, hashes):
+        """Returns {row hash: occurrences in the ledger} for the given row_hash() digests.
+
+        Hashes that do not occur in the ledger are left out.
+        """
+        raise NotImplementedError
+
+    def get_budget_rules(self):
+        """Returns {category: (cents, period, rollover)} for every budget."""
+        raise NotImplementedError
+
+    def get_budgets(self):
+        """Returns {category: cents} for every budget, whatever its period."""
+        return {category: rule[0] for category, rule in self.get_budget_rules().items()}
+
+    def set_budget(self, category, amount, period=DEFAULT_BUDGET_PERIOD, rollover=False):
+        """Creates or replaces the budget for a category.
+
+        period is one of BUDGET_PERIODS; with rollover, what is left of (or
+        overspent in) one period carries into the next.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """Deletes every transaction and budget."""
+        raise NotImplementedError
+
+    def rebuild_indexes(self):
+        """Rebuilds any derived index the backend keeps."""
+
+
+def row_predicate(start=None, end=None, type_=None, categories=None):
+    """Builds a filter over raw [date, type, category, ...] rows.
+
+    ISO dates compare correctly as strings, so no date parsing is needed.
+    """
+    def matches(row):
+        if start is not None and row[0] < start:
+            return False
+        if end is not None and row[0] > end:
+            return False
+        if type_ is not None and row[1] != type_:
+            return False
+        if categories is not None and row[2] not in categories:
+            return False
+        return True
+    return matches
+
+
+def ledger_files(ledger=None):
+    """Returns the paths of a ledger's data files (default: the active ledger)."""
+    root = ledger_root(ledger)
+    return LedgerFiles(os.path.join(root, TRANSACTION_FILENAME), os.path.join(root, BUDGET_FILENAME),
+                       os.path.join(root, DATABASE_FILENAME), os.path.join(root, BINARY_FILENAME))
+
+
+def storage_name(ledger=None):
+    """Returns the name of the backend selected for a ledger (default: the active one)."""
+    name = os.environ.get(STORAGE_ENV, "").strip().lower()
+    if name:
+        return name
+    files = ledger_files(ledger)
+    if os.path.exists(files.database):
+        return "sqlite"
+    return "binary" if os.path.exists(files.binary) else "csv"
+
+
+def get_storage(name=None, ledger=None):
+    """Returns the (process-wide) storage backend instance of a ledger (default: the active one)."""
+    files = ledger_files(ledger)
+    name = name or storage_name(ledger)
+    with _lock:
+        backend = _backends.get((files.transactions, name))
+        if backend is None:
+            if name == "csv":
+                from features.data.csv_storage import CsvStorage
+                backend = CsvStorage(files.transactions, files.budgets)
+            elif name == "sqlite":
+                from features.data.sqlite_storage import SqliteStorage
+                backend = SqliteStorage(files.database)
+            elif name == "binary":
+                from features.data.binary_storage import BinaryStorage
+                backend = BinaryStorage(files.binary, files.budgets)
+            else:
+                raise ValueError(f"Unknown storage backend '{name}'. Use 'csv', 'sqlite' or 'binary'.")
+            _backends[(files.transactions, name)] = backend
+        return backend
+
+
+def reset_storage():
+    """Forgets every backend instance so the next get_storage() reopens the data files."""
+    with _lock:
+        _backends.clear()
+
+
+def migrate_csv_to_sqlite(ledger=None):
+    """Copies a ledger's CSV transactions and budgets into a new SQLite database.
+
+    Returns the number of transactions migrated. Refuses to run against a
+    database that already holds transactions so it cannot duplicate data.
+    """
+    source = get_storage("csv", ledger)
+    target = get_storage("sqlite", ledger)
+    if target.count_transactions():
+        raise ValueError(f"{ledger_files(ledger).database} already contains transactions.")
+
+    store = source.load_store()
+    target.append_transactions(t.as_row() for t in store)
+    for category, (amount, period, rollover) in source.get_budget_rules().items():
+        target.set_budget(category, amount, period, rollover)
+    return len(store)
+
+
+def convert_csv_to_binary(ledger=None):
+    """Converts a ledger's transactions.txt into the binary format, which is used from then on.
+
+    Returns the number of transactions converted. transactions.txt is left
+    in place but no longer updated.
+    """
+    from features.data import binary_ledger
+
+    files = ledger_files(ledger)
+    with file_lock(files.transactions), file_lock(files.binary):
+        count = binary_ledger.csv_to_binary(files.transactions, files.binary)
+    reset_storage()
+    return count
+
+
+def convert_binary_to_csv(ledger=None):
+    """Writes a binary ledger back to transactions.txt and removes it, so the CSV backend is used again.
+
+    Returns the number of transactions converted.
+    """
+    from features.data import binary_ledger
+
+    files = ledger_files(ledger)
+    with file_lock(files.transactions), file_lock(files.binary):
+        count = binary_ledger.binary_to_csv(files.binary, files.transactions)
+        binary_ledger.remove_ledger_files(files.binary)
+    reset_storage()
+    return count
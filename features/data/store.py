@@ -0,0 +1,268 @@
+from datetime import date
+
+import numpy as np
+
+from features.data.instrumentation import record_io
+from features.data.transaction import Transaction, parse_row
+
+# Rows whose columns are converted to Python values at a time while iterating.
+ROW_CHUNK = 4096
+
+
+def date_to_ordinal(date_str):
+    """Converts a YYYY-MM-DD string to a proleptic Gregorian ordinal."""
+    return date.fromisoformat(date_str).toordinal()
+
+
+def month_bounds(month_str):
+    """Returns the first and last date ordinals of a YYYY-MM month."""
+    year, month = (int(part) for part in month_str.split("-"))
+    first = date(year, month, 1)
+    next_first = date(year + month // 12, month % 12 + 1, 1)
+    return first.toordinal(), next_first.toordinal() - 1
+
+
+def month_date_range(month_str):
+    """Returns the first and last ISO dates of a YYYY-MM month."""
+    first, last = month_bounds(month_str)
+    return date.fromordinal(first).isoformat(), date.fromordinal(last).isoformat()
+
+
+class TransactionStore:
+    """Columnar, in-memory representation of the transaction ledger.
+
+    Amounts are kept as int64 cents, dates as int32 ordinals, and type and
+    category as small integer codes into shared vocabularies, so aggregations
+    run as array operations instead of per-row Python loops. Iterating a store
+    yields the Transaction rows the rest of the app expects.
+    """
+
+    def __init__(self, types=None, categories=None):
+        self.amounts = np.empty(0, dtype=np.int64)
+        self.dates = np.empty(0, dtype=np.int32)
+        self.type_codes = np.empty(0, dtype=np.int8)
+        self.category_codes = np.empty(0, dtype=np.int16)
+        self.descriptions = []
+        # Vocabularies are shared with slices so codes stay comparable.
+        self.types = types if types is not None else []
+        self.categories = categories if categories is not None else []
+        # Ledger rows extend() could not parse and left out.
+        self.skipped = 0
+        # Newest-first row order and its negated dates, built on first use.
+        self._order = None
+        self._order_keys = None
+
+    @classmethod
+    def from_records(cls, transactions):
+        """Builds a store from an iterable of Transactions."""
+        store = cls()
+        store.extend(t.as_row() for t in transactions)
+        return store
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def __getstate__(self):
+        # Sent between processes by the ledger daemon: lazily mapped descriptions
+        # become a plain list, and the row order is rebuilt on first use.
+        state = dict(self.__dict__, _order=None, _order_keys=None)
+        if not isinstance(self.descriptions, list):
+            state["descriptions"] = list(self.descriptions)
+        return state
+
+    def __iter__(self):
+        return self._rows(np.arange(len(self)))
+
+    def _code(self, vocabulary, value):
+        try:
+            return vocabulary.index(value)
+        except ValueError:
+            vocabulary.append(value)
+            return len(vocabulary) - 1
+
+    def extend(self, rows):
+        """Appends raw ledger rows ([date, type, category, description, amount]).
+
+        Rows parse_row() rejects are skipped and counted in self.skipped
+        instead of failing the load.
+        """
+        ordinals = []
+        type_codes = []
+        category_codes = []
+        amounts = []
+        descriptions = []
+        type_lookup = {value: code for code, value in enumerate(self.types)}
+        category_lookup = {value: code for code, value in enumerate(self.categories)}
+
+        for row in rows:
+            if not row:
+                continue
+            parsed = parse_row(row)
+            if parsed is None:
+                self.skipped += 1
+                continue
+            ordinal, amount = parsed
+            ordinals.append(ordinal)
+
+            code = type_lookup.get(row[1])
+            if code is None:
+                code = type_lookup[row[1]] = self._code(self.types, row[1])
+            type_codes.append(code)
+
+            code = category_lookup.get(row[2])
+            if code is None:
+                code = category_lookup[row[2]] = self._code(self.categories, row[2])
+            category_codes.append(code)
+
+            descriptions.append(row[3])
+            amounts.append(amount)
+
+        if not amounts:
+            return
+        first_new = len(self.amounts)
+        self.descriptions.extend(descriptions)
+        self.dates = np.concatenate([self.dates, np.array(ordinals, dtype=np.int32)])
+        self.type_codes = np.concatenate([self.type_codes, np.array(type_codes, dtype=np.int8)])
+        self.category_codes = np.concatenate(
+            [self.category_codes, np.array(category_codes, dtype=np.int16)])
+        self.amounts = np.concatenate([self.amounts, np.array(amounts, dtype=np.int64)])
+        if self._order is not None:
+            self._merge_order(first_new)
+
+    def _merge_order(self, first_new):
+        """Folds rows appended from position first_new into the cached newest-first order."""
+        keys = -self.dates[first_new:].astype(np.int64)
+        new_order = np.argsort(keys, kind="stable")
+        # Appended rows go after existing rows of the same date, like a stable sort.
+        positions = np.searchsorted(self._order_keys, keys[new_order], side="right")
+        self._order = np.insert(self._order, positions, new_order + first_new)
+        self._order_keys = np.insert(self._order_keys, positions, keys[new_order])
+
+    def row(self, i):
+        """Returns the transaction at position i."""
+        return Transaction(int(self.dates[i]), self.types[self.type_codes[i]],
+                           self.categories[self.category_codes[i]], self.descriptions[i],
+                           int(self.amounts[i]))
+
+    def _rows(self, positions):
+        """Yields the transactions at the given positions, converting the columns a chunk at a time."""
+        types, categories, descriptions = self.types, self.categories, self.descriptions
+        for start in range(0, len(positions), ROW_CHUNK):
+            chunk = positions[start:start + ROW_CHUNK]
+            for ordinal, type_code, category_code, amount, i in zip(
+                    self.dates[chunk].tolist(), self.type_codes[chunk].tolist(),
+                    self.category_codes[chunk].tolist(), self.amounts[chunk].tolist(), chunk.tolist()):
+                yield Transaction(ordinal, types[type_code], categories[category_code], descriptions[i], amount)
+
+    def take(self, indices):
+        """Returns a new store holding the rows at the given positions or mask."""
+        positions = np.asarray(indices)
+        if positions.dtype == bool:
+            positions = np.flatnonzero(positions)
+        subset = TransactionStore(self.types, self.categories)
+        subset.amounts = self.amounts[positions]
+        subset.dates = self.dates[positions]
+        subset.type_codes = self.type_codes[positions]
+        subset.category_codes = self.category_codes[positions]
+        if isinstance(self.descriptions, list):
+            subset.descriptions = [self.descriptions[i] for i in positions.tolist()]
+        else:
+            # Lazily decoded descriptions (a mapped binary ledger) are selected without decoding.
+            subset.descriptions = self.descriptions.take(positions)
+        return subset
+
+    def latest(self, limit):
+        """Returns the most recent rows, newest first, without sorting the whole store.
+
+        Rows sharing a date keep their ledger order, matching a stable sort.
+        """
+        count = len(self)
+        if limit >= count:
+            candidates = np.arange(count)
+        else:
+            # Only rows dated on or after the limit-th newest date can qualify.
+            cutoff = np.partition(self.dates, count - limit)[count - limit]
+            candidates = np.flatnonzero(self.dates >= cutoff)
+        order = np.lexsort((candidates, -self.dates[candidates].astype(np.int64)))
+        return self.take(candidates[order][:limit])
+
+    def newest_first(self, start=None, type=None):
+        """Returns row positions newest first, optionally from an ordinal start date and of a type.
+
+        Rows sharing a date keep their ledger order. The order is sorted once
+        and then kept up to date as rows are appended, so paging through the
+        ledger never re-sorts it.
+        """
+        if self._order is None:
+            keys = -self.dates.astype(np.int64)
+            self._order = np.argsort(keys, kind="stable")
+            self._order_keys = keys[self._order]
+        positions = self._order
+        if start is not None:
+            positions = positions[:np.searchsorted(self._order_keys, -start, side="right")]
+        if type is not None:
+            if type not in self.types:
+                return positions[:0]
+            positions = positions[self.type_codes[positions] == self.types.index(type)]
+        return positions
+
+    def page(self, offset, limit, start=None, type=None):
+        """Returns limit rows of the newest-first order after skipping offset rows."""
+        return self.take(self.newest_first(start, type)[offset:offset + limit])
+
+    def count(self, start=None, type=None):
+        """Counts the rows dated on or after an ordinal start date and of a type."""
+        return int(np.count_nonzero(self.mask(start, type=type)))
+
+    def mask(self, start=None, end=None, type=None, categories=None):
+        """Builds a boolean row mask for an inclusive ordinal range, a type and categories."""
+        record_io(rows=len(self))
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.dates >= start
+        if end is not None:
+            mask &= self.dates <= end
+        if type is not None:
+            if type not in self.types:
+                return np.zeros(len(self), dtype=bool)
+            mask &= self.type_codes == self.types.index(type)
+        if categories is not None:
+            codes = [code for code, category in enumerate(self.categories) if category in categories]
+            mask &= np.isin(self.category_codes, codes)
+        return mask
+
+    def iter_rows(self, mask):
+        """Yields the rows selected by a boolean mask as Transactions, in ledger order."""
+        return self._rows(np.flatnonzero(mask))
+
+    def filter(self, date_range=None, type=None):
+        """Returns the rows within an inclusive (start, end) ordinal range and of a type."""
+        start, end = date_range if date_range is not None else (None, None)
+        return self.take(self.mask(start, end, type))
+
+    def month_slice(self, month_str):
+        """Returns the rows dated within a YYYY-MM month."""
+        return self.filter(month_bounds(month_str))
+
+    def total(self, type=None):
+        """Sums amounts, optionally for a single transaction type."""
+        if type is None:
+            return int(self.amounts.sum())
+        return int(self.amounts[self.mask(type=type)].sum())
+
+    def sum_by(self, field="category", type=None):
+        """Sums amounts per category (or per type), optionally for a single type."""
+        if field == "category":
+            codes, vocabulary = self.category_codes, self.categories
+        elif field == "type":
+            codes, vocabulary = self.type_codes, self.types
+        else:
+            raise ValueError(f"Cannot group transactions by '{field}'.")
+
+        mask = self.mask(type=type)
+        totals = np.zeros(len(vocabulary), dtype=np.int64)
+        np.add.at(totals, codes[mask], self.amounts[mask])
+        present = np.zeros(len(vocabulary), dtype=bool)
+        present[codes[mask]] = True
+        return {vocabulary[code]: int(totals[code]) for code in np.flatnonzero(present)}
+
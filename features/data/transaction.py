@@ -0,0 +1,120 @@
+from datetime import date
+
+from features.transactions.categories import EXPENSE_CATEGORIES, INCOME_CATEGORIES
+
+FIELDS = ("date", "type", "category", "description", "amount")
+
+# One shared string per type and category name, seeded with the app's vocabularies.
+_labels = {label: label for label in ["Expense", "Income", *EXPENSE_CATEGORIES, *INCOME_CATEGORIES]}
+# One shared int per date ordinal, and the ISO strings of those dates.
+_ordinals = {}
+_date_strings = {}
+_date_ordinals = {}
+
+
+def intern_label(label):
+    """Returns the shared copy of a type or category name, adding names outside the vocabularies."""
+    return _labels.setdefault(label, label)
+
+
+def date_ordinal(date_str):
+    """Returns the shared ordinal of a YYYY-MM-DD date; any other spelling raises ValueError."""
+    ordinal = _date_ordinals.get(date_str)
+    if ordinal is None:
+        day = date.fromisoformat(date_str)
+        # Month lookups and range filters slice and compare the string itself.
+        if day.isoformat() != date_str:
+            raise ValueError(f"Date '{date_str}' is not in YYYY-MM-DD form.")
+        ordinal = day.toordinal()
+        ordinal = _date_ordinals[date_str] = _ordinals.setdefault(ordinal, ordinal)
+    return ordinal
+
+
+def parse_row(row):
+    """Returns (date ordinal, amount) for a raw ledger row, or None when the row is unreadable.
+
+    A readable row has exactly five fields, a YYYY-MM-DD date and a whole
+    amount. Every reader skips the rows this rejects, so totals, counts and
+    listings agree across backends and code paths.
+    """
+    if len(row) != len(FIELDS):
+        return None
+    try:
+        return date_ordinal(row[0]), int(row[4])
+    except ValueError:
+        return None
+
+
+def date_string(ordinal):
+    """Returns the shared YYYY-MM-DD string of a date ordinal."""
+    date_str = _date_strings.get(ordinal)
+    if date_str is None:
+        date_str = _date_strings[ordinal] = date.fromordinal(ordinal).isoformat()
+    return date_str
+
+
+class Transaction:
+    """One ledger row, as returned by the provider and the storage backends.
+
+    Slots instead of a dict, the type and category shared with every other row
+    of the same name, and the date kept as a shared ordinal make a row a fraction
+    of the size of the dict it replaces (benchmarks/memory_benchmark.py). The
+    ISO date is derived on access; as_dict() gives the old dict for JSON and CSV.
+    """
+
+    __slots__ = ("ordinal", "type", "category", "description", "amount")
+
+    def __init__(self, ordinal, type, category, description, amount):
+        self.ordinal = _ordinals.setdefault(ordinal, ordinal)
+        self.type = _labels.setdefault(type, type)
+        self.category = _labels.setdefault(category, category)
+        self.description = description
+        self.amount = amount
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds a transaction from a raw [date, type, category, description, amount] ledger row."""
+        return cls(date_ordinal(row[0]), row[1], row[2], row[3], int(row[4]))
+
+    @property
+    def date(self):
+        return date_string(self.ordinal)
+
+    def as_row(self):
+        """Returns the [date, type, category, description, amount] ledger row."""
+        return [self.date, self.type, self.category, self.description, self.amount]
+
+    def as_dict(self):
+        """Returns the row as a {"date", "type", "category", "description", "amount"} dict."""
+        return dict(zip(FIELDS, self.as_row()))
+
+    def _key(self):
+        return (self.ordinal, self.type, self.category, self.description, self.amount)
+
+    def __eq__(self, other):
+        if not isinstance(other, Transaction):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (f"Transaction(date={self.date!r}, type={self.type!r}, category={self.category!r}, "
+                f"description={self.description!r}, amount={self.amount!r})")
+
+    def __reduce__(self):
+        # Compact pickles for the daemon and Streamlit's cache; unpickling re-interns.
+        return Transaction, self._key()
+
+
+def transactions_from_rows(rows):
+    """Yields a Transaction for each raw ledger row, skipping rows parse_row() rejects.
+
+    Rows written before writes were validated, or edited by hand, may hold
+    a bad date or amount; they are left out rather than failing the read.
+    """
+    for row in rows:
+        parsed = parse_row(row)
+        if parsed is not None:
+            yield Transaction(parsed[0], row[1], row[2], row[3], parsed[1])
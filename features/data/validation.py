@@ -0,0 +1,48 @@
+from datetime import date
+
+from features.transactions.categories import EXPENSE_CATEGORIES, INCOME_CATEGORIES
+
+TRANSACTION_TYPES = {"expense": "Expense", "income": "Income"}
+
+CATEGORIES = {"Expense": set(EXPENSE_CATEGORIES), "Income": set(INCOME_CATEGORIES)}
+
+
+def parse_date(date_str):
+    """Returns a YYYY-MM-DD date string in canonical form, or raises ValueError."""
+    if len(date_str) != 10:
+        raise ValueError(f"invalid date '{date_str}', expected YYYY-MM-DD.")
+    try:
+        return date.fromisoformat(date_str).isoformat()
+    except ValueError:
+        raise ValueError(f"invalid date '{date_str}', expected YYYY-MM-DD.")
+
+
+def validate_row(row):
+    """Normalizes a [date, type, category, description, amount in cents] row, or raises ValueError."""
+    if len(row) != 5:
+        raise ValueError(f"expected 5 columns, found {len(row)}.")
+    date_str, type_, category, _, amount = (str(value).strip() for value in row)
+    date_str = parse_date(date_str)
+    type_ = TRANSACTION_TYPES.get(type_.lower())
+    if type_ is None:
+        raise ValueError("type must be Expense or Income.")
+    if category not in CATEGORIES[type_]:
+        raise ValueError(f"unknown {type_.lower()} category '{category}'.")
+    try:
+        amount = int(amount)
+    except ValueError:
+        raise ValueError(f"amount '{amount}' is not a whole number of cents.")
+    if amount <= 0:
+        raise ValueError("amount must be positive.")
+    return [date_str, type_, category, row[3], amount]
+
+
+def validate_rows(rows):
+    """Normalizes every row with validate_row(); the first bad row raises ValueError naming its position."""
+    valid = []
+    for number, row in enumerate(rows, start=1):
+        try:
+            valid.append(validate_row(row))
+        except ValueError as e:
+            raise ValueError(f"Row {number}: {e}")
+    return valid
@@ -0,0 +1,172 @@
+import contextlib
+import csv
+import io
+import os
+import threading
+
+from features.data.instrumentation import instrumented
+
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl; fall back to in-process locking only.
+    fcntl = None
+
+# How appended rows are flushed to disk:
+#   "always" - fsync after every grouped write (default, survives power loss)
+#   "never"  - leave flushing to the operating system (fastest)
+FSYNC_ENV = "FINANCE_TRACKER_FSYNC"
+FSYNC_POLICIES = ("always", "never")
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def fsync_policy():
+    """Returns the configured fsync policy."""
+    policy = os.environ.get(FSYNC_ENV, "always").strip().lower()
+    if policy not in FSYNC_POLICIES:
+        raise ValueError(f"{FSYNC_ENV} must be one of: {', '.join(FSYNC_POLICIES)}.")
+    return policy
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Holds an exclusive advisory lock on path.lock for the duration of the block.
+
+    The lock lives in a separate file so it survives truncation and
+    replacement of the data file, and is honoured by every process that
+    writes through this module.
+    """
+    with open(path + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def encode_rows(rows):
+    """Encodes rows as CSV bytes in the ledger's format."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+class _Pending:
+    """Rows queued by one caller, waiting for a grouped write."""
+
+    def __init__(self, data):
+        self.data = data
+        self.done = False
+        self.error = None
+
+
+class AppendWriter:
+    """Appends CSV rows to a file from many threads and processes.
+
+    Callers queue their encoded rows; whichever caller gets the write lock
+    first writes everything queued so far in a single O_APPEND write under
+    the advisory file lock (group commit), and the others find their rows
+    already written. Each row therefore lands as one whole line, never
+    interleaved with another writer's, and concurrent sessions share one
+    write and one fsync.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = []
+        self._queue_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @instrumented("write")
+    def append(self, rows):
+        """Writes rows to the end of the file and returns once they are durable per the fsync policy."""
+        pending = _Pending(encode_rows(rows))
+        if not pending.data:
+            return
+        with self._queue_lock:
+            self._queue.append(pending)
+
+        with self._write_lock:
+            if not pending.done:
+                with self._queue_lock:
+                    batch, self._queue = self._queue, []
+                self._write_batch(batch)
+
+        if pending.error is not None:
+            raise pending.error
+
+    def _write_batch(self, batch):
+        data = b"".join(p.data for p in batch)
+        try:
+            with file_lock(self.path):
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    # A writer that crashed mid-row leaves the file without a
+                    # trailing newline; start on a fresh line rather than
+                    # gluing our first row onto the torn one.
+                    size = os.fstat(fd).st_size
+                    if size and _last_byte(self.path, size) != b"\n":
+                        data = b"\n" + data
+                    _write_all(fd, data)
+                    if fsync_policy() == "always":
+                        os.fsync(fd)
+                finally:
+                    os.close(fd)
+        except Exception as e:
+            for p in batch:
+                p.error = e
+        for p in batch:
+            p.done = True
+
+
+    @instrumented("write")
+    def append_batches(self, batches):
+        """Appends every batch of rows as one unit: all of them are written or none are.
+
+        The file lock is held throughout, so no other writer's rows land in
+        between. If any batch fails to encode or write, the file is truncated
+        back to its original length before the error is re-raised.
+        """
+        with self._write_lock, file_lock(self.path):
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                prefix = b"\n" if size and _last_byte(self.path, size) != b"\n" else b""
+                try:
+                    for rows in batches:
+                        data = encode_rows(rows)
+                        if data:
+                            _write_all(fd, prefix + data)
+                            prefix = b""
+                    if fsync_policy() == "always":
+                        os.fsync(fd)
+                except BaseException:
+                    os.ftruncate(fd, size)
+                    raise
+            finally:
+                os.close(fd)
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _last_byte(path, size):
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1)
+
+
+def get_writer(path):
+    """Returns the process-wide writer for a file."""
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = AppendWriter(path)
+        return writer
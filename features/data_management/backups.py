@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import zlib
+from datetime import datetime
+
+from features.data.daemon import daemon_status
+from features.data.ledger_file import file_identity, read_anchor
+from features.data.ledgers import DEFAULT_LEDGER, active_ledger, ledger_root
+from features.data.storage import ledger_files, reset_storage
+from features.data.writer import file_lock
+
+# Backups of the default ledger; other ledgers keep theirs in BACKUP_DIR/ledgers/<name>.
+BACKUP_DIR = "backups"
+
+# Files are split into fixed-size chunks so an appended ledger only adds new
+# chunks (plus a rewritten final partial chunk) to each backup.
+CHUNK_SIZE = 1024 * 1024
+
+# SQLite databases change pages in place, so they are split into smaller,
+# page-aligned chunks: pages untouched since a snapshot hash to chunks it stored.
+DATABASE_CHUNK_SIZE = 64 * 1024
+
+# Derived or transient files that are rebuilt from the data and never backed up.
+SKIPPED_SUFFIXES = (".idx", ".rollup", ".hashes", ".snapshots", ".search", ".lock", ".tmp", "-wal", "-shm", "-journal")
+
+
+def _backup_dir():
+    ledger = active_ledger()
+    return BACKUP_DIR if ledger == DEFAULT_LEDGER else os.path.join(BACKUP_DIR, "ledgers", ledger)
+
+
+def _chunk_dir():
+    return os.path.join(_backup_dir(), "chunks")
+
+
+def _snapshot_dir():
+    return os.path.join(_backup_dir(), "snapshots")
+
+
+def _chunk_path(digest):
+    return os.path.join(_chunk_dir(), digest[:2], digest)
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _store_chunk(data):
+    """Stores a chunk under its hash unless it is already there; returns (hash, bytes stored)."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = _chunk_path(digest)
+    if os.path.exists(path):
+        return digest, 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    compressed = zlib.compress(data)
+    _write_atomic(path, compressed)
+    return digest, len(compressed)
+
+
+def _data_files():
+    """Returns the names of the files in the data directory that are backed up."""
+    data_dir = ledger_root()
+    if not os.path.isdir(data_dir):
+        return []
+    return sorted(name for name in os.listdir(data_dir)
+                  if os.path.isfile(os.path.join(data_dir, name)) and not name.endswith(SKIPPED_SUFFIXES))
+
+
+def _backup_file(path, previous, chunk_size=CHUNK_SIZE):
+    """Chunks one file, reusing the previous manifest entry for any unchanged prefix.
+
+    Returns the file's manifest entry and the number of bytes newly stored.
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        if previous and [previous["inode"], previous["size"], previous["mtime_ns"]] == [st.st_ino, size, st.st_mtime_ns]:
+            return previous, 0
+
+        chunks = []
+        # An append-only file keeps its inode and the bytes before the old end,
+        # so every complete chunk of the previous backup is still valid.
+        if (previous and previous["inode"] == st.st_ino and size >= previous["size"]
+                and read_anchor(path, previous["size"]).hex() == previous["anchor"]):
+            chunks = [chunk for chunk in previous["chunks"] if chunk[1] == chunk_size]
+
+        offset = len(chunks) * chunk_size
+        stored = 0
+        f.seek(offset)
+        while offset < size:
+            data = f.read(min(chunk_size, size - offset))
+            if not data:
+                break
+            digest, written = _store_chunk(data)
+            chunks.append([offset, len(data), digest])
+            stored += written
+            offset += len(data)
+
+    entry = {"inode": st.st_ino, "size": offset, "mtime_ns": st.st_mtime_ns,
+             "anchor": read_anchor(path, offset).hex(), "chunks": chunks}
+    return entry, stored
+
+
+def _copy_database(path):
+    """Takes a consistent copy of a SQLite database (including its WAL) into a temp file."""
+    fd, tmp_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return tmp_path
+
+
+def _database_identity(path):
+    """Returns the identities of a SQLite database and its WAL, which change with every write."""
+    return [list(identity) if identity else None
+            for identity in (file_identity(path), file_identity(path + "-wal"))]
+
+
+def _backup_database(path, previous):
+    """Chunks a consistent copy of a SQLite database; an unchanged database reuses its previous entry."""
+    source = _database_identity(path)
+    if previous and previous.get("source") == source:
+        return previous, 0
+    copy_path = _copy_database(path)
+    try:
+        entry, written = _backup_file(copy_path, None, DATABASE_CHUNK_SIZE)
+    finally:
+        os.remove(copy_path)
+    entry["source"] = source
+    return entry, written
+
+
+def list_snapshots():
+    """Returns every snapshot manifest, oldest first."""
+    if not os.path.isdir(_snapshot_dir()):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(_snapshot_dir())):
+        if name.endswith(".json"):
+            with open(os.path.join(_snapshot_dir(), name)) as f:
+                snapshots.append(json.load(f))
+    return snapshots
+
+
+def create_snapshot():
+    """Backs up the data directory, storing only chunks no earlier snapshot has.
+
+    Returns the new snapshot's manifest.
+    """
+    os.makedirs(_snapshot_dir(), exist_ok=True)
+    snapshots = list_snapshots()
+    previous = snapshots[-1]["files"] if snapshots else {}
+
+    files = {}
+    stored = 0
+    for name in _data_files():
+        path = os.path.join(ledger_root(), name)
+        if name.endswith(".db"):
+            entry, written = _backup_database(path, previous.get(name))
+        else:
+            entry, written = _backup_file(path, previous.get(name))
+        files[name] = entry
+        stored += written
+
+    now = datetime.now()
+    snapshot_id = now.strftime("%Y%m%d_%H%M%S")
+    suffix = 1
+    while os.path.exists(os.path.join(_snapshot_dir(), f"{snapshot_id}.json")):
+        suffix += 1
+        snapshot_id = f"{now.strftime('%Y%m%d_%H%M%S')}_{suffix}"
+
+    manifest = {"id": snapshot_id, "created": now.isoformat(timespec="seconds"),
+                "stored_bytes": stored, "files": files}
+    _write_atomic(os.path.join(_snapshot_dir(), f"{snapshot_id}.json"), json.dumps(manifest).encode("utf-8"))
+    return manifest
+
+
+def _get_snapshot(snapshot_id):
+    for snapshot in list_snapshots():
+        if snapshot["id"] == snapshot_id:
+            return snapshot
+    raise ValueError(f"No backup snapshot named '{snapshot_id}'.")
+
+
+def _remove_journals(path):
+    """Deletes a SQLite database's WAL and shared-memory files, which belong to the old file."""
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def restore_snapshot(snapshot_id):
+    """Replaces the data directory's files with those recorded in a snapshot.
+
+    Data files created after the snapshot are removed, so the app sees
+    exactly the state that was backed up. The ledger's write locks are held
+    throughout, so no append lands in a half-restored ledger. Refuses while
+    a ledger daemon serves the ledger; other sessions should be closed too.
+    """
+    snapshot = _get_snapshot(snapshot_id)
+    if daemon_status() is not None:
+        raise ValueError("A ledger daemon is serving this ledger; stop it (cli.py daemon stop) before restoring.")
+    data_dir = ledger_root()
+    os.makedirs(data_dir, exist_ok=True)
+
+    files = ledger_files()
+    with file_lock(files.transactions), file_lock(files.binary), file_lock(files.budgets):
+        _restore_files(snapshot, data_dir)
+
+    # Open backends still point at the replaced files.
+    reset_storage()
+    return snapshot
+
+
+def _restore_files(snapshot, data_dir):
+    """Writes every file of a snapshot into the data directory and removes the files it lacks."""
+    for name, entry in snapshot["files"].items():
+        path = os.path.join(data_dir, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            for _, length, digest in entry["chunks"]:
+                with open(_chunk_path(digest), "rb") as chunk_file:
+                    data = zlib.decompress(chunk_file.read())
+                if len(data) != length or hashlib.sha256(data).hexdigest() != digest:
+                    raise ValueError(f"Backup chunk {digest} is corrupt.")
+                f.write(data)
+        if name.endswith(".db"):
+            _remove_journals(path)
+        os.replace(tmp_path, path)
+
+    for name in _data_files():
+        if name not in snapshot["files"]:
+            path = os.path.join(data_dir, name)
+            if name.endswith(".db"):
+                _remove_journals(path)
+            os.remove(path)
+
+
+def prune_snapshots(keep):
+    """Deletes all but the newest keep snapshots and any chunk only they used.
+
+    Returns (snapshots removed, bytes freed).
+    """
+    snapshots = list_snapshots()
+    removed = snapshots[:-keep] if keep > 0 else snapshots
+    for snapshot in removed:
+        os.remove(os.path.join(_snapshot_dir(), f"{snapshot['id']}.json"))
+
+    referenced = {digest for snapshot in list_snapshots()
+                  for entry in snapshot["files"].values()
+                  for _, _, digest in entry["chunks"]}
+    freed = 0
+    if os.path.isdir(_chunk_dir()):
+        for prefix in os.listdir(_chunk_dir()):
+            for digest in os.listdir(os.path.join(_chunk_dir(), prefix)):
+                if digest not in referenced:
+                    path = os.path.join(_chunk_dir(), prefix, digest)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+    return len(removed), freed
+
+
+def snapshot_size(snapshot):
+    """Returns the total size of the files a snapshot restores."""
+    return sum(entry["size"] for entry in snapshot["files"].values())
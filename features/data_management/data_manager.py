@@ -1,21 +1,39 @@
 import questionary
 from rich.console import Console
-import csv
-import json
+from rich.table import Table
+from rich.progress import Progress, TextColumn, BarColumn, TaskProgressColumn, TimeElapsedColumn
 import os
-import shutil
-from datetime import datetime
+from datetime import date, datetime
+from features.data.provider import get_budget_rules, clear_all_data, rebuild_indexes, migrate_csv_to_sqlite
+from features.data.storage import convert_binary_to_csv, convert_csv_to_binary, ledger_files, storage_name
+from features.data_management.backups import (
+    create_snapshot, list_snapshots, restore_snapshot, prune_snapshots, snapshot_size,
+)
+from features.data_management.exporter import (
+    EXPORT_FORMATS, BUDGET_COLUMNS, export_filename, export_records, export_transactions,
+)
+from features.data_management.importer import import_file
 
 console = Console()
-TRANSACTION_FILE = "database/transactions.txt"
-BUDGET_FILE = "database/budgets.txt"
-BACKUP_DIR = "backups"
+
+def _ask_date(prompt):
+    """Asks for an optional YYYY-MM-DD date; returns it in canonical form, None when left blank, or False when invalid."""
+    date_str = questionary.text(prompt).ask()
+    if not date_str:
+        return None
+    try:
+        # Export filters compare ISO dates as strings, so only the canonical spelling is returned.
+        return date.fromisoformat(date_str.strip()).isoformat()
+    except ValueError:
+        console.print(f"[bold red]Invalid date '{date_str}'. Please use YYYY-MM-DD.[/bold red]")
+        return False
+
 
 def export_data():
     """Exports financial data to user-specified format and location."""
     export_format = questionary.select(
         "Select export format:",
-        choices=["CSV", "JSON"]
+        choices=list(EXPORT_FORMATS)
     ).ask()
 
     export_type = questionary.select(
@@ -23,6 +41,25 @@ def export_data():
         choices=["Transactions", "Budgets", "Both"]
     ).ask()
 
+    start = end = filter_type = None
+    if export_type in ("Transactions", "Both"):
+        start = _ask_date("Export transactions from (YYYY-MM-DD, default: first transaction):")
+        if start is False:
+            return
+        end = _ask_date("Export transactions up to (YYYY-MM-DD, default: last transaction):")
+        if end is False:
+            return
+        filter_type = questionary.select(
+            "Which transactions?",
+            choices=["All", "Expense", "Income"]
+        ).ask()
+        if filter_type == "All":
+            filter_type = None
+
+    compress = False
+    if export_format != "Parquet":
+        compress = questionary.confirm("Compress with gzip?", default=False).ask()
+
     destination_folder = questionary.text(
         "Enter destination folder path (default: current directory):"
     ).ask()
@@ -36,76 +73,44 @@ def export_data():
 
     date_str = datetime.now().strftime("%Y-%m-%d")
 
-    def export_transactions(folder, fmt):
+    def export_transactions_to(folder, fmt):
         try:
-            with open(TRANSACTION_FILE, "r") as f_in:
-                reader = csv.reader(f_in)
-                transactions = list(reader)
-            
-            if not transactions:
+            filename = export_filename(folder, f"transactions_{date_str}", fmt, compress)
+            count = export_transactions(filename, fmt, start=start, end=end, type=filter_type, compress=compress)
+
+            if not count:
                 console.print("[yellow]No transactions to export.[/yellow]")
                 return
 
-            filename = os.path.join(folder, f"transactions_{date_str}.{fmt.lower()}")
-            
-            if fmt == "CSV":
-                with open(filename, "w", newline="") as f_out:
-                    writer = csv.writer(f_out)
-                    writer.writerows(transactions)
-            elif fmt == "JSON":
-                json_data = []
-                for t in transactions:
-                    json_data.append({
-                        "date": t[0], "type": t[1], "category": t[2],
-                        "description": t[3], "amount": int(t[4])
-                    })
-                with open(filename, "w") as f_out:
-                    json.dump(json_data, f_out, indent=4)
-
-            console.print(f"[green]Transactions successfully exported to {filename}[/green]")
-        except FileNotFoundError:
-            console.print("[yellow]No transactions file found to export.[/yellow]")
+            console.print(f"[green]{count} transactions successfully exported to {filename}[/green]")
         except Exception as e:
             console.print(f"[bold red]An error occurred during transaction export: {e}[/bold red]")
 
 
-    def export_budgets(folder, fmt):
+    def export_budgets_to(folder, fmt):
         try:
-            with open(BUDGET_FILE, "r") as f_in:
-                reader = csv.reader(f_in)
-                budgets = list(reader)
+            budgets = [{"category": category, "amount": amount, "period": period, "rollover": rollover}
+                       for category, (amount, period, rollover) in get_budget_rules().items()]
+            filename = export_filename(folder, f"budgets_{date_str}", fmt, compress)
 
-            if not budgets:
+            if not export_records(filename, fmt, budgets, BUDGET_COLUMNS, compress):
                 console.print("[yellow]No budgets to export.[/yellow]")
                 return
-                
-            filename = os.path.join(folder, f"budgets_{date_str}.{fmt.lower()}")
-
-            if fmt == "CSV":
-                with open(filename, "w", newline="") as f_out:
-                    writer = csv.writer(f_out)
-                    writer.writerows(budgets)
-            elif fmt == "JSON":
-                json_data = [{"category": b[0], "amount": int(b[1])} for b in budgets]
-                with open(filename, "w") as f_out:
-                    json.dump(json_data, f_out, indent=4)
-            
+
             console.print(f"[green]Budgets successfully exported to {filename}[/green]")
-        except FileNotFoundError:
-            console.print("[yellow]No budget file found to export.[/yellow]")
         except Exception as e:
             console.print(f"[bold red]An error occurred during budget export: {e}[/bold red]")
 
 
     if export_type == "Transactions" or export_type == "Both":
-        export_transactions(destination_folder, export_format)
+        export_transactions_to(destination_folder, export_format)
     
     if export_type == "Budgets" or export_type == "Both":
-        export_budgets(destination_folder, export_format)
+        export_budgets_to(destination_folder, export_format)
 
 
 def import_data():
-    """Imports transactions from a CSV file."""
+    """Imports transactions from a CSV file, skipping rows already in the ledger."""
     file_path = questionary.text("Enter the path to the CSV file to import:").ask()
 
     if not file_path or not os.path.exists(file_path):
@@ -113,46 +118,176 @@ def import_data():
         return
 
     try:
-        with open(file_path, "r") as f_in:
-            reader = csv.reader(f_in)
-            transactions_to_import = list(reader)
+        with Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            TimeElapsedColumn(),
+            console=console,
+        ) as progress:
+            task = progress.add_task("Validating", total=os.path.getsize(file_path) or 1)
+            result = import_file(
+                file_path,
+                on_progress=lambda done, rows: progress.update(
+                    task, completed=done, description=f"Validated {rows:,} rows"))
+            progress.update(task, completed=progress.tasks[0].total)
 
-        if not transactions_to_import:
+        if result.errors:
+            for error in result.errors:
+                console.print(f"[bold red]{error}[/bold red]")
+            console.print("[bold red]Import cancelled; no transactions were imported.[/bold red]")
+            return
+
+        if not result.rows_read:
             console.print("[yellow]The selected file is empty.[/yellow]")
             return
 
-        # Basic validation
-        for row in transactions_to_import:
-            if len(row) != 5:
-                console.print(f"[bold red]Invalid row found: {row}. Each row must have 5 columns.[/bold red]")
-                return
-            # Could add more validation here (date format, amount is number, etc.)
-        
-        with open(TRANSACTION_FILE, "a", newline="") as f_out:
-            writer = csv.writer(f_out)
-            writer.writerows(transactions_to_import)
-        
-        console.print(f"[green]Successfully imported {len(transactions_to_import)} transactions.[/green]")
+        console.print(f"[green]Successfully imported {result.imported} transactions.[/green]")
+        if result.duplicates:
+            console.print(f"[yellow]Skipped {result.duplicates} transactions already in the ledger.[/yellow]")
+        console.print(f"Processed {result.rows_read:,} rows in {result.seconds:.2f}s "
+                      f"({result.rows_per_second:,.0f} rows/s).")
 
     except Exception as e:
         console.print(f"[bold red]An error occurred during import: {e}[/bold red]")
 
 
-def backup_data():
-    """Creates a timestamped zip backup of the data files."""
-    if not os.path.exists(BACKUP_DIR):
-        os.makedirs(BACKUP_DIR)
-        
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_filename_base = os.path.join(BACKUP_DIR, f"finance_tracker_backup_{timestamp}")
+def _format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
 
+
+def backup_data():
+    """Creates an incremental backup snapshot of the data files."""
     try:
-        shutil.make_archive(backup_filename_base, 'zip', 'database')
-        console.print(f"[green]Successfully created backup at {backup_filename_base}.zip[/green]")
+        snapshot = create_snapshot()
+        console.print(f"[green]Successfully created backup {snapshot['id']} "
+                      f"({_format_bytes(snapshot['stored_bytes'])} of new data stored).[/green]")
     except Exception as e:
         console.print(f"[bold red]An error occurred during backup: {e}[/bold red]")
 
 
+def list_backups():
+    """Lists the backup snapshots."""
+    try:
+        snapshots = list_snapshots()
+        if not snapshots:
+            console.print("[yellow]No backups found.[/yellow]")
+            return
+
+        table = Table(title="Backups")
+        table.add_column("Snapshot", style="cyan")
+        table.add_column("Created", style="magenta")
+        table.add_column("Files", justify="right")
+        table.add_column("Data Size", justify="right")
+        table.add_column("Stored", justify="right")
+        for snapshot in snapshots:
+            table.add_row(snapshot["id"], snapshot["created"], str(len(snapshot["files"])),
+                          _format_bytes(snapshot_size(snapshot)), _format_bytes(snapshot["stored_bytes"]))
+        console.print(table)
+    except Exception as e:
+        console.print(f"[bold red]An error occurred while listing backups: {e}[/bold red]")
+
+
+def restore_backup():
+    """Restores the data files from a backup snapshot after confirmation."""
+    try:
+        snapshots = list_snapshots()
+        if not snapshots:
+            console.print("[yellow]No backups found.[/yellow]")
+            return
+
+        snapshot_id = questionary.select(
+            "Select the backup to restore:",
+            choices=[s["id"] for s in reversed(snapshots)] + ["Back"]
+        ).ask()
+        if not snapshot_id or snapshot_id == "Back":
+            return
+
+        console.print("[bold red]WARNING: This replaces your current data with the backup. "
+                      "Close the dashboard and other sessions first.[/bold red]")
+        if not questionary.confirm(f"Restore backup {snapshot_id}?", default=False).ask():
+            console.print("[yellow]Restore cancelled.[/yellow]")
+            return
+
+        restore_snapshot(snapshot_id)
+        console.print(f"[green]Data restored from backup {snapshot_id}.[/green]")
+    except Exception as e:
+        console.print(f"[bold red]An error occurred during restore: {e}[/bold red]")
+
+
+def prune_backups():
+    """Deletes old backup snapshots, keeping the newest ones."""
+    try:
+        keep_str = questionary.text("How many of the newest backups should be kept?", default="10").ask()
+        keep = int(keep_str)
+        if keep < 1:
+            console.print("[bold red]Keep at least one backup.[/bold red]")
+            return
+
+        removed, freed = prune_snapshots(keep)
+        console.print(f"[green]Removed {removed} backups and freed {_format_bytes(freed)}.[/green]")
+    except (ValueError, TypeError):
+        console.print("[bold red]Invalid number. Please enter a whole number.[/bold red]")
+    except Exception as e:
+        console.print(f"[bold red]An error occurred while pruning backups: {e}[/bold red]")
+
+
+def rebuild_data_indexes():
+    """Rebuilds the month index and monthly rollups from the transactions file."""
+    try:
+        rebuild_indexes()
+        console.print("[green]Indexes and monthly rollups rebuilt.[/green]")
+    except Exception as e:
+        console.print(f"[bold red]An error occurred while rebuilding indexes: {e}[/bold red]")
+
+
+def migrate_to_sqlite():
+    """Copies the active ledger's CSV transactions and budgets into the SQLite backend."""
+    files = ledger_files()
+    console.print(f"[bold yellow]This copies {files.transactions} and {files.budgets} into "
+                  f"{files.database}, which is used from then on.[/bold yellow]")
+    if not questionary.confirm("Migrate to SQLite now?").ask():
+        console.print("[yellow]Migration cancelled.[/yellow]")
+        return
+
+    try:
+        count = migrate_csv_to_sqlite()
+        console.print(f"[green]Migrated {count} transactions to SQLite.[/green]")
+    except Exception as e:
+        console.print(f"[bold red]An error occurred during migration: {e}[/bold red]")
+
+
+def convert_ledger_format():
+    """Converts the active ledger between CSV text and the memory-mapped binary format."""
+    files = ledger_files()
+    backend = storage_name()
+    if backend == "csv":
+        console.print(f"[bold yellow]This converts {files.transactions} into {files.binary}, which loads "
+                      f"without parsing and is used from then on. The CSV file is kept but no longer "
+                      f"updated.[/bold yellow]")
+        question, convert, target = "Convert to the binary format now?", convert_csv_to_binary, "binary"
+    elif backend == "binary":
+        console.print(f"[bold yellow]This writes {files.binary} back to {files.transactions} and removes "
+                      f"the binary files.[/bold yellow]")
+        question, convert, target = "Convert back to CSV now?", convert_binary_to_csv, "CSV"
+    else:
+        console.print(f"[yellow]The ledger uses the {backend} backend; only CSV and binary ledgers "
+                      f"can be converted.[/yellow]")
+        return
+    if not questionary.confirm(question).ask():
+        console.print("[yellow]Conversion cancelled.[/yellow]")
+        return
+
+    try:
+        count = convert()
+        console.print(f"[green]Converted {count} transactions to {target}.[/green]")
+    except Exception as e:
+        console.print(f"[bold red]An error occurred during conversion: {e}[/bold red]")
+
+
 def reset_data():
     """Resets all transaction and budget data after confirmation."""
     console.print("[bold red]WARNING: This will delete all your financial data permanently.[/bold red]")
@@ -162,12 +297,7 @@ def reset_data():
 
     if confirmation == "DELETE":
         try:
-            # Empty transactions.txt
-            with open(TRANSACTION_FILE, "w") as f:
-                pass 
-            # Empty budgets.txt
-            with open(BUDGET_FILE, "w") as f:
-                pass
+            clear_all_data()
             console.print("[green]All data has been reset.[/green]")
         except Exception as e:
             console.print(f"[bold red]An error occurred during data reset: {e}[/bold red]")
@@ -177,12 +307,7 @@ def reset_data():
 def reset_streamlit_data():
     """Resets all transaction and budget data for the Streamlit UI."""
     try:
-        # Empty transactions.txt
-        with open(TRANSACTION_FILE, "w") as f:
-            pass 
-        # Empty budgets.txt
-        with open(BUDGET_FILE, "w") as f:
-            pass
+        clear_all_data()
         return True
     except Exception as e:
         console.print(f"[bold red]An error occurred during data reset: {e}[/bold red]")
@@ -0,0 +1,126 @@
+import csv
+import gzip
+import itertools
+import json
+import os
+
+from features.data.provider import iter_transactions
+
+# Formats export_records() can write, with their file extensions.
+EXPORT_FORMATS = {"CSV": "csv", "JSON": "json", "JSON Lines": "jsonl", "Parquet": "parquet"}
+
+# Records written per chunk (and per Parquet row group).
+EXPORT_CHUNK_ROWS = 10000
+
+TRANSACTION_COLUMNS = ["date", "type", "category", "description", "amount"]
+BUDGET_COLUMNS = ["category", "amount", "period", "rollover"]
+
+
+def export_filename(folder, name, fmt, compress=False):
+    """Returns the path an export of the given format is written to."""
+    filename = f"{name}.{EXPORT_FORMATS[fmt]}"
+    if compress and fmt != "Parquet":
+        filename += ".gz"
+    return os.path.join(folder, filename)
+
+
+def _chunks(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _open_text(path, compress):
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def _write_csv(f, chunks, columns):
+    # No header, so exported files can be imported back as-is.
+    writer = csv.writer(f)
+    count = 0
+    for chunk in chunks:
+        writer.writerows([record[column] for column in columns] for record in chunk)
+        count += len(chunk)
+    return count
+
+
+def _write_json_lines(f, chunks, columns):
+    count = 0
+    for chunk in chunks:
+        f.write("".join(json.dumps(record) + "\n" for record in chunk))
+        count += len(chunk)
+    return count
+
+
+def _write_json_array(f, chunks, columns):
+    """Writes the same text as json.dump(records, f, indent=4), one record at a time."""
+    count = 0
+    for chunk in chunks:
+        for record in chunk:
+            f.write("[\n    " if count == 0 else ",\n    ")
+            f.write(json.dumps(record, indent=4).replace("\n", "\n    "))
+            count += 1
+    f.write("\n]" if count else "[]")
+    return count
+
+
+def _write_parquet(path, chunks, columns):
+    """Writes each chunk as a Parquet row group via pandas and pyarrow."""
+    try:
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pandas and pyarrow (pip install pyarrow).")
+
+    fields = {"date": pa.date32(), "type": pa.string(), "category": pa.string(),
+              "description": pa.string(), "amount": pa.int64(), "period": pa.string(), "rollover": pa.bool_()}
+    schema = pa.schema([(column, fields[column]) for column in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            frame = pd.DataFrame.from_records(chunk, columns=columns)
+            if "date" in frame:
+                frame["date"] = pd.to_datetime(frame["date"]).dt.date
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            count += len(chunk)
+    return count
+
+
+def write_records(f, fmt, records, columns):
+    """Streams records (dicts) to an open text file such as sys.stdout; Parquet is not supported."""
+    write = {"CSV": _write_csv, "JSON": _write_json_array, "JSON Lines": _write_json_lines}[fmt]
+    return write(f, _chunks(records, EXPORT_CHUNK_ROWS), columns)
+
+
+def export_records(path, fmt, records, columns, compress=False):
+    """Streams records (dicts) to a file in chunks and returns how many were written.
+
+    Memory use is bounded by EXPORT_CHUNK_ROWS however many records there are.
+    A file that ends up empty is removed.
+    """
+    try:
+        if fmt == "Parquet":
+            count = _write_parquet(path, _chunks(records, EXPORT_CHUNK_ROWS), columns)
+        else:
+            with _open_text(path, compress) as f:
+                count = write_records(f, fmt, records, columns)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    if not count:
+        os.remove(path)
+    return count
+
+
+def export_transactions(path, fmt, start=None, end=None, type=None, compress=False):
+    """Streams the transactions matching the date range and type to a file."""
+    records = (t.as_dict() for t in iter_transactions(start=start, end=end, type=type))
+    return export_records(path, fmt, records, TRANSACTION_COLUMNS, compress)
@@ -0,0 +1,171 @@
+import csv
+import itertools
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from features.data.provider import import_transactions, get_row_hash_counts, row_hash
+from features.data.validation import validate_row
+from features.data.writer import encode_rows
+
+# Rows validated per worker task, and per batch written to the ledger.
+IMPORT_CHUNK_ROWS = 50000
+
+# Errors kept for the report; validation stops after the first chunk with errors.
+MAX_REPORTED_ERRORS = 10
+
+
+@dataclass
+class ImportResult:
+    """Outcome of importing one file."""
+    rows_read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.seconds if self.seconds > 0 else 0
+
+
+def validate_chunk(chunk):
+    """Validates and normalizes one (line numbers, rows) chunk.
+
+    Returns the normalized rows and a list of error messages. Runs in a
+    worker process, so it only touches its arguments.
+    """
+    numbers, rows = chunk
+    valid = []
+    errors = []
+    for number, row in zip(numbers, rows):
+        try:
+            valid.append(validate_row(row))
+        except ValueError as e:
+            errors.append(f"Line {number}: {e}")
+    return valid, errors
+
+
+def _read_chunks(f, chunk_rows):
+    """Yields (line numbers, rows) chunks from a CSV file, skipping blank lines.
+
+    Each row is numbered by the file line it starts on, counting blank lines
+    and the extra lines of quoted multi-line fields, so errors cite the line
+    to fix.
+    """
+    reader = csv.reader(f)
+    numbers = []
+    rows = []
+    line = 1
+    for row in reader:
+        if row:
+            numbers.append(line)
+            rows.append(row)
+            if len(rows) == chunk_rows:
+                yield numbers, rows
+                numbers = []
+                rows = []
+        line = reader.line_num + 1
+    if rows:
+        yield numbers, rows
+
+
+def _validated_chunks(chunks, workers):
+    """Validates chunks in a process pool, yielding results in file order.
+
+    Only a few chunks per worker are in flight at once, so memory stays
+    bounded however large the file is.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield len(chunk[1]), validate_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((len(chunk[1]), pool.submit(validate_chunk, chunk)))
+            if len(pending) >= workers * 2:
+                size, future = pending.popleft()
+                yield size, future.result()
+        while pending:
+            size, future = pending.popleft()
+            yield size, future.result()
+
+
+def _new_rows(rows, remaining):
+    """Drops rows the ledger already holds.
+
+    remaining maps a row hash to how many more copies of that row the ledger
+    has beyond those already matched in this file, so a row repeated in both
+    is only skipped as often as the ledger repeats it.
+    """
+    hashes = [row_hash(row) for row in rows]
+    unseen = {digest for digest in hashes if digest not in remaining}
+    if unseen:
+        counts = get_row_hash_counts(unseen)
+        for digest in unseen:
+            remaining[digest] = counts.get(digest, 0)
+
+    new = []
+    for digest, row in zip(hashes, rows):
+        if remaining[digest] > 0:
+            remaining[digest] -= 1
+        else:
+            new.append(row)
+    return new
+
+
+def _staged_batches(staging, chunk_rows):
+    staging.seek(0)
+    with open(staging.fileno(), "r", newline="", encoding="utf-8", closefd=False) as f:
+        reader = csv.reader(f)
+        while True:
+            rows = list(itertools.islice(reader, chunk_rows))
+            if not rows:
+                return
+            yield rows
+
+
+def import_file(file_path, chunk_rows=IMPORT_CHUNK_ROWS, workers=None, on_progress=None):
+    """Streams a CSV file of transactions into the ledger.
+
+    Rows are read in chunks and validated in a process pool. Rows already in
+    the ledger are skipped using the persistent row-hash index, so importing
+    the same file twice adds nothing the second time. New rows are staged in
+    a temporary file and committed in one atomic append only once the whole
+    file is valid. on_progress(bytes_read, rows_read) is called after each
+    chunk.
+    """
+    workers = workers or os.cpu_count() or 1
+    result = ImportResult()
+    started = time.perf_counter()
+    remaining = {}
+
+    with open(file_path, "r", newline="", encoding="utf-8") as f, tempfile.TemporaryFile() as staging:
+        # Small files fit in one chunk; a pool would only add start-up time.
+        if os.path.getsize(file_path) < chunk_rows * 40:
+            workers = 1
+        for size, (rows, errors) in _validated_chunks(_read_chunks(f, chunk_rows), workers):
+            result.rows_read += size
+            if errors:
+                result.errors = errors[:MAX_REPORTED_ERRORS]
+                break
+            new = _new_rows(rows, remaining)
+            result.duplicates += len(rows) - len(new)
+            result.imported += len(new)
+            staging.write(encode_rows(new))
+            if on_progress is not None:
+                on_progress(f.buffer.tell(), result.rows_read)
+
+        if not result.errors and result.imported:
+            staging.flush()
+            import_transactions(_staged_batches(staging, chunk_rows))
+
+    if result.errors:
+        result.imported = 0
+    result.seconds = time.perf_counter() - started
+    return result
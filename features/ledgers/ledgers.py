@@ -0,0 +1,79 @@
+import os
+
+import questionary
+from rich.console import Console
+from rich.table import Table
+
+from features.data.ledgers import (
+    DEFAULT_LEDGER, LEDGER_ENV, active_ledger, add_ledger, list_ledgers, remove_ledger, set_active_ledger,
+)
+from features.data.storage import storage_name
+
+console = Console()
+
+
+def view_ledgers():
+    """Lists every ledger with its data directory and backend."""
+    active = active_ledger()
+    table = Table(title="Ledgers")
+    table.add_column("Ledger", style="cyan")
+    table.add_column("Directory")
+    table.add_column("Backend", style="magenta")
+    for name, root in list_ledgers().items():
+        label = f"[bold green]{name} (active)[/bold green]" if name == active else name
+        table.add_row(label, root, storage_name(name))
+    console.print(table)
+
+
+def use_ledger(name):
+    """Switches this session, and dashboards launched from it, to a ledger."""
+    set_active_ledger(name)
+    os.environ[LEDGER_ENV] = name
+
+
+def switch_ledger():
+    """Chooses the ledger the other menu actions read and write."""
+    choice = questionary.select("Switch to ledger:", choices=[*list_ledgers(), "Back"],
+                                default=active_ledger()).ask()
+    if choice in (None, "Back"):
+        return
+    try:
+        use_ledger(choice)
+        console.print(f"[bold green]Now using ledger '{choice}'.[/bold green]")
+    except Exception as e:
+        console.print(f"[bold red]An error occurred: {e}[/bold red]")
+
+
+def create_ledger():
+    """Adds a ledger, e.g. for another household or cost centre."""
+    name = questionary.text("Ledger name (letters, digits, '.', '_', '-'):").ask()
+    if not name:
+        return
+    root = questionary.text("Data directory (default: ledgers/<name>):").ask()
+    try:
+        root = add_ledger(name, root or None)
+        console.print(f"[bold green]Ledger '{name}' added in {root}.[/bold green]")
+        if questionary.confirm(f"Switch to '{name}' now?", default=True).ask():
+            use_ledger(name)
+    except Exception as e:
+        console.print(f"[bold red]An error occurred: {e}[/bold red]")
+
+
+def forget_ledger():
+    """Removes a ledger from the registry, leaving its files in place."""
+    choices = [name for name in list_ledgers() if name != DEFAULT_LEDGER]
+    if not choices:
+        console.print("[bold yellow]Only the default ledger exists.[/bold yellow]")
+        return
+    name = questionary.select("Remove which ledger?", choices=[*choices, "Back"]).ask()
+    if name in (None, "Back"):
+        return
+    if not questionary.confirm(f"Remove '{name}' from the ledger list? Its files are kept.").ask():
+        return
+    try:
+        remove_ledger(name)
+        if os.environ.get(LEDGER_ENV) == name:
+            del os.environ[LEDGER_ENV]
+        console.print(f"[bold green]Ledger '{name}' removed; now using '{active_ledger()}'.[/bold green]")
+    except Exception as e:
+        console.print(f"[bold red]An error occurred: {e}[/bold red]")
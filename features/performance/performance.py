@@ -0,0 +1,80 @@
+import questionary
+from rich.console import Console
+from rich.table import Table
+from datetime import datetime
+from features.data.instrumentation import (
+    INSTRUMENT_ENV, is_enabled, get_stats, stats_json, reset_stats, histogram_labels,
+)
+
+console = Console()
+
+
+def _format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def export_performance_stats(path=None):
+    """Writes the recorded stats to a JSON file and returns its path."""
+    path = path or f"performance_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(path, "w") as f:
+        f.write(stats_json())
+    return path
+
+
+def view_performance_stats():
+    """Shows call counts, latencies, rows scanned and bytes read per operation."""
+    if not is_enabled():
+        console.print("[bold yellow]Instrumentation is off. Start the app with 'python main.py --instrument' "
+                      f"or set {INSTRUMENT_ENV}=1.[/bold yellow]")
+        return
+
+    stats = get_stats()
+    if not stats:
+        console.print("[yellow]No operations recorded yet.[/yellow]")
+    else:
+        table = Table(title="Performance Stats")
+        table.add_column("Kind", style="magenta")
+        table.add_column("Operation", style="cyan")
+        table.add_column("Calls", justify="right")
+        table.add_column("Avg ms", justify="right")
+        table.add_column("Max ms", justify="right")
+        table.add_column("Total ms", justify="right")
+        table.add_column("Self ms", justify="right")
+        table.add_column("Rows", justify="right")
+        table.add_column("Read", justify="right")
+        table.add_column(" / ".join(histogram_labels()), justify="right")
+
+        for stat in stats:
+            calls = str(stat["calls"]) if not stat["errors"] else f"{stat['calls']} [red]({stat['errors']} failed)[/red]"
+            table.add_row(
+                stat["kind"],
+                stat["operation"],
+                calls,
+                f"{stat['avg_ms']:.2f}",
+                f"{stat['max_ms']:.2f}",
+                f"{stat['total_ms']:.1f}",
+                f"{stat['self_ms']:.1f}",
+                f"{stat['rows_scanned']:,}",
+                _format_bytes(stat["bytes_read"]),
+                " / ".join(str(count) for count in stat["histogram"].values()),
+            )
+        console.print(table)
+
+    action = questionary.select(
+        "Performance Stats:",
+        choices=["Export as JSON", "Reset Stats", "Back"],
+    ).ask()
+
+    if action == "Export as JSON":
+        path = questionary.text("Enter the file to write (default: performance_stats_<timestamp>.json):").ask()
+        try:
+            path = export_performance_stats(path or None)
+            console.print(f"[green]Performance stats exported to {path}[/green]")
+        except Exception as e:
+            console.print(f"[bold red]An error occurred during export: {e}[/bold red]")
+    elif action == "Reset Stats":
+        reset_stats()
+        console.print("[green]Performance stats cleared.[/green]")
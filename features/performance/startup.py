@@ -0,0 +1,87 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from rich.console import Console
+from rich.table import Table
+
+# Cold-start budget (milliseconds) for importing main.py; `python main.py --startup-time` fails above it.
+STARTUP_BUDGET_MS = 250
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+console = Console()
+
+
+def parse_importtime(output):
+    """Parses `python -X importtime` output into (depth, module, self µs, cumulative µs) tuples."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def _run_once(module):
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    imports = parse_importtime(completed.stderr)
+    import_ms = next((c for d, name, _, c in reversed(imports) if d == 0 and name == module), 0) / 1000
+    return {"wall_ms": wall_ms, "import_ms": import_ms, "imports": imports}
+
+
+def measure_startup_time(module="main", runs=5):
+    """Imports module in fresh interpreters and summarizes where the time goes.
+
+    Returns the median import and process times over the runs, plus, for the
+    median run, self time per top-level package and the feature modules that
+    were imported eagerly.
+    """
+    results = sorted((_run_once(module) for _ in range(runs)), key=lambda r: r["import_ms"])
+    median = results[len(results) // 2]
+
+    packages = defaultdict(int)
+    for _, name, self_us, _ in median["imports"]:
+        packages[name.split(".")[0]] += self_us
+    return {
+        "module": module,
+        "runs": runs,
+        "import_ms": median["import_ms"],
+        "wall_ms": statistics.median(r["wall_ms"] for r in results),
+        "packages": sorted(((name, us / 1000) for name, us in packages.items()),
+                           key=lambda item: item[1], reverse=True),
+        "features": [name for _, name, _, _ in median["imports"] if name.startswith("features.")],
+    }
+
+
+def report_startup_time(budget_ms=None, module="main", runs=5, top=10):
+    """Prints a start-up summary and returns 0 within budget_ms, 1 over it (for use as an exit status)."""
+    budget_ms = STARTUP_BUDGET_MS if budget_ms is None else budget_ms
+    summary = measure_startup_time(module, runs)
+
+    table = Table(title=f"Start-up: import {module} (median of {runs} runs)")
+    table.add_column("Package", style="cyan")
+    table.add_column("Self ms", justify="right")
+    table.add_column("Share", justify="right")
+    total = sum(ms for _, ms in summary["packages"]) or 1
+    for name, ms in summary["packages"][:top]:
+        table.add_row(name, f"{ms:.1f}", f"{ms / total * 100:.0f}%")
+    console.print(table)
+
+    features = summary["features"]
+    console.print(f"Feature modules imported at start-up: {', '.join(features) if features else 'none'}")
+    console.print(f"Process start and exit: {summary['wall_ms']:.0f} ms")
+
+    within = summary["import_ms"] <= budget_ms
+    color = "green" if within else "red"
+    console.print(f"[{color}]import {module}: {summary['import_ms']:.0f} ms "
+                  f"(budget {budget_ms:.0f} ms)[/{color}]")
+    return 0 if within else 1
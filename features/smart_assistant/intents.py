@@ -0,0 +1,357 @@
+import difflib
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from features.analytics.report import (
+    Period, month_period, previous_month_period, quarter_period, year_period, summarize_periods,
+)
+from features.transactions.categories import EXPENSE_CATEGORIES, INCOME_CATEGORIES
+
+# Everyday words people use for each category, matched before fuzzy matching.
+CATEGORY_SYNONYMS = {
+    "Food": ["groceries", "grocery", "restaurant", "restaurants", "dining", "eating out", "lunch", "dinner",
+             "breakfast", "coffee", "meals", "takeaway"],
+    "Transport": ["travel", "taxi", "uber", "bus", "train", "fuel", "gas", "petrol", "parking", "commute"],
+    "Shopping": ["clothes", "clothing", "electronics", "books", "shoes"],
+    "Bills": ["rent", "utilities", "electricity", "water", "internet", "phone", "bill"],
+    "Entertainment": ["movies", "cinema", "streaming", "games", "concerts", "fun"],
+    "Health": ["doctor", "pharmacy", "medicine", "medical", "gym", "healthcare"],
+    "Salary": ["paycheck", "paycheque", "wages", "pay"],
+    "Freelance": ["consulting", "contract", "gigs"],
+    "Business": ["sales", "revenue"],
+    "Investment": ["investments", "dividends", "interest", "stocks"],
+    "Gift": ["gifts", "presents"],
+}
+
+# Shortest word that is fuzzily matched against category and month names.
+FUZZY_MIN_LENGTH = 4
+FUZZY_CUTOFF = 0.8
+
+MONTH_NAMES = {name.lower(): number for number, name in enumerate(
+    ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+     "November", "December"], start=1)}
+MONTH_NAMES.update({name[:3]: number for name, number in list(MONTH_NAMES.items())})
+MONTH_NAMES["sept"] = 9
+
+WORD = re.compile(r"[a-z0-9']+")
+LAST_N = re.compile(r"\b(?:last|past|previous)\s+(\d+)\s+(day|week|month|year)s?\b")
+RELATIVE = re.compile(r"\b(this|last|previous|current)\s+(week|month|quarter|year)\b")
+SINCE = re.compile(r"\b(since|from|in|during|for)\s+([a-z]+)(?:\s+(\d{4}))?\b")
+MONTH_YEAR = re.compile(r"\b([a-z]+)\s+(\d{4})\b")
+YEAR = re.compile(r"\b(?:in|during|for)?\s*((?:19|20)\d{2})\b")
+
+
+def _fuzzy(word, vocabulary):
+    """Returns the vocabulary entry closest to word, or None when nothing is close enough."""
+    if word in vocabulary:
+        return word
+    if len(word) < FUZZY_MIN_LENGTH:
+        return None
+    matches = difflib.get_close_matches(word, vocabulary, n=1, cutoff=FUZZY_CUTOFF)
+    return matches[0] if matches else None
+
+
+def _month_number(word):
+    name = _fuzzy(word, list(MONTH_NAMES))
+    return MONTH_NAMES[name] if name is not None else None
+
+
+def parse_period(query, today=None):
+    """Finds a time expression in a lower-case query and returns it as a Period (default: this month).
+
+    Understands "today", "yesterday", "this/last week|month|quarter|year",
+    "last N days|weeks|months|years", "year to date", "since March",
+    "in May 2024", "March 2024" and "2024". Month names may be misspelt.
+    """
+    today = today or date.today()
+
+    if "today" in query:
+        return Period("today", today, today)
+    if "yesterday" in query:
+        day = today - timedelta(days=1)
+        return Period("yesterday", day, day)
+    if "year to date" in query or re.search(r"\bytd\b", query):
+        return Period("this year so far", date(today.year, 1, 1), today)
+
+    match = LAST_N.search(query)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        label = f"in the last {count} {unit}{'s' if count != 1 else ''}"
+        if unit == "day":
+            return Period(label, today - timedelta(days=count - 1), today)
+        if unit == "week":
+            return Period(label, today - timedelta(days=7 * count - 1), today)
+        months = count * (12 if unit == "year" else 1)
+        index = today.year * 12 + today.month - months
+        return Period(label, date(index // 12, index % 12 + 1, 1), month_period(today).end)
+
+    match = RELATIVE.search(query)
+    if match:
+        which, unit = match.groups()
+        last = which in ("last", "previous")
+        if unit == "week":
+            monday = today - timedelta(days=today.weekday() + (7 if last else 0))
+            return Period(f"{'last' if last else 'this'} week", monday, monday + timedelta(days=6))
+        if unit == "month":
+            period = previous_month_period(today) if last else month_period(today)
+        elif unit == "quarter":
+            period = quarter_period(quarter_period(today).start - timedelta(days=1) if last else today)
+        else:
+            period = year_period(date(today.year - 1, 1, 1) if last else today)
+        return Period(f"{'last' if last else 'this'} {unit}", period.start, period.end)
+
+    for match in SINCE.finditer(query):
+        preposition, word, year = match.groups()
+        number = _month_number(word)
+        if number is None:
+            continue
+        year = int(year) if year else today.year if number <= today.month else today.year - 1
+        start = date(year, number, 1)
+        if preposition in ("since", "from"):
+            return Period(f"since {start.strftime('%B %Y')}", start, today)
+        period = month_period(start)
+        return Period(f"in {start.strftime('%B %Y')}", period.start, period.end)
+
+    for match in MONTH_YEAR.finditer(query):
+        number = _month_number(match.group(1))
+        if number is not None:
+            period = month_period(date(int(match.group(2)), number, 1))
+            return Period(f"in {period.start.strftime('%B %Y')}", period.start, period.end)
+
+    match = YEAR.search(query)
+    if match:
+        period = year_period(date(int(match.group(1)), 1, 1))
+        return Period(f"in {period.label}", period.start, period.end)
+
+    period = month_period(today)
+    return Period("this month", period.start, period.end)
+
+
+def _category_vocabulary(categories):
+    vocabulary = {category.lower(): category for category in categories}
+    for category in categories:
+        for synonym in CATEGORY_SYNONYMS.get(category, []):
+            vocabulary.setdefault(synonym, category)
+    return vocabulary
+
+
+EXPENSE_VOCABULARY = _category_vocabulary(EXPENSE_CATEGORIES)
+INCOME_VOCABULARY = _category_vocabulary(INCOME_CATEGORIES)
+
+
+def match_category(query, type_="Expense"):
+    """Finds the category a lower-case query is about, allowing synonyms and typos."""
+    vocabulary = EXPENSE_VOCABULARY if type_ == "Expense" else INCOME_VOCABULARY
+    words = WORD.findall(query)
+    # Two-word synonyms ("eating out") first, then single words.
+    for phrase in [" ".join(pair) for pair in zip(words, words[1:])] + words:
+        if phrase in vocabulary:
+            return vocabulary[phrase]
+    for word in words:
+        if word in MONTH_NAMES:
+            continue
+        match = _fuzzy(word, list(vocabulary))
+        if match is not None:
+            return vocabulary[match]
+    return None
+
+
+def _money(cents):
+    return f"{cents / 100:,.2f}"
+
+
+def _summary(query, today):
+    period = parse_period(query, today)
+    return period, summarize_periods([period])[0]
+
+
+def answer_spending(query, today):
+    period, summary = _summary(query, today)
+    category = match_category(query, "Expense")
+    if category is None:
+        return f"You spent [bold]{_money(summary.total_expense)}[/bold] {period.label}."
+    spent = summary.spending_by_category.get(category, 0)
+    return f"You spent [bold]{_money(spent)}[/bold] on {category} {period.label}."
+
+
+def answer_income(query, today):
+    period, summary = _summary(query, today)
+    category = match_category(query, "Income")
+    if category is None:
+        return f"You earned [bold]{_money(summary.total_income)}[/bold] {period.label}."
+    earned = summary.income_by_source.get(category, 0)
+    return f"You earned [bold]{_money(earned)}[/bold] from {category} {period.label}."
+
+
+def answer_savings(query, today):
+    period, summary = _summary(query, today)
+    verb = "saved" if summary.savings >= 0 else "overspent by"
+    return (f"{period.label[0].upper()}{period.label[1:]} you earned {_money(summary.total_income)} and spent "
+            f"{_money(summary.total_expense)}, so you {verb} [bold]{_money(abs(summary.savings))}[/bold] "
+            f"(savings rate {summary.savings_rate:.1f}%).")
+
+
+def answer_top_categories(query, today):
+    period, summary = _summary(query, today)
+    top = summary.top_spending(3)
+    if not top:
+        return f"No spending recorded {period.label}."
+    listed = ", ".join(f"{category} {_money(amount)}" for category, amount in top)
+    return f"Your biggest spending categories {period.label}: {listed}."
+
+
+def answer_overspending(query, today):
+    period, summary = _summary(query, today)
+    income, expense = summary.total_income, summary.total_expense
+    if expense > income:
+        return (f"[bold red]Alert![/bold red] You've spent {_money(expense)} but only earned {_money(income)} "
+                f"{period.label}. You are overspending.")
+    return (f"[bold green]Good job![/bold green] Your spending ({_money(expense)}) is within your income "
+            f"({_money(income)}) {period.label}.")
+
+
+def answer_budget(query, today):
+    """Answers for one category's budget in the period asked about, else shows every budget."""
+    category = match_category(query, "Expense")
+    if category is None:
+        from features.budgets.budgets import view_budgets
+        view_budgets()
+        return None
+
+    from features.budgets.status import current_budget_statuses
+    # The budget period containing the end of the period asked about (or today).
+    day = min(parse_period(query, today).end, today)
+    status = next((s for s in current_budget_statuses(day) if s.category == category), None)
+    if status is None:
+        month = month_period(day)
+        spent = summarize_periods([month])[0].spending_by_category.get(category, 0)
+        return f"You have no budget for {category}. You spent {_money(spent)} on it in {month.label}."
+    remaining = status.remaining
+    state = f"{_money(remaining)} left" if remaining >= 0 else f"[red]{_money(-remaining)} over[/red]"
+    return (f"{category}: spent {_money(status.spent)} of your {_money(status.budget)} {status.period} budget "
+            f"for {status.label} ({state}).")
+
+
+def show_transactions(query, today):
+    from features.transactions.transactions import list_transactions
+    type_ = "expense" if re.search(r"\bexpenses?\b", query) else "income" if "income" in query else None
+    list_transactions(filter_type=type_)
+    return None
+
+
+# Transactions listed with a search answer; "Search Transactions" pages through all of them.
+SEARCH_RESULTS = 5
+SEARCH = re.compile(r"\b(?:find|search|look up|lookup)\s+(?:for\s+)?(?:(?:all|my|the)\s+)?(?:transactions?\s+)?"
+                    r"(?:(?:with|for|about|matching|containing|called|named|like)\s+)?(.+)")
+
+
+def answer_search(query, today):
+    from features.data.provider import search_transactions
+    text = SEARCH.search(query).group(1).strip(" '\"?.")
+    total, transactions = search_transactions(text, 0, SEARCH_RESULTS)
+    if not total:
+        return f"No transactions match '{text}'."
+    lines = [f"{total} transactions match '{text}'. Best matches:"]
+    for t in transactions:
+        color = "red" if t.type == "Expense" else "green"
+        lines.append(f"  {t.date}  {t.category}: {t.description}  [{color}]{_money(t.amount)}[/{color}]")
+    return "\n".join(lines)
+
+
+def show_report(query, today):
+    from features.analytics.analytics import generate_financial_report
+    generate_financial_report()
+    return None
+
+
+def answer_tip(query, today):
+    return ("[bold cyan]Financial Tip:[/bold cyan] Create a budget and track your spending for a month. "
+            "You'll be surprised where your money is going!")
+
+
+FINANCIAL_QA = {
+    "inflation": "Inflation is the rate at which the general level of prices for goods and services is rising, and subsequently, purchasing power is falling.",
+    "compound interest": "Compound interest is the interest on a loan or deposit calculated based on both the initial principal and the accumulated interest from previous periods.",
+    "savings rate": "A common rule of thumb is to save at least 20% of your income. However, the right amount for you depends on your financial goals and circumstances.",
+    "save money": "You can save money by creating a budget, cutting unnecessary expenses, setting savings goals, and automating your savings.",
+}
+
+
+def answer_question(query, today):
+    for topic, text in FINANCIAL_QA.items():
+        if topic in query:
+            return f"[bold cyan]Answer:[/bold cyan] {text}"
+    return HELP_TEXT
+
+
+@dataclass(frozen=True)
+class Intent:
+    """A kind of question: a compiled pattern that confirms it and the handler that answers it."""
+    name: str
+    pattern: re.Pattern
+    keywords: tuple
+    handler: object
+
+
+# In priority order: the first intent whose pattern matches answers the query.
+INTENTS = [
+    Intent("search", SEARCH, ("find", "search", "look", "lookup"), answer_search),
+    Intent("question", re.compile(r"\bwhat is\b.*\b(inflation|compound interest|savings rate)\b|\bhow can i save money\b"),
+           ("inflation", "compound", "rate", "save"), answer_question),
+    Intent("overspending", re.compile(r"\boverspend\w*|\bspending too much\b"),
+           ("overspending", "overspend", "overspent", "spending"), answer_overspending),
+    Intent("budget", re.compile(r"\bbudgets?\b"), ("budget", "budgets"), answer_budget),
+    Intent("top_categories", re.compile(r"\b(top|biggest|largest|most)\b.*\b(categor\w*|spend\w*|expenses?)\b"
+                                        r"|\bwhere (does|did|do) my money go\b"),
+           ("top", "biggest", "largest", "most", "where"), answer_top_categories),
+    Intent("transactions", re.compile(r"\b(list|show)\b.*\btransactions?\b"),
+           ("list", "show"), show_transactions),
+    Intent("income", re.compile(r"\b(earn\w*|income|made|make|paid me|got paid|was i paid|received)\b"),
+           ("earn", "earned", "earning", "earnings", "income", "made", "make", "paid", "received"), answer_income),
+    Intent("spending", re.compile(r"\b(spen[dt]\w*|expenses?|cost|paid|pay for)\b"),
+           ("spend", "spent", "spending", "expense", "expenses", "cost", "paid", "pay"), answer_spending),
+    Intent("savings", re.compile(r"\b(sav(e|ed|ings?)|balance|net)\b"),
+           ("save", "saved", "saving", "savings", "balance", "net"), answer_savings),
+    Intent("report", re.compile(r"\breport\b"), ("report",), show_report),
+    Intent("tip", re.compile(r"\b(tips?|advice)\b"), ("tip", "tips", "advice"), answer_tip),
+]
+
+def _keyword_index(intents):
+    index = {}
+    for position, intent in enumerate(intents):
+        for keyword in intent.keywords:
+            index.setdefault(keyword, []).append(position)
+    return index
+
+
+# Maps each keyword to the intents it can start, so a query only tries the
+# patterns of intents it shares a word with.
+KEYWORD_INDEX = _keyword_index(INTENTS)
+
+
+def route(query):
+    """Returns the intent that should answer a lower-case query, or None."""
+    candidates = sorted({position for word in WORD.findall(query) for position in KEYWORD_INDEX.get(word, ())})
+    for position in candidates:
+        if INTENTS[position].pattern.search(query):
+            return INTENTS[position]
+    return None
+
+
+HELP_TEXT = ("You can ask things like: 'How much did I spend on food last month?', 'What did I earn this year?', "
+             "'How much have I saved since March?', 'Where does my money go?', 'How is my groceries budget?', "
+             "'Am I overspending?', 'Find transactions with coffee', 'What is inflation?'.")
+
+
+def answer(query, today=None):
+    """Answers a question, returning rich-formatted text, or None when a view printed the answer.
+
+    Queries no intent understands get a hint listing the questions that work.
+    """
+    query = query.lower().strip()
+    today = today or datetime.now().date()
+    intent = route(query)
+    if intent is None:
+        return "[yellow]Sorry, I didn't understand that. Please try asking in a different way.[/yellow]\n" + HELP_TEXT
+    return intent.handler(query, today)
@@ -0,0 +1,3 @@
+# Categories
+EXPENSE_CATEGORIES = ["Food", "Transport", "Shopping", "Bills", "Entertainment", "Health", "Other"]
+INCOME_CATEGORIES = ["Salary", "Freelance", "Business", "Investment", "Gift", "Other"]
@@ -2,37 +2,59 @@ import questionary
 from rich.console import Console
 from rich.table import Table
 from datetime import datetime, timedelta
-import csv
-from features.data.provider import get_all_transactions, calculate_monthly_summary, get_transactions_for_month
+from features.data.instrumentation import instrumented
+from features.transactions.categories import EXPENSE_CATEGORIES, INCOME_CATEGORIES
+from features.budgets.status import record_expenses
+from features.data.provider import (
+    count_transactions, get_transaction_page, get_month_summary, add_transaction, search_transactions,
+)
+from features.data.validation import parse_date
 
-# Categories
-EXPENSE_CATEGORIES = ["Food", "Transport", "Shopping", "Bills", "Entertainment", "Health", "Other"]
-INCOME_CATEGORIES = ["Salary", "Freelance", "Business", "Investment", "Gift", "Other"]
-TRANSACTION_FILE = "database/transactions.txt"
+
+# Transactions shown per page by list_transactions()
+PAGE_SIZE = 20
 
 console = Console()
 
+
+def _check_date(text):
+    """Accepts an empty answer (today) or a YYYY-MM-DD date; otherwise returns the message to re-prompt with."""
+    if not text or not text.strip():
+        return True
+    try:
+        parse_date(text.strip())
+    except ValueError:
+        return "Please enter a valid date as YYYY-MM-DD."
+    return True
+
+
 def add_expense():
     """Adds a new expense transaction."""
     try:
         amount_str = questionary.text("Enter amount (e.g., 12.50):").ask()
-        amount = int(float(amount_str) * 100)
+        try:
+            amount = int(float(amount_str) * 100)
+        except (ValueError, TypeError):
+            console.print("[bold red]Invalid amount. Please enter a valid number.[/bold red]")
+            return
         if amount <= 0:
             console.print("[bold red]Amount must be a positive number.[/bold red]")
             return
 
         category = questionary.select("Select category:", choices=EXPENSE_CATEGORIES).ask()
         description = questionary.text("Enter description:").ask()
-        date_str = questionary.text("Enter date (YYYY-MM-DD, default: today):").ask()
-        date = datetime.now().strftime("%Y-%m-%d") if not date_str else date_str
+        date_str = questionary.text("Enter date (YYYY-MM-DD, default: today):", validate=_check_date).ask()
+        date = datetime.now().strftime("%Y-%m-%d") if not date_str else parse_date(date_str.strip())
 
-        with open(TRANSACTION_FILE, "a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([date, "Expense", category, description, amount])
+        alerts = record_expenses([[date, "Expense", category, description, amount]])
         console.print("[bold green]Expense added successfully![/bold green]")
+        for alert in alerts:
+            color = "red" if alert.status.status == "Over" else "yellow"
+            console.print(f"[bold {color}]Budget alert:[/bold {color}] {alert.message}")
 
-    except (ValueError, TypeError):
-        console.print("[bold red]Invalid amount. Please enter a valid number.[/bold red]")
+    except ValueError as e:
+        # The ledger rejected the row (category, date or amount); say why.
+        console.print(f"[bold red]{e}[/bold red]")
     except Exception as e:
         console.print(f"[bold red]An error occurred: {e}[/bold red]")
 
@@ -40,19 +62,20 @@ def add_expense():
 def add_expense_from_streamlit(amount, category, description, date):
     """Adds a new expense transaction from Streamlit."""
     try:
-        amount_in_cents = int(float(amount) * 100)
+        try:
+            amount_in_cents = int(float(amount) * 100)
+        except (ValueError, TypeError):
+            return "Invalid amount. Please enter a valid number."
         if amount_in_cents <= 0:
             return "Amount must be a positive number."
 
         date_str = date.strftime("%Y-%m-%d")
 
-        with open(TRANSACTION_FILE, "a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([date_str, "Expense", category, description, amount_in_cents])
-        return "Expense added successfully!"
+        alerts = record_expenses([[date_str, "Expense", category, description, amount_in_cents]])
+        return " ".join(["Expense added successfully!", *(f"Budget alert: {alert.message}" for alert in alerts)])
 
-    except (ValueError, TypeError):
-        return "Invalid amount. Please enter a valid number."
+    except ValueError as e:
+        return str(e)
     except Exception as e:
         return f"An error occurred: {e}"
 
@@ -60,19 +83,20 @@ def add_expense_from_streamlit(amount, category, description, date):
 def add_income_from_streamlit(amount, category, description, date):
     """Adds a new income transaction from Streamlit."""
     try:
-        amount_in_cents = int(float(amount) * 100)
+        try:
+            amount_in_cents = int(float(amount) * 100)
+        except (ValueError, TypeError):
+            return "Invalid amount. Please enter a valid number."
         if amount_in_cents <= 0:
             return "Amount must be a positive number."
 
         date_str = date.strftime("%Y-%m-%d")
 
-        with open(TRANSACTION_FILE, "a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([date_str, "Income", category, description, amount_in_cents])
+        add_transaction(date_str, "Income", category, description, amount_in_cents)
         return "Income added successfully!"
 
-    except (ValueError, TypeError):
-        return "Invalid amount. Please enter a valid number."
+    except ValueError as e:
+        return str(e)
     except Exception as e:
         return f"An error occurred: {e}"
 
@@ -81,67 +105,130 @@ def add_income():
     """Adds a new income transaction."""
     try:
         amount_str = questionary.text("Enter amount (e.g., 1000.00):").ask()
-        amount = int(float(amount_str) * 100)
+        try:
+            amount = int(float(amount_str) * 100)
+        except (ValueError, TypeError):
+            console.print("[bold red]Invalid amount. Please enter a valid number.[/bold red]")
+            return
         if amount <= 0:
             console.print("[bold red]Amount must be a positive number.[/bold red]")
             return
 
         category = questionary.select("Select source:", choices=INCOME_CATEGORIES).ask()
         description = questionary.text("Enter description:").ask()
-        date_str = questionary.text("Enter date (YYYY-MM-DD, default: today):").ask()
-        date = datetime.now().strftime("%Y-%m-%d") if not date_str else date_str
+        date_str = questionary.text("Enter date (YYYY-MM-DD, default: today):", validate=_check_date).ask()
+        date = datetime.now().strftime("%Y-%m-%d") if not date_str else parse_date(date_str.strip())
 
-        with open(TRANSACTION_FILE, "a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([date, "Income", category, description, amount])
+        add_transaction(date, "Income", category, description, amount)
         console.print("[bold green]Income added successfully![/bold green]")
 
-    except (ValueError, TypeError):
-        console.print("[bold red]Invalid amount. Please enter a valid number.[/bold red]")
+    except ValueError as e:
+        console.print(f"[bold red]{e}[/bold red]")
     except Exception as e:
         console.print(f"[bold red]An error occurred: {e}[/bold red]")
 
-def list_transactions(filter_days=None, filter_type=None):
-    """Lists all transactions."""
-    transactions = get_all_transactions()
+@instrumented("render")
+def _render_transactions(transactions, title):
+    """Prints one page of transactions as a table."""
+    table = Table(title=title)
+    table.add_column("Date", style="cyan")
+    table.add_column("Type", style="magenta")
+    table.add_column("Category", style="yellow")
+    table.add_column("Description", style="white")
+    table.add_column("Amount", justify="right")
 
-    if not transactions:
-        console.print("[bold yellow]No transactions found.[/bold yellow]")
-        return
+    for t in transactions:
+        amount = float(t.amount) / 100
+        color = "red" if t.type == "Expense" else "green"
+        table.add_row(t.date, t.type, t.category, t.description, f"[{color}]{amount:.2f}[/{color}]")
+
+    console.print(table)
 
-    # Sort by date (newest first)
-    transactions.sort(key=lambda x: datetime.strptime(x['date'], "%Y-%m-%d"), reverse=True)
 
-    # Apply filters
+def list_transactions(filter_days=None, filter_type=None, page_size=PAGE_SIZE):
+    """Lists transactions newest first, one page at a time."""
+    # Filters are applied while reading and only the visible page is loaded
+    start = None
     if filter_days:
-        cutoff_date = datetime.now() - timedelta(days=int(filter_days))
-        transactions = [t for t in transactions if datetime.strptime(t['date'], "%Y-%m-%d") >= cutoff_date]
+        # "Last N days" covers today and the N - 1 days before it
+        start = (datetime.now() - timedelta(days=int(filter_days) - 1)).strftime("%Y-%m-%d")
 
-    if filter_type:
-        transactions = [t for t in transactions if t['type'].lower() == filter_type.lower()]
+    total = count_transactions(start=start, type=filter_type)
+    if not total:
+        console.print("[bold yellow]No transactions found.[/bold yellow]")
+        return
 
+    pages = (total + page_size - 1) // page_size
+    page = 0
+    while True:
+        transactions = get_transaction_page(page * page_size, page_size, start=start, type=filter_type)
+        _render_transactions(transactions, f"Transactions (page {page + 1} of {pages}, {total} total)")
+        if pages == 1:
+            return
 
-    table = Table(title="Transactions")
-    table.add_column("Date", style="cyan")
-    table.add_column("Type", style="magenta")
-    table.add_column("Category", style="yellow")
-    table.add_column("Description", style="white")
-    table.add_column("Amount", justify="right")
+        choices = []
+        if page + 1 < pages:
+            choices.append("Next page")
+        if page > 0:
+            choices.append("Previous page")
+        choices.extend(["Jump to date", "Back"])
+        action = questionary.select("Navigate:", choices=choices).ask()
+
+        if action == "Next page":
+            page += 1
+        elif action == "Previous page":
+            page -= 1
+        elif action == "Jump to date":
+            date_str = questionary.text("Jump to date (YYYY-MM-DD):").ask()
+            try:
+                day = datetime.strptime(date_str, "%Y-%m-%d")
+            except (ValueError, TypeError):
+                console.print("[bold red]Invalid date. Please use YYYY-MM-DD.[/bold red]")
+                continue
+            # The page holding the date starts after every newer transaction
+            newer_start = (day + timedelta(days=1)).strftime("%Y-%m-%d")
+            newer = count_transactions(start=max(start or newer_start, newer_start), type=filter_type)
+            page = min(newer // page_size, pages - 1)
+        else:
+            return
 
-    for row in transactions:
-        amount = float(row['amount']) / 100
-        color = "red" if row['type'] == "Expense" else "green"
-        table.add_row(row['date'], row['type'], row['category'], row['description'], f"[{color}]{amount:.2f}[/{color}]")
 
-    console.print(table)
+def find_transactions(page_size=PAGE_SIZE):
+    """Searches descriptions and categories and lists the matches, best first, one page at a time."""
+    query = questionary.text("Search for (e.g., coffee, groc):").ask()
+    while query:
+        page = 0
+        while True:
+            total, transactions = search_transactions(query, page * page_size, page_size)
+            if not total:
+                console.print(f"[bold yellow]No transactions match '{query}'.[/bold yellow]")
+                break
+            pages = (total + page_size - 1) // page_size
+            _render_transactions(transactions, f"Matches for '{query}' (page {page + 1} of {pages}, {total} total)")
+
+            choices = []
+            if page + 1 < pages:
+                choices.append("Next page")
+            if page > 0:
+                choices.append("Previous page")
+            choices.extend(["New search", "Back"])
+            action = questionary.select("Navigate:", choices=choices).ask()
+
+            if action == "Next page":
+                page += 1
+            elif action == "Previous page":
+                page -= 1
+            elif action == "New search":
+                break
+            else:
+                return
+        query = questionary.text("Search for:").ask()
 
 
 def get_balance():
     """Calculates and displays the current balance for the month."""
     current_month = datetime.now().strftime("%Y-%m")
-    transactions = get_transactions_for_month(current_month)
-    
-    total_income, total_expense, _, _ = calculate_monthly_summary(transactions)
+    total_income, total_expense, _, _ = get_month_summary(current_month)
 
     balance = total_income - total_expense
     balance_color = "green" if balance >= 0 else "red"
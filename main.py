@@ -1,89 +1,147 @@
+import argparse
+import importlib
+import os
+import sys
+from collections import namedtuple
+
 import questionary
 from rich.console import Console
-import os
 
-from features.transactions.transactions import add_expense, add_income, list_transactions, get_balance
-from features.budgets.budgets import set_budget, view_budgets
-from features.analytics.analytics import generate_financial_report
-from features.smart_assistant.assistant import run_assistant
-from features.data_management.data_manager import export_data, import_data, backup_data, reset_data
+from features.data.instrumentation import INSTRUMENT_ENV, enable as enable_instrumentation, measure
+from features.data.ledgers import DEFAULT_LEDGER, LEDGER_ENV, active_ledger, set_active_ledger
 
 console = Console()
 
+# A menu entry: target is "package.module:function" (imported on first use) or a callable.
+Action = namedtuple("Action", ["target", "kwargs"], defaults=[{}])
+# A menu entry that asks a follow-up question; "Back" is added to its choices.
+Submenu = namedtuple("Submenu", ["prompt", "actions"])
+
+TRANSACTIONS = "features.transactions.transactions"
+DATA_MANAGER = "features.data_management.data_manager"
+LEDGERS = "features.ledgers.ledgers"
+
+
+def launch_dashboard():
+    """Starts the Streamlit dashboard."""
+    console.print("[bold green]Launching dashboard...[/bold green]")
+    os.system("streamlit run dashboard.py")
+
+
+LIST_TRANSACTIONS_MENU = {
+    "All": Action(f"{TRANSACTIONS}:list_transactions"),
+    "Last 7 days": Action(f"{TRANSACTIONS}:list_transactions", {"filter_days": 7}),
+    "Expenses only": Action(f"{TRANSACTIONS}:list_transactions", {"filter_type": "expense"}),
+    "Income only": Action(f"{TRANSACTIONS}:list_transactions", {"filter_type": "income"}),
+}
+
+DATA_MANAGEMENT_MENU = {
+    "Export Data": Action(f"{DATA_MANAGER}:export_data"),
+    "Import Data": Action(f"{DATA_MANAGER}:import_data"),
+    "Backup Data": Action(f"{DATA_MANAGER}:backup_data"),
+    "List Backups": Action(f"{DATA_MANAGER}:list_backups"),
+    "Restore Backup": Action(f"{DATA_MANAGER}:restore_backup"),
+    "Prune Backups": Action(f"{DATA_MANAGER}:prune_backups"),
+    "Rebuild Indexes": Action(f"{DATA_MANAGER}:rebuild_data_indexes"),
+    "Migrate to SQLite": Action(f"{DATA_MANAGER}:migrate_to_sqlite"),
+    "Convert Ledger Format": Action(f"{DATA_MANAGER}:convert_ledger_format"),
+    "Reset Data": Action(f"{DATA_MANAGER}:reset_data"),
+}
+
+LEDGERS_MENU = {
+    "List Ledgers": Action(f"{LEDGERS}:view_ledgers"),
+    "Switch Ledger": Action(f"{LEDGERS}:switch_ledger"),
+    "Add Ledger": Action(f"{LEDGERS}:create_ledger"),
+    "Remove Ledger": Action(f"{LEDGERS}:forget_ledger"),
+    "Consolidated Report": Action("features.analytics.analytics:generate_consolidated_report"),
+}
+
+# Main menu, in display order. Feature modules are only imported when their
+# entry is chosen, so start-up stays fast as features are added.
+MAIN_MENU = {
+    "Add Expense": Action(f"{TRANSACTIONS}:add_expense"),
+    "Add Income": Action(f"{TRANSACTIONS}:add_income"),
+    "List Transactions": Submenu("Filter transactions?", LIST_TRANSACTIONS_MENU),
+    "Search Transactions": Action(f"{TRANSACTIONS}:find_transactions"),
+    "View Balance": Action(f"{TRANSACTIONS}:get_balance"),
+    "Set Budget": Action("features.budgets.budgets:set_budget"),
+    "View Budgets": Action("features.budgets.budgets:view_budgets"),
+    "Budget History": Action("features.budgets.budgets:view_budget_history"),
+    "Generate Financial Report": Action("features.analytics.analytics:generate_financial_report"),
+    "Trend Analysis": Action("features.analytics.analytics:view_trends"),
+    "Smart Assistant": Action("features.smart_assistant.assistant:run_assistant"),
+    "Data Management": Submenu("Data Management Options:", DATA_MANAGEMENT_MENU),
+    "Ledgers": Submenu("Ledger Options:", LEDGERS_MENU),
+    "Launch Web Dashboard": Action(launch_dashboard),
+    "Performance Stats": Action("features.performance.performance:view_performance_stats"),
+}
+
+
+def load_action(target):
+    """Returns the function for a "package.module:function" target, importing its module if needed."""
+    if callable(target):
+        return target
+    module, _, name = target.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def run_action(choice, menu=MAIN_MENU):
+    """Runs a menu action; returns False when the user chose to exit."""
+    if choice == "Exit":
+        console.print("[bold cyan]Goodbye![/bold cyan]")
+        return False
+
+    entry = menu.get(choice)
+    if isinstance(entry, Submenu):
+        sub_choice = questionary.select(entry.prompt, choices=[*entry.actions, "Back"]).ask()
+        if sub_choice in entry.actions:
+            return run_action(sub_choice, entry.actions)
+    elif entry is not None:
+        load_action(entry.target)(**entry.kwargs)
+    return True
+
+
 def main():
     """Main function to run the Personal Finance Tracker CLI."""
+    parser = argparse.ArgumentParser(description="Personal Finance Tracker")
+    parser.add_argument("--instrument", action="store_true",
+                        help="record timings for the Performance Stats view")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="measure how long main.py takes to start and exit")
+    parser.add_argument("--budget-ms", type=float,
+                        help="start-up budget for --startup-time (default: STARTUP_BUDGET_MS)")
+    parser.add_argument("--ledger", help="ledger to open (default: $FINANCE_TRACKER_LEDGER or 'default')")
+    args = parser.parse_args()
+
+    if args.startup_time:
+        from features.performance.startup import report_startup_time
+        sys.exit(report_startup_time(budget_ms=args.budget_ms))
+
+    if args.instrument:
+        enable_instrumentation()
+        # The dashboard launched from the menu inherits the setting.
+        os.environ[INSTRUMENT_ENV] = "1"
+
+    if args.ledger:
+        try:
+            set_active_ledger(args.ledger)
+        except ValueError as e:
+            parser.error(str(e))
+        os.environ[LEDGER_ENV] = args.ledger
+
     console.print("[bold cyan]Welcome to your Personal Finance Tracker![/bold cyan]")
+    if active_ledger() != DEFAULT_LEDGER:
+        console.print(f"[cyan]Using ledger '{active_ledger()}'.[/cyan]")
 
     while True:
         choice = questionary.select(
             "What would you like to do?",
-            choices=[
-                "Add Expense",
-                "Add Income",
-                "List Transactions",
-                "View Balance",
-                "Set Budget",
-                "View Budgets",
-                "Generate Financial Report",
-                "Smart Assistant",
-                "Data Management",
-                "Launch Web Dashboard",
-                "Exit",
-            ],
+            choices=[*MAIN_MENU, "Exit"],
         ).ask()
 
-        if choice == "Add Expense":
-            add_expense()
-        elif choice == "Add Income":
-            add_income()
-        elif choice == "List Transactions":
-            filter_choice = questionary.select(
-                "Filter transactions?",
-                choices=["All", "Last 7 days", "Expenses only", "Income only", "Back"],
-            ).ask()
-
-            if filter_choice == "All":
-                list_transactions()
-            elif filter_choice == "Last 7 days":
-                list_transactions(filter_days=7)
-            elif filter_choice == "Expenses only":
-                list_transactions(filter_type="expense")
-            elif filter_choice == "Income only":
-                list_transactions(filter_type="income")
-            elif filter_choice == "Back":
-                continue
-
-        elif choice == "View Balance":
-            get_balance()
-        elif choice == "Set Budget":
-            set_budget()
-        elif choice == "View Budgets":
-            view_budgets()
-        elif choice == "Generate Financial Report":
-            generate_financial_report()
-        elif choice == "Smart Assistant":
-            run_assistant()
-        elif choice == "Data Management":
-            data_choice = questionary.select(
-                "Data Management Options:",
-                choices=["Export Data", "Import Data", "Backup Data", "Reset Data", "Back"],
-            ).ask()
-
-            if data_choice == "Export Data":
-                export_data()
-            elif data_choice == "Import Data":
-                import_data()
-            elif data_choice == "Backup Data":
-                backup_data()
-            elif data_choice == "Reset Data":
-                reset_data()
-            elif data_choice == "Back":
-                continue
-        elif choice == "Launch Web Dashboard":
-            console.print("[bold green]Launching dashboard...[/bold green]")
-            os.system("streamlit run dashboard.py")
-        elif choice == "Exit":
-            console.print("[bold cyan]Goodbye![/bold cyan]")
+        with measure("action", choice or "none"):
+            keep_running = run_action(choice)
+        if not keep_running:
             break
 
 if __name__ == "__main__":